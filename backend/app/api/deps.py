@@ -1,7 +1,8 @@
 from fastapi import Depends, HTTPException, Header
-from firebase_admin import auth as admin_auth
 from typing import Optional
 
+from app.core.security import token_cache
+
 async def get_current_user(authorization: Optional[str] = Header(None)):
     """Verify Firebase ID token from Authorization header."""
     if not authorization or not authorization.startswith("Bearer "):
@@ -13,7 +14,7 @@ async def get_current_user(authorization: Optional[str] = Header(None)):
     id_token = authorization.split(" ", 1)[1]
     
     try:
-        decoded = admin_auth.verify_id_token(id_token, check_revoked=True)
+        decoded = await token_cache.verify(id_token)
         return {
             "uid": decoded.get("uid"),
             "email": decoded.get("email"),
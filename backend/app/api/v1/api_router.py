@@ -7,6 +7,8 @@ from app.api.v1.endpoints import admin
 from app.api.v1.endpoints import auth
 from app.api.v1.endpoints import config
 from app.api.v1.endpoints import restaurants # <--- Import
+from app.api.v1.endpoints import kitchen
+from app.api.v1.endpoints import holds
 
 api_router = APIRouter()
 api_router.include_router(reservations.router, tags=["reservations"])
@@ -16,3 +18,5 @@ api_router.include_router(admin.router, tags=["admin"])
 api_router.include_router(auth.router, tags=["auth"])
 api_router.include_router(config.router, tags=["config"])
 api_router.include_router(restaurants.router, prefix="/restaurants", tags=["restaurants"]) # <--- Add
+api_router.include_router(kitchen.router, tags=["kitchen"])
+api_router.include_router(holds.router, tags=["holds"])
@@ -1,71 +1,104 @@
 from fastapi import APIRouter, Depends, HTTPException, UploadFile, File
-from firebase_admin import firestore
 from google.cloud.firestore_v1 import SERVER_TIMESTAMP
 from datetime import datetime, time as dt_time, timezone
 
 from app.api.deps import require_role
 from app.services.firestore import get_db
+from app.services.booking import BookingContention, ReservationNotFound, cancel_booking
+from app.services.guest_import import import_guest_list
+from app.services.guest_list import guest_list_cache
+from app.services.availability import availability_index
+from app.services.stats import DAILY_STATS_COLLECTION
+from app.utils.datetime import get_local_now
 from app.core.config import settings
-import pandas as pd
 from datetime import datetime, timedelta
+from typing import Literal, Optional
 # ... existing imports
 
 router = APIRouter()
 
+# Longest range the analytics dashboard charts, one timeline point per day
+ANALYTICS_MAX_DAYS = 366
+
 @router.get("/analytics/dashboard")
 async def get_analytics_dashboard(
+    from_date: Optional[str] = None,
+    to_date: Optional[str] = None,
+    restaurant: Optional[str] = None,
     user: dict = Depends(require_role("admin"))
 ):
     """
-    Aggregates stats for the last 30 days:
+    Aggregates stats from the daily_stats rollups (last 30 days by default):
     - Total Revenue (Upsells)
     - Total Covers (Guests)
+    - Per-Restaurant Breakdown
     - Occupancy Rates
     - Daily Trends
     """
     db = get_db()
     
-    # Date Range: Last 30 Days
-    today = datetime.now()
-    start_date = (today - timedelta(days=30)).strftime("%Y-%m-%d")
-    end_date = today.strftime("%Y-%m-%d")
-
-    # 1. Fetch Reservations
-    res_docs = db.collection("reservations") \
+    # Date Range: Last 30 Days unless given
+    today = get_local_now(settings.LOCAL_TIMEZONE)
+    start_date = from_date or (today - timedelta(days=30)).strftime("%Y-%m-%d")
+    end_date = to_date or today.strftime("%Y-%m-%d")
+    try:
+        first_day = datetime.strptime(start_date, "%Y-%m-%d")
+        last_day = datetime.strptime(end_date, "%Y-%m-%d")
+    except ValueError:
+        raise HTTPException(status_code=400, detail="from_date and to_date must be YYYY-MM-DD dates")
+    if last_day < first_day:
+        raise HTTPException(status_code=400, detail="from_date must not be after to_date")
+    if (last_day - first_day).days >= ANALYTICS_MAX_DAYS:
+        raise HTTPException(status_code=400, detail=f"The range cannot exceed {ANALYTICS_MAX_DAYS} days")
+
+    # 1. Fetch Rollups (one small doc per restaurant per day)
+    query = db.collection(DAILY_STATS_COLLECTION) \
         .where("date", ">=", start_date) \
-        .where("status", "==", "confirmed") \
-        .stream()
+        .where("date", "<=", end_date)
+    if restaurant:
+        query = query.where("restaurant", "==", restaurant)
 
     total_revenue = 0.0
     total_guests = 0
+    reservation_count = 0
     reservations_by_date = {} # { "2023-10-01": 12, ... }
     revenue_by_date = {}
+    by_restaurant = {}
 
-    for doc in res_docs:
+    async for doc in query.stream():
         data = doc.to_dict()
         d_date = data.get("date")
         guests = int(data.get("guests", 0))
-        rev = float(data.get("upsell_total_price", 0.0))
+        rev = float(data.get("revenue", 0.0))
+        count = int(data.get("reservations", 0))
 
         total_guests += guests
         total_revenue += rev
+        reservation_count += count
 
         # Aggregate for Charts
         reservations_by_date[d_date] = reservations_by_date.get(d_date, 0) + guests
         revenue_by_date[d_date] = revenue_by_date.get(d_date, 0.0) + rev
 
-    # 2. Fetch Capacities (for Occupancy)
-    # We only care about the next 7 days for occupancy forecast
+        row = by_restaurant.setdefault(data.get("restaurant"), {
+            "restaurant": data.get("restaurant"),
+            "reservations": 0,
+            "guests": 0,
+            "revenue": 0.0
+        })
+        row["reservations"] += count
+        row["guests"] += guests
+        row["revenue"] = round(row["revenue"] + rev, 2)
+
+    # 2. Occupancy forecast for the next 7 days (served from the availability index)
     forecast_end = (today + timedelta(days=7)).strftime("%Y-%m-%d")
-    cap_docs = db.collection("capacities") \
-        .where("date", ">=", end_date) \
-        .where("date", "<=", forecast_end) \
-        .stream()
+    capacities = await availability_index.query(
+        db, restaurant, today.strftime("%Y-%m-%d"), forecast_end
+    )
     
     occupancy_data = []
     
-    for doc in cap_docs:
-        data = doc.to_dict()
+    for data in capacities:
         cap = data.get("capacity", 0)
         res = data.get("reserved_guests", 0)
         pct = (res / cap * 100) if cap > 0 else 0
@@ -78,26 +111,28 @@ async def get_analytics_dashboard(
             "capacity": cap
         })
 
-    # 3. Format Chart Data (Timeline)
+    # 3. Format Chart Data (Timeline), one point per day in the range
     chart_data = []
-    # Fill in last 30 days
-    for i in range(30):
-        d = (today - timedelta(days=30 - i)).strftime("%Y-%m-%d")
+    d = first_day
+    while d <= last_day:
+        key = d.strftime("%Y-%m-%d")
         chart_data.append({
-            "date": d,
-            "guests": reservations_by_date.get(d, 0),
-            "revenue": revenue_by_date.get(d, 0)
+            "date": key,
+            "guests": reservations_by_date.get(key, 0),
+            "revenue": round(revenue_by_date.get(key, 0), 2)
         })
+        d += timedelta(days=1)
 
     return {
         "kpi": {
             "total_revenue": round(total_revenue, 2),
             "total_guests": total_guests,
-            "reservation_count": len(chart_data) # roughly
+            "reservation_count": reservation_count
         },
         "charts": {
             "timeline": chart_data,
-            "occupancy": occupancy_data
+            "occupancy": occupancy_data,
+            "by_restaurant": sorted(by_restaurant.values(), key=lambda r: r["restaurant"] or "")
         }
     }
 
@@ -115,10 +150,10 @@ async def update_payment_status(
     
     doc_ref = db.collection("reservations").document(reservation_id)
     
-    if not doc_ref.get().exists:
+    if not (await doc_ref.get()).exists:
         raise HTTPException(status_code=404, detail="Reservation not found")
     
-    doc_ref.update({
+    await doc_ref.update({
         "paid": bool(payload["paid"]),
         "payment_updated_at": SERVER_TIMESTAMP,
         "payment_updated_by": user.get("uid")
@@ -134,96 +169,37 @@ async def cancel_reservation_admin(
     """Admin-initiated cancellation of a reservation."""
     db = get_db()
     
-    doc_ref = db.collection("reservations").document(reservation_id)
-    doc = doc_ref.get()
-    
-    if not doc.exists:
+    try:
+        await cancel_booking(db, reservation_id)
+    except ReservationNotFound:
         raise HTTPException(status_code=404, detail="Reservation not found")
-    
-    data = doc.to_dict()
-    
-    # Update capacity
-    capacity_key = f"{data['restaurant']}_{data['date']}"
-    capacity_ref = db.collection("capacities").document(capacity_key)
-    
-    transaction = db.transaction()
-    
-    @firestore.transactional
-    def cancel_transaction(transaction):
-        capacity_doc = capacity_ref.get(transaction=transaction)
-        if capacity_doc.exists:
-            transaction.update(capacity_ref, {
-                "reserved_guests": firestore.Increment(-int(data.get("guests", 0)))
-            })
-        transaction.delete(doc_ref)
-    
-    cancel_transaction(transaction)
+    except BookingContention as e:
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": "1"})
     
     return {"message": "Reservation cancelled by admin"}
 
 @router.post("/upload-guestlist")
 async def upload_guest_list(
     file: UploadFile = File(...),
+    mode: Literal["merge", "replace"] = "merge",
     user: dict = Depends(require_role("admin", "reception"))
 ):
     """
-    Parses an Excel file (Room, Last Name, VIP Level) and stores it in Firestore.
+    Imports a PMS export (.xlsx or .csv with Room, Last Name and optional VIP
+    columns) into the guest list. mode=replace also removes guests whose room
+    is not in the file.
     """
-    if not file.filename.endswith('.xlsx'):
-        raise HTTPException(status_code=400, detail="Invalid file type. Please upload .xlsx")
+    if not file.filename.lower().endswith(('.xlsx', '.csv')):
+        raise HTTPException(status_code=400, detail="Invalid file type. Please upload .xlsx or .csv")
 
+    db = get_db()
     try:
-        # 1. Read Excel into Pandas DataFrame
-        content = await file.read()
-        df = pd.read_excel(io.BytesIO(content))
-        
-        # 2. Normalize Headers (ensure columns exist)
-        # Expected columns: 'Room', 'Last Name', 'VIP'
-        df.columns = [c.strip().lower().replace(' ', '_') for c in df.columns]
-        
-        required_cols = ['room', 'last_name']
-        if not all(col in df.columns for col in required_cols):
-            raise HTTPException(status_code=400, detail=f"Excel must contain columns: Room, Last Name. Found: {df.columns}")
-
-        db = get_db()
-        batch = db.batch()
-        count = 0
-        
-        # 3. Clear old list (Optional: strictly depends on if you want to replace or append)
-        # For a hotel, usually you replace the list daily. Deleting all is slow in Firestore.
-        # For MVP, we will just Overwrite existing rooms or add new ones.
-        
-        collection_ref = db.collection("guest_list")
-
-        for _, row in df.iterrows():
-            room_num = str(row['room']).strip()
-            last_name = str(row['last_name']).strip()
-            vip_level = str(row.get('vip', 'Standard')).strip() # Default to Standard if empty
-            
-            # Create a searchable document ID based on Room Number
-            # Logic: One room usually has one primary guest name we match against.
-            doc_ref = collection_ref.document(room_num)
-            
-            batch.set(doc_ref, {
-                "room": room_num,
-                "last_name": last_name,
-                "last_name_normalized": last_name.lower(), # Helper for case-insensitive match
-                "vip_level": vip_level,
-                "is_vip": vip_level.lower() not in ['standard', 'nan', 'none', '']
-            })
-            
-            count += 1
-            
-            # Firestore batches are limited to 500 ops
-            if count % 400 == 0:
-                batch.commit()
-                batch = db.batch()
-
-        if count % 400 != 0:
-            batch.commit()
-
-        return {"message": f"Successfully processed {count} guests."}
-
+        report = await import_guest_list(db, file.file, file.filename, replace=mode == "replace")
+        await guest_list_cache.load(db)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         print(f"Upload error: {e}")
         raise HTTPException(status_code=500, detail=str(e))
+
+    return {"message": f"Successfully processed {report['imported']} guests.", **report}
@@ -1,37 +1,48 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Query
 from firebase_admin import firestore
 from google.cloud.firestore_v1 import Increment
 from datetime import datetime, timedelta
+from typing import Optional
 
 from app.api.deps import require_role
+from app.core.config import settings
+from app.models.capacity import CapacityPlan
 from app.services.firestore import get_db
+from app.services.availability import availability_index
+from app.services.capacity_plan import (
+    PLAN_MAX_DAYS,
+    expand_template,
+    save_capacity_plan,
+    split_capacity_key,
+    validate_keys
+)
+from app.utils.datetime import get_local_now
 
 router = APIRouter()
 
 @router.get("/capacities/overview")
-async def get_capacities_overview():
-    """Get capacity overview as a list for the dashboard."""
+async def get_capacities_overview(
+    restaurant: Optional[str] = None,
+    from_date: Optional[str] = None,
+    to_date: Optional[str] = None
+):
+    """Get capacity overview as a list for the dashboard (today onwards by default)."""
     db = get_db()
     
-    docs = db.collection("capacities").stream()
-    result = []
-    
-    for doc in docs:
-        data = doc.to_dict()
-        result.append(data)
-    
-    return result
+    return await availability_index.query(db, restaurant, from_date, to_date)
 
 @router.get("/capacities")
-async def get_capacities():
-    """Get all capacities with reserved counts."""
+async def get_capacities(
+    restaurant: Optional[str] = None,
+    from_date: Optional[str] = None,
+    to_date: Optional[str] = None
+):
+    """Get capacities with reserved counts (today onwards by default)."""
     db = get_db()
     
     result = {}
-    docs = db.collection("capacities").stream()
     
-    for doc in docs:
-        data = doc.to_dict()
+    for data in await availability_index.query(db, restaurant, from_date, to_date):
         key = f"{data['restaurant']}_{data['date']}"
         result[key] = {
             "capacity": data.get("capacity", 0),
@@ -41,6 +52,20 @@ async def get_capacities():
     
     return result
 
+@router.get("/availability")
+async def get_availability(
+    restaurant: Optional[str] = None,
+    from_date: Optional[str] = Query(None, alias="from"),
+    to_date: Optional[str] = Query(None, alias="to")
+):
+    """
+    Remaining seats per restaurant-day and per time slot (today onwards by
+    default), so guests only see times that still have room.
+    """
+    db = get_db()
+    
+    return await availability_index.slots(db, restaurant, from_date, to_date)
+
 @router.post("/capacities", dependencies=[Depends(require_role("admin"))])
 async def save_capacities(capacities: dict):
     """Save capacities with validation."""
@@ -50,38 +75,65 @@ async def save_capacities(capacities: dict):
     today = datetime.today()
     allowed_dates = [(today + timedelta(days=i)).strftime("%Y-%m-%d") for i in range(6)]
     
-    batch = db.batch()
+    plan = {}
+    try:
+        for key, value in capacities.items():
+            restaurant, date = split_capacity_key(key)
+            if date in allowed_dates:
+                plan[(restaurant, date)] = int(value)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    try:
+        report = await save_capacity_plan(db, plan)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     
-    for key, value in capacities.items():
-        restaurant, date = key.split('_')
-        
-        if date not in allowed_dates:
-            continue
-        
-        new_capacity = int(value)
-        doc_ref = db.collection("capacities").document(key)
-        
-        # Check if we can safely update
-        doc = doc_ref.get()
-        if doc.exists:
-            current_data = doc.to_dict()
-            reserved = current_data.get("reserved_guests", 0)
-            
-            if new_capacity < reserved:
-                raise HTTPException(
-                    status_code=400,
-                    detail=f"Cannot reduce capacity for {restaurant} on {date}. "
-                           f"Already {reserved} guests reserved, cannot set to {new_capacity}."
-                )
-            
-            batch.update(doc_ref, {"capacity": new_capacity})
-        else:
-            batch.set(doc_ref, {
-                "restaurant": restaurant,
-                "date": date,
-                "capacity": new_capacity,
-                "reserved_guests": 0
-            })
+    if report["failed"]:
+        failed = "; ".join(f"{f['restaurant']} on {f['date']}: {f['error']}" for f in report["failed"])
+        raise HTTPException(
+            status_code=409,
+            detail=f"Saved {report['created'] + report['updated']} capacities, failed: {failed}"
+        )
     
-    batch.commit()
     return {"message": "Capacities saved successfully"}
+
+@router.post("/capacities/plan", dependencies=[Depends(require_role("admin"))])
+async def plan_capacities(plan: CapacityPlan):
+    """
+    Set capacities for many restaurant-days at once: a restaurant x date
+    matrix and/or templates such as "weekday 60, weekend 80 for 90 days",
+    expanded here. Matrix values win over templates. The whole plan is
+    validated before anything is written; days that still fail to write are
+    listed under "failed" in the report.
+    """
+    db = get_db()
+    
+    today = get_local_now(settings.LOCAL_TIMEZONE).date()
+    last_day = today + timedelta(days=PLAN_MAX_DAYS - 1)
+    
+    changes = {}
+    try:
+        for template in plan.templates:
+            changes.update(expand_template(
+                template.restaurants, template.from_date, template.days,
+                template.weekday, template.weekend, template.weekend_days
+            ))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    for restaurant, days in plan.capacities.items():
+        for date, capacity in days.items():
+            changes[(restaurant, date)] = capacity
+    
+    if not changes:
+        raise HTTPException(status_code=400, detail="The plan sets no capacities")
+    
+    errors = validate_keys(changes, today.isoformat(), last_day.isoformat())
+    if errors:
+        raise HTTPException(status_code=400, detail="; ".join(errors))
+    
+    try:
+        return await save_capacity_plan(db, changes)
+    except ValueError as e:
+        # Below the seats already reserved
+        raise HTTPException(status_code=400, detail=str(e))
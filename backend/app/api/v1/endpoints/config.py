@@ -1,23 +1,17 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Request
 from typing import List, Dict
 from app.api.deps import require_role
 from app.services.firestore import get_db
+from app.services.availability import availability_index
+from app.services.catalog import config_catalog
 from app.models.config import RestaurantConfig
 
 router = APIRouter()
 
 @router.get("/config", response_model=Dict[str, RestaurantConfig])
-async def get_configs():
-    """Get configurations for all restaurants (Public/Guest)."""
-    db = get_db()
-    docs = db.collection("restaurant_configs").stream()
-    
-    configs = {}
-    for doc in docs:
-        data = doc.to_dict()
-        configs[doc.id] = data
-        
-    return configs
+async def get_configs(request: Request):
+    """Get configurations for all restaurants (Public/Guest), cached with an ETag."""
+    return await config_catalog.respond(get_db(), request)
 
 @router.post("/config", dependencies=[Depends(require_role("admin"))])
 async def update_config(config: RestaurantConfig):
@@ -26,6 +20,8 @@ async def update_config(config: RestaurantConfig):
     
     # Store config using the restaurantId as the Document ID
     doc_ref = db.collection("restaurant_configs").document(config.restaurantId)
-    doc_ref.set(config.model_dump())
+    await doc_ref.set(config.model_dump())
+    config_catalog.invalidate()
+    availability_index.invalidate()  # slot grids follow the opening hours
     
     return {"message": "Configuration saved", "config": config}
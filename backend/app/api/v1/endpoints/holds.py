@@ -0,0 +1,45 @@
+from fastapi import APIRouter, HTTPException, Response
+
+from app.models.hold import HoldCreate, HoldResponse
+from app.services.booking import BookingContention, place_hold, release_hold
+from app.services.firestore import get_db
+from app.services.guest_list import guest_list_cache
+from app.services.holds import HoldLimitReached
+
+router = APIRouter()
+
+@router.post("/holds", response_model=HoldResponse)
+async def create_hold(data: HoldCreate):
+    """
+    Hold seats while the guest picks main courses and upsells. Pass the
+    returned hold_id to POST /reservations before expires_at. Only guests on
+    the guest list (room and last name) can hold seats, and only a few
+    holds per room at once.
+    """
+    db = get_db()
+    
+    room = data.room.strip()
+    guest_info = await guest_list_cache.lookup(db, room)
+    if not guest_info or guest_info.get("last_name_normalized", "") != data.last_name.strip().lower():
+        raise HTTPException(status_code=403, detail="Room number and last name do not match a hotel guest")
+    
+    try:
+        return await place_hold(db, data.restaurant, data.date, data.time, data.guests, room)
+    except BookingContention as e:
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": "1"})
+    except HoldLimitReached as e:
+        raise HTTPException(status_code=429, detail=str(e))
+    except ValueError as e:
+        # SoldOut, or no capacity set for the day
+        raise HTTPException(status_code=400, detail=str(e))
+
+@router.delete("/holds/{hold_id}", status_code=204)
+async def delete_hold(hold_id: str):
+    """Give the held seats back (already converted or expired holds are ignored)."""
+    db = get_db()
+    
+    try:
+        await release_hold(db, hold_id)
+    except BookingContention as e:
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": "1"})
+    return Response(status_code=204)
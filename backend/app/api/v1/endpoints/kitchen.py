@@ -0,0 +1,48 @@
+from fastapi import APIRouter, Depends
+from typing import Optional
+
+from app.api.deps import require_role
+from app.services.firestore import get_db
+from app.services.catalog import restaurant_catalog
+from app.services.kitchen import kitchen_prep_ref
+from app.utils.datetime import get_local_now
+from app.core.config import settings
+
+router = APIRouter()
+
+def _counted(counts: dict, labels: dict) -> list:
+    """Non-zero counters as [{id, label, count}], largest first."""
+    return sorted(
+        ({"id": key, "label": labels.get(key, key), "count": count} for key, count in counts.items() if count),
+        key=lambda row: (-row["count"], row["label"])
+    )
+
+@router.get("/kitchen/prep")
+async def get_kitchen_prep(
+    restaurant: str,
+    date: Optional[str] = None,
+    user: dict = Depends(require_role("admin", "kitchen", "reception"))
+):
+    """Prep sheet for one service (today by default): covers, dishes and upsells to prepare."""
+    db = get_db()
+    date = date or get_local_now(settings.LOCAL_TIMEZONE).strftime("%Y-%m-%d")
+    
+    doc = await kitchen_prep_ref(db, restaurant, date).get()
+    prep = doc.to_dict() if doc.exists else {}
+    
+    # Labels come from the cached restaurant catalog, not another read
+    menu = next((r.menuConfig for r in await restaurant_catalog.get(db) if r.id == restaurant), None)
+    course_labels = {item.id: item.label for item in menu.mainCourses} if menu else {}
+    upsell_labels = {item.id: item.label for item in menu.upsellItems} if menu else {}
+    
+    return {
+        "restaurant": restaurant,
+        "date": date,
+        "reservations": prep.get("reservations", 0),
+        "covers": prep.get("covers", 0),
+        "covers_by_time": {
+            time: covers for time, covers in sorted(prep.get("covers_by_time", {}).items()) if covers
+        },
+        "main_courses": _counted(prep.get("main_courses", {}), course_labels),
+        "upsells": _counted(prep.get("upsells", {}), upsell_labels)
+    }
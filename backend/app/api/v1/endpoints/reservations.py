@@ -1,7 +1,9 @@
-from fastapi import APIRouter, Depends, HTTPException, BackgroundTasks
+from fastapi import APIRouter, Depends, Header, HTTPException
+from fastapi.responses import StreamingResponse
 from firebase_admin import firestore
-from google.cloud.firestore_v1 import SERVER_TIMESTAMP, Increment
-from typing import Dict
+from google.cloud.firestore_v1 import SERVER_TIMESTAMP
+from google.cloud.firestore_v1.field_path import FieldPath
+from typing import Dict, Literal, Optional
 import uuid
 from datetime import datetime
 from pydantic import BaseModel
@@ -13,8 +15,20 @@ from app.models.reservation import (
     PaginatedReservations
 )
 from app.api.deps import get_current_user, require_role
-from app.services.email import send_confirmation_email
 from app.services.firestore import get_db
+from app.services.booking import (
+    BookingContention,
+    ReservationNotFound,
+    cancel_booking,
+    create_booking,
+    modify_booking
+)
+from app.services.guest_list import guest_list_cache
+from app.services.holds import HoldMismatch
+from app.services.idempotency import IdempotencyKeyReused, request_fingerprint, validate_key
+from app.services.search import search_keys, search_term
+from app.services.export import EXPORT_FORMATS, export_chunks, export_filename
+from app.services.pagination import count_cache, decode_cursor, encode_cursor
 from app.core.config import settings
 
 router = APIRouter()
@@ -22,22 +36,29 @@ router = APIRouter()
 @router.post("/reservations", response_model=Dict[str, str])
 async def create_reservation(
     data: ReservationCreate,
-    background_tasks: BackgroundTasks
+    idempotency_key: Optional[str] = Header(None)
 ):
-    """Create a new reservation with VIP detection."""
+    """
+    Create a new reservation with VIP detection. A retry sent with the same
+    Idempotency-Key header gets the original reservation_id back instead of
+    a second booking.
+    """
     db = get_db()
     
+    if idempotency_key is not None:
+        try:
+            idempotency_key = validate_key(idempotency_key)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+    
     # --- NEW: VIP DETECTION LOGIC ---
     is_vip = False
     vip_level = "Standard"
     
-    # Check Guest List by Room Number
-    guest_ref = db.collection("guest_list").document(str(data.room).strip())
-    guest_doc = guest_ref.get()
+    # Check Guest List by Room Number (served from memory)
+    guest_info = await guest_list_cache.lookup(db, str(data.room).strip())
     
-    if guest_doc.exists:
-        guest_info = guest_doc.to_dict()
-        
+    if guest_info:
         # Verify Last Name matches (Case-insensitive)
         stored_name = guest_info.get("last_name_normalized", "")
         input_name = data.last_name.strip().lower()
@@ -72,56 +93,34 @@ async def create_reservation(
         "paid": False,
         "email_status": "pending",
         
+        # Picked up by the nightly review-request job
+        "review": {"requestSent": False},
+        
         # Save VIP status
         "is_vip": is_vip,
         "vip_level": vip_level,
         
         "created_at": SERVER_TIMESTAMP
     }
-    
-    capacity_key = f"{data.restaurant}_{data.date}"
-    capacity_ref = db.collection("capacities").document(capacity_key)
-    new_reservation_ref = db.collection("reservations").document()
-    
-    @firestore.transactional
-    def create_reservation_transaction(transaction):
-        capacity_doc = capacity_ref.get(transaction=transaction)
-        
-        if not capacity_doc.exists:
-            # Auto-create capacity if missing (optional, based on your preference)
-            # For strictness, assume it exists or raise error
-            raise ValueError(f"No capacity set for {data.restaurant} on {data.date}")
-            
-        capacity_data = capacity_doc.to_dict()
-        total_capacity = capacity_data.get("capacity", 0)
-        reserved_guests = capacity_data.get("reserved_guests", 0)
-        
-        if reserved_guests + data.guests > total_capacity:
-            remaining = max(0, total_capacity - reserved_guests)
-            raise ValueError(f"Only {remaining} seats available")
-        
-        transaction.update(capacity_ref, {
-            "reserved_guests": Increment(data.guests)
-        })
-        
-        transaction.set(new_reservation_ref, reservation_data)
-        return new_reservation_ref.id
+    reservation_data["search_keys"] = search_keys(reservation_data)
     
     try:
-        reservation_id = create_reservation_transaction(transaction)
-        
-        # Queue email
-        background_tasks.add_task(
-            send_confirmation_email,
-            email=data.email,
-            name=name,
-            reservation_id=reservation_id,
-            **reservation_data
+        reservation_id = await create_booking(
+            db, reservation_data,
+            idempotency_key=idempotency_key,
+            fingerprint=request_fingerprint(data.model_dump()),
+            hold_id=data.hold_id
         )
-        
         return {"message": "Reservation confirmed", "reservation_id": reservation_id}
         
+    except BookingContention as e:
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": "1"})
+    except IdempotencyKeyReused as e:
+        raise HTTPException(status_code=422, detail=str(e))
+    except HoldMismatch as e:
+        raise HTTPException(status_code=409, detail=str(e))
     except ValueError as e:
+        # SoldOut, or no capacity set for the day
         raise HTTPException(status_code=400, detail=str(e))
 
 class ReservationUpdate(BaseModel):
@@ -131,6 +130,26 @@ class ReservationUpdate(BaseModel):
     # We restrict modification to these fields for simplicity
     # (changing restaurant requires cancelling and rebooking)
 
+# Declared before /reservations/{reservation_id} so "export" is not taken for an id
+@router.get("/reservations/export")
+async def export_reservations(
+    format: Literal["csv", "ndjson", "xlsx"] = "csv",
+    restaurant: Optional[str] = None,
+    from_date: Optional[str] = None,
+    to_date: Optional[str] = None,
+    user: dict = Depends(require_role("admin", "reception", "kitchen", "accounting"))
+):
+    """Stream every reservation in the date range as CSV, NDJSON or XLSX."""
+    db = get_db()
+    
+    return StreamingResponse(
+        export_chunks(db, format, restaurant, from_date, to_date),
+        media_type=EXPORT_FORMATS[format],
+        headers={
+            "Content-Disposition": f'attachment; filename="{export_filename(format, from_date, to_date)}"'
+        }
+    )
+
 @router.get("/reservations/{reservation_id}", response_model=ReservationResponse)
 async def get_reservation(
     reservation_id: str,
@@ -138,7 +157,7 @@ async def get_reservation(
 ):
     """Fetch a single reservation by ID."""
     db = get_db()
-    doc = db.collection("reservations").document(reservation_id).get()
+    doc = await db.collection("reservations").document(reservation_id).get()
     
     if not doc.exists:
         raise HTTPException(status_code=404, detail="Reservation not found")
@@ -150,82 +169,21 @@ async def get_reservation(
 async def update_reservation(
     reservation_id: str,
     payload: ReservationUpdate,
-    background_tasks: BackgroundTasks, # <-- Inject this
     user: dict = Depends(require_role("admin", "reception")) # Optional: restrict to staff or use guest token logic
 ):
     """
     Modify a reservation and send confirmation email.
     """
     db = get_db()
-    res_ref = db.collection("reservations").document(reservation_id)
     
-    @firestore.transactional
-    def update_transaction(transaction):
-        res_doc = res_ref.get(transaction=transaction)
-        if not res_doc.exists:
-            raise HTTPException(status_code=404, detail="Reservation not found")
-            
-        old_data = res_doc.to_dict()
-        restaurant = old_data.get('restaurant') or old_data.get('restaurantId')
-        old_date = old_data.get('date')
-        old_guests = int(old_data.get('guests'))
-        
-        new_date = payload.date
-        new_guests = payload.guests
-        
-        # 1. Capacity Logic (Swap dates if needed)
-        if old_date != new_date or old_guests != new_guests:
-            old_cap_ref = db.collection("capacities").document(f"{restaurant}_{old_date}")
-            new_cap_ref = db.collection("capacities").document(f"{restaurant}_{new_date}")
-            
-            new_cap_doc = new_cap_ref.get(transaction=transaction)
-            
-            if not new_cap_doc.exists:
-                # Decide policy: Fail or Auto-create? Let's fail for safety in Admin mode
-                # Or you could allow it if you implement auto-capacity creation here
-                pass # Assuming capacity exists for simplicity
-                
-            # Basic decrement/increment logic
-            if old_date != new_date:
-                transaction.update(old_cap_ref, {"reserved_guests": firestore.Increment(-old_guests)})
-                transaction.update(new_cap_ref, {"reserved_guests": firestore.Increment(new_guests)})
-            else:
-                diff = new_guests - old_guests
-                transaction.update(new_cap_ref, {"reserved_guests": firestore.Increment(diff)})
-                
-        # 2. Update Reservation
-        transaction.update(res_ref, {
-            "date": new_date,
-            "time": payload.time,
-            "guests": new_guests,
-            "updated_at": SERVER_TIMESTAMP
-        })
-        
-        return old_data # Return old data to merge for email
-
     try:
-        # Run transaction
-        old_data = update_transaction(transaction)
-        
-        # Merge old data with new payload for the email context
-        email_data = old_data.copy()
-        email_data.update({
-            "date": payload.date,
-            "time": payload.time,
-            "guests": payload.guests
-        })
-        
-        # Queue the email
-        background_tasks.add_task(
-            send_confirmation_email,
-            email=email_data['email'],
-            name=email_data['name'],
-            reservation_id=reservation_id,
-            **email_data
-        )
-        
+        await modify_booking(db, reservation_id, payload.date, payload.time, payload.guests)
         return {"message": "Reservation updated and email sent"}
-    except Exception as e:
+    except ReservationNotFound:
+        raise HTTPException(status_code=404, detail="Reservation not found")
+    except BookingContention as e:
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": "1"})
+    except ValueError as e:
         raise HTTPException(status_code=400, detail=str(e))
 
 @router.get("/reservations", response_model=PaginatedReservations)
@@ -249,29 +207,40 @@ async def list_reservations(
     elif filters.from_date:
         query = query.where("date", ">=", filters.from_date)
     
-    query = query.order_by("date", direction=firestore.Query.DESCENDING)
+    # Name/room/email prefix search over the whole range, via the search_keys index
+    term = search_term(filters.search)
+    if term:
+        query = query.where("search_keys", "array_contains", term)
     
-    # Cursor-based pagination
-    if filters.last_id:
-        last_doc_ref = db.collection("reservations").document(filters.last_id)
-        last_doc = last_doc_ref.get()
-        if last_doc.exists:
-            query = query.start_after(last_doc)
+    # Total for the filter combination (aggregation query, briefly cached)
+    total_items = None
+    if filters.include_total:
+        count_key = (filters.restaurant, filters.date, filters.from_date, filters.to_date, term)
+        total_items = await count_cache.count(count_key, query)
     
-    # Apply limit
-    query = query.limit(filters.limit)
+    # Document id breaks ties between reservations on the same date
+    query = (query
+        .order_by("date", direction=firestore.Query.DESCENDING)
+        .order_by(FieldPath.document_id(), direction=firestore.Query.DESCENDING))
     
-    # Execute query
-    docs = list(query.stream())
+    # Cursor-based pagination: the cursor carries the last row's (date, id),
+    # so no document has to be read to resume
+    if filters.cursor:
+        try:
+            last_date, last_id = decode_cursor(filters.cursor, 2)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        query = query.start_after({"date": last_date, FieldPath.document_id(): last_id})
+    elif filters.last_id:
+        # Legacy cursor: costs one extra read
+        last_doc = await db.collection("reservations").document(filters.last_id).get()
+        if last_doc.exists:
+            query = query.start_after(last_doc)
     
-    # In-memory search filter (if needed, as Firestore doesn't support full-text search)
-    if filters.search:
-        search_lower = filters.search.lower()
-        docs = [
-            doc for doc in docs
-            if search_lower in str(doc.to_dict().get("name", "")).lower()
-            or search_lower in str(doc.to_dict().get("room", "")).lower()
-        ]
+    # One extra row tells whether there is a next page
+    docs = await query.limit(filters.limit + 1).get()
+    has_next = len(docs) > filters.limit
+    docs = docs[:filters.limit]
     
     # Format
     reservations = [
@@ -279,18 +248,19 @@ async def list_reservations(
         for doc in docs
     ]
     
-    # Determine next_last_id for cursor-based pagination
-    next_last_id = reservations[-1].id if reservations else None
+    next_cursor = None
+    if has_next:
+        next_cursor = encode_cursor(docs[-1].get("date"), docs[-1].id)
     
-    # For total_items and total_pages, a separate count query would be needed for true server-side pagination.
-    # For simplicity, we'll return a basic pagination info.
     return PaginatedReservations(
         items=reservations,
         pagination={
             "current_page_items": len(reservations),
             "per_page": filters.limit,
-            "next_last_id": next_last_id,
-            "has_next": len(docs) == filters.limit # If we got 'limit' items, there might be more
+            "next_last_id": reservations[-1].id if reservations else None,
+            "next_cursor": next_cursor,
+            "has_next": has_next,
+            "total_items": total_items
         }
     )
 
@@ -302,29 +272,11 @@ async def cancel_reservation(
     """Cancel a reservation (admin only)."""
     db = get_db()
     
-    doc_ref = db.collection("reservations").document(reservation_id)
-    doc = doc_ref.get()
-    
-    if not doc.exists:
+    try:
+        await cancel_booking(db, reservation_id)
+    except ReservationNotFound:
         raise HTTPException(status_code=404, detail="Reservation not found")
-    
-    data = doc.to_dict()
-    
-    # Update capacity
-    capacity_key = f"{data['restaurant']}_{data['date']}"
-    capacity_ref = db.collection("capacities").document(capacity_key)
-    
-    transaction = db.transaction()
-    
-    @firestore.transactional
-    def cancel_transaction(transaction):
-        capacity_doc = capacity_ref.get(transaction=transaction)
-        if capacity_doc.exists:
-            transaction.update(capacity_ref, {
-                "reserved_guests": Increment(-int(data.get("guests", 0)))
-            })
-        transaction.delete(doc_ref)
-    
-    cancel_transaction(transaction)
+    except BookingContention as e:
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": "1"})
     
     return {"message": "Reservation cancelled"}
@@ -1,7 +1,9 @@
 # backend/app/api/v1/endpoints/restaurants.py
-from fastapi import APIRouter, HTTPException, Depends
+from fastapi import APIRouter, HTTPException, Depends, Request
 from typing import List
 from app.services.firestore import get_db
+from app.services.availability import availability_index
+from app.services.catalog import restaurant_catalog
 from app.models.restaurant import Restaurant
 from app.api.deps import require_role # Import security dependency
 
@@ -9,24 +11,18 @@ router = APIRouter()
 
 # 1. GET ALL (Public)
 @router.get("/", response_model=List[Restaurant])
-async def get_restaurants():
-    """Get all active restaurants."""
-    db = get_db()
-    # Fetch all, frontend can filter by isActive if needed, 
+async def get_restaurants(request: Request):
+    """Get all restaurants (cached, with an ETag for 304 revalidation)."""
+    # All of them: frontend can filter by isActive if needed,
     # or admin needs to see inactive ones too.
-    docs = db.collection("restaurants").order_by("order").stream()
-    
-    results = []
-    for doc in docs:
-        results.append(doc.to_dict())
-    return results
+    return await restaurant_catalog.respond(get_db(), request)
 
 # 2. GET ONE (Public)
 @router.get("/{restaurant_id}", response_model=Restaurant)
 async def get_restaurant(restaurant_id: str):
     """Get details for a specific restaurant."""
     db = get_db()
-    doc = db.collection("restaurants").document(restaurant_id).get()
+    doc = await db.collection("restaurants").document(restaurant_id).get()
     
     if not doc.exists:
         raise HTTPException(status_code=404, detail="Restaurant not found")
@@ -40,10 +36,12 @@ async def create_restaurant(restaurant: Restaurant):
     db = get_db()
     
     doc_ref = db.collection("restaurants").document(restaurant.id)
-    if doc_ref.get().exists:
+    if (await doc_ref.get()).exists:
         raise HTTPException(status_code=400, detail="Restaurant ID already exists")
     
-    doc_ref.set(restaurant.model_dump())
+    await doc_ref.set(restaurant.model_dump())
+    restaurant_catalog.invalidate()
+    availability_index.invalidate()
     return {"message": "Restaurant created successfully", "id": restaurant.id}
 
 # 4. UPDATE (Admin Only)
@@ -53,11 +51,13 @@ async def update_restaurant(restaurant_id: str, restaurant: Restaurant):
     db = get_db()
     
     doc_ref = db.collection("restaurants").document(restaurant_id)
-    if not doc_ref.get().exists:
+    if not (await doc_ref.get()).exists:
         raise HTTPException(status_code=404, detail="Restaurant not found")
     
     # Update the document
-    doc_ref.set(restaurant.model_dump())
+    await doc_ref.set(restaurant.model_dump())
+    restaurant_catalog.invalidate()
+    availability_index.invalidate()
     return {"message": "Restaurant updated successfully"}
 
 # 5. DELETE (Admin Only)
@@ -65,5 +65,7 @@ async def update_restaurant(restaurant_id: str, restaurant: Restaurant):
 async def delete_restaurant(restaurant_id: str):
     """Delete a restaurant."""
     db = get_db()
-    db.collection("restaurants").document(restaurant_id).delete()
+    await db.collection("restaurants").document(restaurant_id).delete()
+    restaurant_catalog.invalidate()
+    availability_index.invalidate()
     return {"message": "Restaurant deleted successfully"}
@@ -1,23 +1,29 @@
-from fastapi import APIRouter, Depends, HTTPException, Request, BackgroundTasks
-from firebase_admin import firestore
+from fastapi import APIRouter, Depends, HTTPException, Request
+from firebase_admin import firestore, firestore_async
+from google.api_core.exceptions import AlreadyExists
 from google.cloud.firestore_v1 import SERVER_TIMESTAMP
-from datetime import datetime, timedelta, time as dt_time
-import secrets
+from datetime import timedelta
 
 from app.api.deps import require_role
-from app.services.email import send_review_request_email
 from app.services.firestore import get_db
+from app.services.review_requests import (
+    REVIEW_TOKENS_COLLECTION,
+    dispatch_review_requests,
+    review_token_record
+)
+from app.services.stats import REVIEW_STATS_COLLECTION, merge_review_stats, stage_review_stats
+from app.utils.datetime import get_local_now
 from app.core.config import settings
 from typing import Optional
 
 router = APIRouter()
 
-def generate_review_token():
-    return secrets.token_urlsafe(24)
-
 @router.post("/tasks/send-review-requests")
-async def send_review_requests(request: Request, background_tasks: BackgroundTasks):
-    """Cron job to send review emails for yesterday's reservations."""
+async def send_review_requests(request: Request, date: Optional[str] = None):
+    """
+    Cron job to send review emails for yesterday's reservations.
+    Pass `date` (YYYY-MM-DD) to re-run or resume the job for another dinner date.
+    """
     # This endpoint should be protected by a cron secret or similar mechanism
     # For now, we'll assume it's called internally or by a trusted cron service
     # if not require_cron_secret():
@@ -25,50 +31,15 @@ async def send_review_requests(request: Request, background_tasks: BackgroundTas
     
     db = get_db()
     
-    now_local = datetime.now(tz=settings.LOCAL_TIMEZONE)
-    yesterday = (now_local - timedelta(days=1)).date()
-    yesterday_str = yesterday.isoformat()
-    
-    query = (db.collection("reservations")
-        .where("status", "==", "confirmed")
-        .where("review.requestSent", "==", False)
-        .where("date", "==", yesterday_str))
+    if date is None:
+        now_local = get_local_now(settings.LOCAL_TIMEZONE)
+        date = (now_local - timedelta(days=1)).date().isoformat()
     
-    batch = db.batch()
-    sent = 0
-    failures = []
-    
-    for doc in query.stream():
-        data = doc.to_dict()
-        email = data.get("email")
-        name = data.get("name")
-        restaurant = data.get("restaurantId")
-        
-        if not email or not restaurant:
-            continue
-        
-        token = generate_review_token()
-        
-        try:
-            # Use background_tasks for sending email
-            background_tasks.add_task(send_review_request_email, email, name, restaurant, token)
-            batch.update(doc.reference, {
-                "review.requestSent": True,
-                "review.requestSentAt": SERVER_TIMESTAMP,
-                "review.token": token
-            })
-            sent += 1
-        except Exception as e:
-            failures.append({"id": doc.id, "error": str(e)})
-    
-    if sent > 0:
-        batch.commit() # Use await for async batch commit
-    
-    return {"sent": sent, "failed": failures}
+    return await dispatch_review_requests(db, date)
 
 @router.post("/reviews/submit")
 async def submit_review(payload: dict):
-    """Submit a review."""
+    """Submit a review: reads of the token and its reservation, and one commit."""
     db = get_db()
     
     token = payload.get("token")
@@ -78,81 +49,97 @@ async def submit_review(payload: dict):
     if not token or not isinstance(rating, int) or rating < 1 or rating > 10:
         raise HTTPException(status_code=400, detail="Invalid input")
     
-    # Find reservation
-    res_query = db.collection("reservations").where("review.token", "==", token).limit(1)
-    res_docs = list(res_query.stream())
+    token_ref = db.collection(REVIEW_TOKENS_COLLECTION).document(token)
+    today = get_local_now(settings.LOCAL_TIMEZONE).strftime("%Y-%m-%d")
     
-    if not res_docs:
-        raise HTTPException(status_code=404, detail="Invalid token")
+    @firestore_async.async_transactional
+    async def submit_transaction(transaction):
+        token_doc = await token_ref.get(transaction=transaction)
+        if not token_doc.exists:
+            return None
+        
+        token_data = token_doc.to_dict()
+        
+        # Check if already reviewed (concurrent double-submits serialize on the token doc)
+        if token_data.get("used"):
+            return False
+        
+        # A reservation deleted since the email went out still takes the review
+        reservation_ref = db.collection("reservations").document(token_data["reservationId"])
+        reservation_doc = await reservation_ref.get(transaction=transaction)
+        
+        # Save review, mark the reservation and token and count the rating together
+        transaction.set(db.collection("restaurant_reviews").document(), {
+            "reservationId": token_data.get("reservationId"),
+            "restaurantId": token_data.get("restaurantId"),
+            "rating": rating,
+            "comment": comment,
+            "createdAt": SERVER_TIMESTAMP,
+            "guestName": token_data.get("guestName"),
+            "guestEmail": token_data.get("guestEmail"),
+            "room": token_data.get("room"),
+            "dinnerDate": token_data.get("dinnerDate")
+        })
+        
+        if reservation_doc.exists:
+            transaction.update(reservation_ref, {
+                "review.received": True,
+                "review.receivedAt": SERVER_TIMESTAMP
+            })
+        transaction.update(token_ref, {"used": True, "usedAt": SERVER_TIMESTAMP})
+        stage_review_stats(transaction, db, token_data.get("restaurantId"), today, rating)
+        return True
     
-    res_doc = res_docs[0]
-    res_data = res_doc.to_dict()
+    submitted = await submit_transaction(db.transaction())
     
-    # Check if already reviewed
-    if res_data.get("review", {}).get("received"):
-        return {"message": "Already reviewed"}
+    if submitted is None and await _create_legacy_review_token(db, token):
+        # Links sent before review_tokens existed: create the doc once, then submit normally
+        submitted = await submit_transaction(db.transaction())
     
-    # Save review
-    db.collection("restaurant_reviews").add({
-        "reservationId": res_doc.id,
-        "restaurantId": res_data.get("restaurantId"),
-        "rating": rating,
-        "comment": comment,
-        "createdAt": SERVER_TIMESTAMP,
-        "guestName": res_data.get("name"),
-        "guestEmail": res_data.get("email"),
-        "room": res_data.get("room"),
-        "dinnerDate": res_data.get("date")
-    })
-    
-    # Update reservation
-    res_doc.reference.update({
-        "review.received": True,
-        "review.receivedAt": SERVER_TIMESTAMP
-    })
+    if submitted is None:
+        raise HTTPException(status_code=404, detail="Invalid token")
+    if not submitted:
+        return {"message": "Already reviewed"}
     
     return {"message": "Review submitted"}
 
+async def _create_legacy_review_token(db, token: str) -> bool:
+    """Create the review_tokens doc for a token that only exists on its reservation."""
+    res_docs = await db.collection("reservations").where("review.token", "==", token).limit(1).get()
+    if not res_docs:
+        return False
+    
+    token_ref = db.collection(REVIEW_TOKENS_COLLECTION).document(token)
+    try:
+        # create(), not set(): a token doc written meanwhile (by another request,
+        # or by a submission that already marked it used) must not be reset
+        await token_ref.create(review_token_record(res_docs[0].id, res_docs[0].to_dict()))
+    except AlreadyExists:
+        # The transaction will read the existing doc
+        pass
+    return True
+
 @router.get("/reviews/summary")
 async def get_reviews_summary(
     restaurantId: str,
     period_days: int = 30,
     user: dict = Depends(require_role("admin"))
 ):
-    """Get review statistics."""
+    """Get review statistics for the last `period_days` days (today included)."""
     db = get_db()
     
     # Calculate date range
-    end_date = datetime.now()
-    start_date = end_date - timedelta(days=period_days)
+    end_date = get_local_now(settings.LOCAL_TIMEZONE)
+    start_date = end_date - timedelta(days=max(period_days, 1) - 1)
     
-    # In a real app, you would filter by date field in Firestore
-    # For MVP, we will fetch and filter in memory or usage simple queries
-    docs = db.collection("restaurant_reviews")\
+    # One small bucket per day, however many reviews were written
+    docs = await db.collection(REVIEW_STATS_COLLECTION)\
         .where("restaurantId", "==", restaurantId)\
-        .stream()
-        
-    total_rating = 0
-    count = 0
-    histogram = {i: 0 for i in range(1, 11)}
+        .where("date", ">=", start_date.strftime("%Y-%m-%d"))\
+        .where("date", "<=", end_date.strftime("%Y-%m-%d"))\
+        .get()
     
-    for doc in docs:
-        data = doc.to_dict()
-        # Ideally check date here
-        rating = data.get("rating", 0)
-        
-        total_rating += rating
-        count += 1
-        if 1 <= rating <= 10:
-            histogram[rating] += 1
-            
-    avg = (total_rating / count) if count > 0 else 0
-    
-    return {
-        "count": count,
-        "avg": round(avg, 1),
-        "histogram": histogram
-    }
+    return merge_review_stats(doc.to_dict() for doc in docs)
 
 @router.get("/reviews/log")
 async def get_reviews_log(
@@ -171,7 +158,7 @@ async def get_reviews_log(
     docs = query.stream()
     
     items = []
-    for doc in docs:
+    async for doc in docs:
         data = doc.to_dict()
         data['id'] = doc.id
         # Convert timestamp to string for JSON
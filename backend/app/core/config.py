@@ -1,6 +1,6 @@
 
 from pydantic_settings import BaseSettings
-from typing import List
+from typing import Dict, List
 
 class Settings(BaseSettings):
     # Firebase
@@ -28,6 +28,73 @@ class Settings(BaseSettings):
     # Timezone
     LOCAL_TIMEZONE: str = "Africa/Cairo"
     
+    # Email outbox worker (Mailgun)
+    EMAIL_OUTBOX_WORKER_ENABLED: bool = True  # False when a separate email_worker.py process drains it
+    EMAIL_WORKERS: int = 4
+    EMAIL_RATE_PER_SECOND: float = 5.0
+    EMAIL_MAX_ATTEMPTS: int = 5
+    EMAIL_BACKOFF_BASE_SECONDS: int = 30
+    EMAIL_POLL_INTERVAL_SECONDS: float = 5.0
+    
+    # Capacity: restaurants whose daily capacity is split across N counter
+    # shards to spread booking contention, e.g. {"Italian": 8}
+    CAPACITY_SHARDS: Dict[str, int] = {}
+    
+    # Availability index: max age of the in-process capacity cache
+    AVAILABILITY_CACHE_TTL_SECONDS: int = 60
+    
+    # Guest list cache for VIP detection (rooms kept in memory; the snapshot
+    # listener keeps it current when other instances upload a list)
+    GUEST_LIST_CACHE_MAX_ENTRIES: int = 50000
+    GUEST_LIST_LISTENER_ENABLED: bool = True
+    
+    # Public catalogs (GET /restaurants, GET /config): server-side cache age
+    # and the max-age sent to browsers/CDN, which revalidate with the ETag
+    CATALOG_CACHE_TTL_SECONDS: int = 300
+    CATALOG_MAX_AGE_SECONDS: int = 60
+    
+    # Booking engine: transaction attempts under contention, the full-jitter
+    # backoff between them, and how old the availability index's copy of a
+    # day may be for a booking to be refused as sold out without a transaction
+    BOOKING_MAX_ATTEMPTS: int = 5
+    BOOKING_RETRY_BASE_SECONDS: float = 0.05
+    BOOKING_RETRY_MAX_SECONDS: float = 1.0
+    BOOKING_SOLD_OUT_MAX_AGE_SECONDS: float = 5.0
+    
+    # Idempotency-Key on POST /reservations: how long a key's doc is kept
+    # (the idempotency collection's TTL policy deletes it after expires_at)
+    # and how many recent keys each instance remembers without a read
+    IDEMPOTENCY_TTL_HOURS: int = 24
+    IDEMPOTENCY_CACHE_MAX_ENTRIES: int = 10000
+    
+    # Seat holds (POST /holds): how long seats are held for a guest filling in
+    # the booking form, and how the sweeper returns expired holds' seats
+    HOLD_TTL_SECONDS: int = 600
+    HOLD_SWEEPER_ENABLED: bool = True
+    HOLD_SWEEP_INTERVAL_SECONDS: float = 30.0
+    HOLD_SWEEP_BATCH_SIZE: int = 100
+    # Unexpired holds one room may have at once
+    HOLD_MAX_PER_ROOM: int = 2
+    
+    # Rollup outbox: events applied per transaction (each costs its delete plus
+    # one write per rollup doc it touches, within the 500-write limit) and how
+    # often the worker looks for events when no booking wakes it
+    ROLLUP_WORKER_ENABLED: bool = True
+    ROLLUP_BATCH_SIZE: int = 100
+    ROLLUP_INTERVAL_SECONDS: float = 5.0
+    
+    # Reservation list: how long a count() total is reused per filter combination
+    COUNT_CACHE_TTL_SECONDS: int = 30
+    
+    # Auth: verified ID tokens are cached until they expire; the revocation
+    # check (a Firebase Auth round-trip) is repeated at most this often
+    AUTH_TOKEN_CACHE_MAX_ENTRIES: int = 10000
+    AUTH_REVOCATION_CHECK_SECONDS: int = 300
+    
+    # Metrics: Prometheus /metrics endpoint, per-route latency and the
+    # Firestore operation counters kept by get_db()'s wrapper
+    METRICS_ENABLED: bool = True
+    
     # Rate Limiting
     RATE_LIMIT_PER_MINUTE: int = 60
     
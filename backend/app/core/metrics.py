@@ -0,0 +1,135 @@
+import time
+from contextvars import ContextVar
+from typing import Dict, Optional, Tuple
+
+from prometheus_client import Counter, Histogram
+from starlette.routing import Match
+
+FIRESTORE_OPERATIONS = ("read", "write", "transaction_retry")
+
+REQUEST_LATENCY = Histogram(
+    "http_request_duration_seconds",
+    "Time to the last response byte, by route template",
+    ["method", "route", "status"],
+    buckets=(0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+)
+FIRESTORE_OPERATIONS_TOTAL = Counter(
+    "firestore_operations_total",
+    "Firestore document reads, writes and transaction retries, by the route that caused them",
+    ["route", "operation"]
+)
+FIRESTORE_OPERATIONS_PER_REQUEST = Histogram(
+    "http_request_firestore_operations",
+    "Firestore operations performed by one request",
+    ["route", "operation"],
+    buckets=(0, 1, 2, 5, 10, 25, 50, 100, 250, 500, 1000)
+)
+EMAIL_SEND_LATENCY = Histogram(
+    "email_send_duration_seconds",
+    "Mailgun send latency, successful or not",
+    ["kind"],
+    buckets=(0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+)
+EMAIL_SEND_FAILURES = Counter(
+    "email_send_failures_total",
+    "Failed Mailgun sends, by HTTP status or exception type",
+    ["kind", "reason"]
+)
+
+BOOKING_ATTEMPTS = Histogram(
+    "booking_transaction_attempts",
+    "Transaction attempts a successful booking operation needed",
+    ["operation"],
+    buckets=(1, 2, 3, 4, 5, 8)
+)
+BOOKING_RETRIES = Counter(
+    "booking_transaction_retries_total",
+    "Booking transactions retried after contention",
+    ["operation"]
+)
+BOOKING_CONTENTION_FAILURES = Counter(
+    "booking_contention_failures_total",
+    "Booking operations that ran out of attempts under contention",
+    ["operation"]
+)
+BOOKING_SOLD_OUT = Counter(
+    "booking_sold_out_total",
+    "Bookings refused for lack of seats, from the availability cache or inside the transaction",
+    ["operation", "source"]
+)
+HOLDS = Counter(
+    "booking_holds_total",
+    "Seat holds placed, converted into reservations, released by the guest or expired",
+    ["outcome"]
+)
+IDEMPOTENT_REPLAYS = Counter(
+    "booking_idempotent_replays_total",
+    "Retried bookings answered with the reservation their Idempotency-Key already created",
+    ["source"]
+)
+
+# Route template and per-request operation counts of the request being served;
+# unset for work outside a request (outbox worker, startup warmup)
+_current_request: ContextVar[Optional[Tuple[str, Dict[str, int]]]] = ContextVar("current_request", default=None)
+
+
+def record_firestore(operation: str, count: int = 1):
+    """Attribute `count` Firestore operations to the current request's route."""
+    if not count:
+        return
+    current = _current_request.get()
+    route = current[0] if current else "background"
+    FIRESTORE_OPERATIONS_TOTAL.labels(route, operation).inc(count)
+    if current:
+        current[1][operation] = current[1].get(operation, 0) + count
+
+
+def route_template(scope) -> str:
+    """The path template of the route `scope` will be dispatched to, e.g. /api/v1/reservations/{id}."""
+    for route in scope["app"].routes:
+        match, _ = route.matches(scope)
+        if match != Match.NONE:
+            return route.path
+    return "unmatched"
+
+
+class MetricsMiddleware:
+    """
+    Records request latency and per-request Firestore operations by route
+    template. Plain ASGI rather than BaseHTTPMiddleware so streaming
+    responses are timed to their last byte and not buffered.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        route = route_template(scope)
+        operations: Dict[str, int] = {}
+        token = _current_request.set((route, operations))
+        started = time.perf_counter()
+        status = 500
+        finished = None
+
+        async def send_and_observe(message):
+            nonlocal status, finished
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            elif message["type"] == "http.response.body" and not message.get("more_body"):
+                # Background tasks run after this and are not part of the latency
+                finished = time.perf_counter()
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_and_observe)
+        finally:
+            REQUEST_LATENCY.labels(scope["method"], route, str(status)).observe(
+                (finished or time.perf_counter()) - started
+            )
+            for operation in FIRESTORE_OPERATIONS:
+                FIRESTORE_OPERATIONS_PER_REQUEST.labels(route, operation).observe(operations.get(operation, 0))
+            _current_request.reset(token)
@@ -0,0 +1,69 @@
+import json
+import os
+import subprocess
+import sys
+from pathlib import Path
+from typing import Dict, List, NamedTuple, Optional
+
+BACKEND_DIR = Path(__file__).resolve().parents[2]
+
+# Loaded on demand by the guest-list upload and the xlsx export; a cold start
+# that imports any of them has regressed
+DEFERRED_MODULES = ("pandas", "numpy", "openpyxl")
+
+
+class ImportTiming(NamedTuple):
+    module: str
+    self_seconds: float
+    cumulative_seconds: float
+    depth: int
+
+
+def parse_importtime(output: str) -> List[ImportTiming]:
+    """The rows of `python -X importtime` stderr output, in import order."""
+    timings = []
+    for line in output.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        timings.append(ImportTiming(
+            module=name.strip(),
+            self_seconds=int(self_us) / 1e6,
+            cumulative_seconds=int(cumulative_us) / 1e6,
+            depth=(len(name) - len(name.lstrip()) - 1) // 2
+        ))
+    return timings
+
+
+def _run(code: str, env: Optional[Dict[str, str]], *flags: str) -> subprocess.CompletedProcess:
+    return subprocess.run(
+        [sys.executable, *flags, "-c", code],
+        cwd=BACKEND_DIR,
+        env={**os.environ, **(env or {})},
+        capture_output=True,
+        text=True,
+        check=True
+    )
+
+
+def profile_imports(module: str = "app.main", env: Optional[Dict[str, str]] = None) -> List[ImportTiming]:
+    """Import `module` in a fresh interpreter under -X importtime."""
+    result = _run(f"import {module}", env, "-X", "importtime")
+    return parse_importtime(result.stderr)
+
+
+def cold_import(module: str = "app.main", env: Optional[Dict[str, str]] = None) -> dict:
+    """
+    Wall-clock time to import `module` in a fresh interpreter, without the
+    overhead of -X importtime, and which of DEFERRED_MODULES it pulled in.
+    """
+    code = (
+        "import json, sys, time\n"
+        "started = time.perf_counter()\n"
+        f"import {module}\n"
+        "print(json.dumps({\n"
+        "    'seconds': time.perf_counter() - started,\n"
+        f"    'deferred_loaded': [m for m in {DEFERRED_MODULES!r} if m in sys.modules]\n"
+        "}))"
+    )
+    return json.loads(_run(code, env).stdout.strip().splitlines()[-1])
@@ -1,3 +1,76 @@
 # This file can be used for security-related utilities,
 # such as password hashing, token generation, etc.
 # For now, Firebase Admin SDK handles most authentication.
+import asyncio
+import hashlib
+import time
+from collections import OrderedDict
+from typing import Optional, Tuple
+
+from firebase_admin import auth as admin_auth
+
+from app.core.config import settings
+
+
+class VerifiedTokenCache:
+    """
+    Verified Firebase ID tokens keyed by their SHA-256, so repeat requests
+    with the same token skip verification.
+
+    An entry lives until the token's `exp`. The revocation check (a network
+    call to Firebase Auth) is re-run once an entry is older than
+    `revocation_check_seconds`; 0 checks on every request. The signing certs
+    are cached by the Admin SDK itself, per their Cache-Control headers.
+    """
+
+    def __init__(self, max_entries: int, revocation_check_seconds: float):
+        self.max_entries = max_entries
+        self.revocation_check_seconds = revocation_check_seconds
+        self.hits = 0
+        self.misses = 0
+        # token hash -> (decoded claims, exp, monotonic time of the revocation check)
+        self._entries: "OrderedDict[str, Tuple[dict, float, float]]" = OrderedDict()
+
+    @staticmethod
+    def _key(id_token: str) -> str:
+        return hashlib.sha256(id_token.encode()).hexdigest()
+
+    def _cached(self, key: str) -> Optional[dict]:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+
+        decoded, exp, checked_at = entry
+        if time.time() >= exp or time.monotonic() - checked_at >= self.revocation_check_seconds:
+            del self._entries[key]
+            return None
+
+        self._entries.move_to_end(key)
+        return decoded
+
+    async def verify(self, id_token: str) -> dict:
+        """Decoded claims of `id_token`; raises the Admin SDK's errors if it is invalid or revoked."""
+        key = self._key(id_token)
+        decoded = self._cached(key)
+        if decoded is not None:
+            self.hits += 1
+            return decoded
+
+        self.misses += 1
+        # Blocking (network) call: keep it off the event loop
+        decoded = await asyncio.to_thread(admin_auth.verify_id_token, id_token, check_revoked=True)
+
+        self._entries[key] = (decoded, float(decoded.get("exp", 0)), time.monotonic())
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+        return decoded
+
+    def clear(self):
+        self._entries.clear()
+
+
+token_cache = VerifiedTokenCache(
+    max_entries=settings.AUTH_TOKEN_CACHE_MAX_ENTRIES,
+    revocation_check_seconds=settings.AUTH_REVOCATION_CHECK_SECONDS
+)
@@ -1,6 +1,9 @@
+import time
+_process_started = time.perf_counter()
+
 from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, Response
 import firebase_admin
 from firebase_admin import credentials
 import os
@@ -8,14 +11,23 @@ from contextlib import asynccontextmanager
 
 from app.core.config import settings
 from app.core.exceptions import AppException
+from app.core.metrics import MetricsMiddleware
 from app.api.v1 import api_router
-# from prometheus_fastapi_instrumentator import Instrumentator
+from app.services.email_outbox import email_outbox
+from app.services.holds import hold_sweeper
+from app.services.rollups import rollup_worker
+from app.services.guest_list import guest_list_cache
+from app.services.warmup import warmup
+from prometheus_client import CONTENT_TYPE_LATEST, generate_latest
+
+# Module imports dominate cold starts; `python profile_startup.py` breaks them down
+_import_seconds = round(time.perf_counter() - _process_started, 3)
 
 # Lifespan context for startup/shutdown
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     # Startup
-    print("🚀 Starting up FastAPI application...")
+    print(f"🚀 Starting up FastAPI application (imported in {_import_seconds}s)...")
     
     # Initialize Firebase
     cred = credentials.Certificate("service-account.json")
@@ -24,10 +36,31 @@ async def lifespan(app: FastAPI):
     })
     print("✅ Firebase initialized")
     
+    if settings.EMAIL_OUTBOX_WORKER_ENABLED:
+        await email_outbox.start()
+        print("✅ Email outbox worker started")
+    
+    if settings.HOLD_SWEEPER_ENABLED:
+        await hold_sweeper.start()
+        print("✅ Seat hold sweeper started")
+    
+    if settings.ROLLUP_WORKER_ENABLED:
+        await rollup_worker.start()
+        print("✅ Rollup worker started")
+    
+    # Client, channel and caches; /ready turns 200 once done
+    warmup.start(_process_started, _import_seconds)
+    
     yield
     
     # Shutdown
     print("⬇️ Shutting down...")
+    await warmup.stop()
+    guest_list_cache.stop()
+    if settings.EMAIL_OUTBOX_WORKER_ENABLED:
+        await email_outbox.stop()
+    await hold_sweeper.stop()
+    await rollup_worker.stop()
 
 # Initialize FastAPI
 app = FastAPI(
@@ -37,7 +70,8 @@ app = FastAPI(
     lifespan=lifespan
 )
 
-# Instrumentator().instrument(app).expose(app)
+if settings.METRICS_ENABLED:
+    app.add_middleware(MetricsMiddleware)
 
 # CORS Middleware
 app.add_middleware(
@@ -45,7 +79,7 @@ app.add_middleware(
     allow_origins=settings.ALLOWED_ORIGINS,
     allow_credentials=True,
     allow_methods=["GET", "POST", "DELETE", "PATCH", "OPTIONS"],
-    allow_headers=["Authorization", "Content-Type"],
+    allow_headers=["Authorization", "Content-Type", "Idempotency-Key"],
 )
 
 # Custom exception handler
@@ -62,3 +96,16 @@ app.include_router(api_router, prefix="/api/v1")
 @app.get("/health")
 async def health_check():
     return {"status": "healthy", "version": "2.0.0"}
+
+@app.get("/metrics", include_in_schema=False)
+async def metrics():
+    """Prometheus scrape endpoint: route latency, Firestore operations, email sends."""
+    if not settings.METRICS_ENABLED:
+        return JSONResponse(status_code=404, content={"detail": "Not Found"})
+    return Response(content=generate_latest(), media_type=CONTENT_TYPE_LATEST)
+
+@app.get("/ready")
+async def readiness_check():
+    """503 until startup warmup has finished; point the startup probe here."""
+    status = warmup.status()
+    return JSONResponse(status_code=200 if status["ready"] else 503, content=status)
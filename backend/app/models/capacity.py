@@ -1,11 +1,26 @@
 from pydantic import BaseModel, Field
-from typing import Optional
+from typing import Dict, List, Optional
 
 class Capacity(BaseModel):
     restaurant: str = Field(..., min_length=1)
     date: str = Field(..., pattern=r"^\d{4}-\d{2}-\d{2}$")
     capacity: int = Field(..., ge=0)
     reserved_guests: int = Field(0, ge=0)
+    shard_count: int = Field(1, ge=1)
     
     class Config:
         from_attributes = True
+
+class CapacityTemplate(BaseModel):
+    """`weekday` seats a day, `weekend` on `weekend_days` (Monday is 0), for `days` days."""
+    restaurants: List[str] = Field(..., min_length=1)
+    from_date: str = Field(..., pattern=r"^\d{4}-\d{2}-\d{2}$")
+    days: int = Field(..., ge=1, le=366)
+    weekday: int = Field(..., ge=0)
+    weekend: int = Field(..., ge=0)
+    weekend_days: List[int] = [4, 5]
+
+class CapacityPlan(BaseModel):
+    # restaurant -> date -> capacity; wins over the templates
+    capacities: Dict[str, Dict[str, int]] = {}
+    templates: List[CapacityTemplate] = []
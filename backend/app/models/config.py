@@ -7,6 +7,8 @@ class RestaurantConfig(BaseModel):
     openingTime: str = Field("18:00", pattern=r"^\d{2}:\d{2}$")
     closingTime: str = Field("22:00", pattern=r"^\d{2}:\d{2}$")
     intervalMinutes: int = Field(30, ge=15, le=60)
+    # Pacing: max guests starting per time slot (None = only the daily capacity applies)
+    slotCapacity: Optional[int] = Field(None, ge=1)
     
     class Config:
         from_attributes = True
@@ -0,0 +1,15 @@
+from pydantic import BaseModel, Field
+from datetime import datetime
+
+class HoldCreate(BaseModel):
+    restaurant: str = Field(..., min_length=1)
+    date: str = Field(..., pattern=r"^\d{4}-\d{2}-\d{2}$")
+    time: str = Field(..., pattern=r"^\d{2}:\d{2}$")
+    guests: int = Field(..., ge=1, le=20)
+    # Checked against the guest list, as for reservations
+    room: str = Field(..., min_length=1, max_length=10)
+    last_name: str = Field(..., min_length=1, max_length=50)
+
+class HoldResponse(BaseModel):
+    hold_id: str
+    expires_at: datetime
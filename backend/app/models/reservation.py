@@ -15,6 +15,8 @@ class ReservationCreate(BaseModel):
     comments: Optional[str] = Field(None, max_length=500)
     upsell_items: Optional[Dict[str, int]] = {}
     upsell_total_price: Optional[float] = 0.0
+    # From POST /holds: the booking takes over the held seats
+    hold_id: Optional[str] = None
     
     @validator('main_courses')
     def validate_main_courses(cls, v, values):
@@ -57,14 +59,18 @@ class ReservationFilter(BaseModel):
     from_date: Optional[str] = None
     to_date: Optional[str] = None
     search: Optional[str] = None
-    last_id: Optional[str] = None
+    cursor: Optional[str] = None  # next_cursor of the previous page
+    last_id: Optional[str] = None  # legacy cursor (costs an extra read)
+    include_total: bool = False
 
 # ✅ New Class to define pagination structure strictly
 class PaginationMeta(BaseModel):
     current_page_items: int
     per_page: int
     next_last_id: Optional[str] = None # Allows String or None
+    next_cursor: Optional[str] = None  # Pass back as ?cursor= for the next page
     has_next: bool                     # Allows Boolean
+    total_items: Optional[int] = None  # Only with include_total=true
 
 class PaginatedReservations(BaseModel):
     items: List[ReservationResponse]
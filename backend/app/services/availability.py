@@ -0,0 +1,206 @@
+import asyncio
+import time
+from typing import Dict, List, Optional, Set, Tuple
+
+from app.core.config import settings
+from app.services.capacity import summarize_capacities
+from app.services.slots import SLOT_COUNTS_COLLECTION, slot_counts_ref, slot_grid, slot_settings
+from app.utils.datetime import get_local_now
+
+
+class AvailabilityIndex:
+    """
+    In-process index of capacity documents keyed by (restaurant, date), covering
+    today and every future date.
+
+    The whole index is reloaded with one query once it is older than the TTL.
+    In between, the reservation and capacity write paths call `invalidate()` for
+    the keys they touched, and only those documents are re-read on the next
+    lookup, so steady-state page loads cost no Firestore reads at all.
+
+    The slot_counts reports are indexed alongside. They are written only by the
+    rollup worker, which calls `invalidate_slots()` for the days it applied, and
+    each restaurant-day's slot grid is computed once and kept until either of
+    its docs is invalidated.
+    """
+
+    def __init__(self, ttl_seconds: float):
+        self.ttl_seconds = ttl_seconds
+        self._entries: Dict[Tuple[str, str], dict] = {}
+        self._slot_counts: Dict[Tuple[str, str], Dict[str, int]] = {}
+        self._grids: Dict[Tuple[str, str], List[dict]] = {}
+        # monotonic time each capacity entry was last read from Firestore
+        self._fetched_at: Dict[Tuple[str, str], float] = {}
+        self._stale: Set[Tuple[str, str]] = set()
+        self._stale_slots: Set[Tuple[str, str]] = set()
+        self._loaded_at: Optional[float] = None
+        self._loaded_from: Optional[str] = None
+        # bumped by every full invalidate(), to tell if one came in during a reload
+        self._generation = 0
+        self._lock = asyncio.Lock()
+
+    def invalidate(self, restaurant: Optional[str] = None, date: Optional[str] = None):
+        """Mark one capacity doc as stale, or drop the whole index if no key is given."""
+        if restaurant is None or date is None:
+            self._loaded_at = None
+            self._generation += 1
+        else:
+            self._stale.add((restaurant, date))
+
+    def invalidate_slots(self, restaurant: str, date: str):
+        """
+        Mark one slot_counts report as stale. Bookings only call invalidate():
+        their slot deltas reach the report when the rollup worker applies them,
+        so re-reading it right after a booking would cache the old counts.
+        """
+        self._stale_slots.add((restaurant, date))
+
+    async def _ensure_fresh(self, db, today: str):
+        async with self._lock:
+            expired = (
+                self._loaded_at is None
+                or self._loaded_from != today
+                or time.monotonic() - self._loaded_at > self.ttl_seconds
+            )
+            if expired:
+                # Keys invalidated from here on stay in _stale (and a full
+                # invalidate keeps the index expired), since the load below
+                # may have read their docs before the write that invalidated them
+                self._stale.clear()
+                self._stale_slots.clear()
+                generation = self._generation
+                docs = await db.collection("capacities").where("date", ">=", today).get()
+                entries = {}
+                for data in await summarize_capacities(db, docs):
+                    entries[(data["restaurant"], data["date"])] = data
+                counts_docs = await db.collection(SLOT_COUNTS_COLLECTION).where("date", ">=", today).get()
+                self._entries = entries
+                self._slot_counts = {
+                    (doc.get("restaurant"), doc.get("date")): doc.to_dict().get("reserved", {})
+                    for doc in counts_docs
+                }
+                self._grids = {}
+                loaded_at = time.monotonic()
+                self._loaded_at = loaded_at if generation == self._generation else None
+                self._fetched_at = dict.fromkeys(entries, loaded_at)
+                self._loaded_from = today
+                return
+
+            if self._stale:
+                stale = [key for key in self._stale if key[1] >= today]
+                self._stale.clear()
+                refs = [
+                    db.collection("capacities").document(f"{restaurant}_{date}")
+                    for restaurant, date in stale
+                ]
+                docs = [doc async for doc in db.get_all(refs)]
+                fetched_at = time.monotonic()
+                for key in stale:
+                    self._entries.pop(key, None)
+                    self._grids.pop(key, None)
+                    self._fetched_at[key] = fetched_at
+                for data in await summarize_capacities(db, [d for d in docs if d.exists]):
+                    self._entries[(data["restaurant"], data["date"])] = data
+
+            if self._stale_slots:
+                stale = [key for key in self._stale_slots if key[1] >= today]
+                self._stale_slots.clear()
+                counts_refs = [slot_counts_ref(db, restaurant, date) for restaurant, date in stale]
+                async for doc in db.get_all(counts_refs):
+                    key = tuple(doc.id.rsplit("_", 1))
+                    self._slot_counts[key] = doc.to_dict().get("reserved", {}) if doc.exists else {}
+                    self._grids.pop(key, None)
+
+    async def query(
+        self,
+        db,
+        restaurant: Optional[str] = None,
+        from_date: Optional[str] = None,
+        to_date: Optional[str] = None
+    ) -> List[dict]:
+        """
+        Capacity summaries filtered by restaurant and inclusive date range, sorted
+        by date then restaurant. Ranges reaching into the past go to Firestore.
+        """
+        today = get_local_now(settings.LOCAL_TIMEZONE).strftime("%Y-%m-%d")
+
+        if from_date and from_date < today:
+            query = db.collection("capacities").where("date", ">=", from_date)
+            if to_date:
+                query = query.where("date", "<=", to_date)
+            rows = await summarize_capacities(db, await query.get())
+        else:
+            await self._ensure_fresh(db, today)
+            rows = list(self._entries.values())
+
+        rows = [
+            row for row in rows
+            if (not restaurant or row.get("restaurant") == restaurant)
+            and (not from_date or row.get("date", "") >= from_date)
+            and (not to_date or row.get("date", "") <= to_date)
+        ]
+        return sorted(rows, key=lambda row: (row.get("date", ""), row.get("restaurant", "")))
+
+    def available(self, restaurant: str, date: str, max_age: float) -> Optional[int]:
+        """
+        Seats left on one restaurant-day, if the index read that capacity doc
+        within `max_age` seconds and nothing has invalidated it since; None
+        otherwise. Never reads Firestore, so the booking path can ask freely.
+        """
+        key = (restaurant, date)
+        fetched_at = self._fetched_at.get(key)
+        if (
+            self._loaded_at is None
+            or key in self._stale
+            or fetched_at is None
+            or time.monotonic() - fetched_at > max_age
+        ):
+            return None
+
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        return entry.get("capacity", 0) - entry.get("reserved_guests", 0)
+
+    async def slots(
+        self,
+        db,
+        restaurant: Optional[str] = None,
+        from_date: Optional[str] = None,
+        to_date: Optional[str] = None
+    ) -> List[dict]:
+        """
+        Like `query()`, with each restaurant-day's remaining seats per time slot
+        under "slots". Ranges reaching into the past go to Firestore.
+        """
+        today = get_local_now(settings.LOCAL_TIMEZONE).strftime("%Y-%m-%d")
+        days = await self.query(db, restaurant, from_date, to_date)
+        slot_config = await slot_settings(db)
+
+        if from_date and from_date < today:
+            refs = [slot_counts_ref(db, day["restaurant"], day["date"]) for day in days]
+            counts = {
+                tuple(doc.id.rsplit("_", 1)): doc.to_dict().get("reserved", {})
+                async for doc in db.get_all(refs) if doc.exists
+            }
+            grids = {}
+        else:
+            counts, grids = self._slot_counts, self._grids
+
+        rows = []
+        for day in days:
+            key = (day["restaurant"], day["date"])
+            if key not in grids:
+                grids[key] = slot_grid(day, counts.get(key, {}), slot_config.get(day["restaurant"]))
+            rows.append({
+                "restaurant": day["restaurant"],
+                "date": day["date"],
+                "capacity": day.get("capacity", 0),
+                "reserved_guests": day.get("reserved_guests", 0),
+                "available": max(0, day.get("capacity", 0) - day.get("reserved_guests", 0)),
+                "slots": grids[key]
+            })
+        return rows
+
+
+availability_index = AvailabilityIndex(ttl_seconds=settings.AVAILABILITY_CACHE_TTL_SECONDS)
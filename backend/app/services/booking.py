@@ -0,0 +1,409 @@
+import asyncio
+import random
+from typing import Awaitable, Callable, Optional, TypeVar
+
+from firebase_admin import firestore_async
+from google.api_core.exceptions import Aborted
+from google.cloud.firestore_v1 import SERVER_TIMESTAMP
+
+from app.core.config import settings
+from app.core.metrics import (
+    BOOKING_ATTEMPTS,
+    BOOKING_CONTENTION_FAILURES,
+    BOOKING_RETRIES,
+    BOOKING_SOLD_OUT,
+    HOLDS,
+    IDEMPOTENT_REPLAYS,
+    record_firestore
+)
+from app.services.availability import availability_index
+from app.services.capacity import CapacityLedger, SoldOut, capacity_ref, release_seats, reserve_seats
+from app.services.email import confirmation_message
+from app.services.email_outbox import email_outbox, stage_email
+from app.services.holds import HoldMismatch, check_hold_limit, hold_matches, hold_record, hold_ref
+from app.services.idempotency import (
+    idempotency_cache,
+    idempotency_record,
+    idempotency_ref,
+    replayed_reservation
+)
+from app.services.rollups import Rollups, rollup_worker
+from app.services.slots import SlotPacing, slot_limits
+
+T = TypeVar("T")
+
+# Every reservation write that moves seats goes through here: the capacity
+# docs and pacing counters change in the same transaction as the
+# reservation, and the daily, slot and kitchen prep rollups are queued as
+# rollup_outbox events in it. Transactions are retried with
+# jittered backoff rather than async_transactional's immediate re-run, which
+# under a rush for the last seats lines every contender straight up again.
+
+
+class BookingContention(Exception):
+    """The booking transaction kept colliding with others and ran out of attempts."""
+
+
+class ReservationNotFound(LookupError):
+    """The reservation to modify or cancel does not exist."""
+
+
+def restaurant_of(reservation: dict) -> str:
+    return reservation.get("restaurant") or reservation.get("restaurantId")
+
+
+def retry_delay(attempt: int) -> float:
+    """Full-jitter exponential backoff before retry number `attempt`."""
+    ceiling = min(settings.BOOKING_RETRY_MAX_SECONDS, settings.BOOKING_RETRY_BASE_SECONDS * 2 ** (attempt - 1))
+    return random.uniform(0, ceiling)
+
+
+async def run_transaction(db, operation: str, body: Callable[..., Awaitable[T]]) -> T:
+    """
+    Run `body(transaction)` in a transaction, retrying on contention up to
+    BOOKING_MAX_ATTEMPTS times. Raises BookingContention when they run out;
+    SoldOut and any other error from `body` are raised as is.
+    """
+    transactional = firestore_async.async_transactional(body)
+
+    for attempt in range(1, settings.BOOKING_MAX_ATTEMPTS + 1):
+        try:
+            # One attempt per transaction object; the retries are ours
+            result = await transactional(db.transaction(max_attempts=1))
+        except SoldOut:
+            BOOKING_SOLD_OUT.labels(operation, "transaction").inc()
+            raise
+        except ValueError as e:
+            # async_transactional reports an aborted commit as ValueError from Aborted
+            if not isinstance(e.__cause__, Aborted):
+                raise
+            if attempt == settings.BOOKING_MAX_ATTEMPTS:
+                BOOKING_CONTENTION_FAILURES.labels(operation).inc()
+                raise BookingContention(
+                    "Too many bookings for this date at once, please try again"
+                ) from e
+            BOOKING_RETRIES.labels(operation).inc()
+            record_firestore("transaction_retry")
+            await asyncio.sleep(retry_delay(attempt))
+        else:
+            BOOKING_ATTEMPTS.labels(operation).observe(attempt)
+            return result
+
+
+def fail_fast(operation: str, restaurant: str, date: str, guests: int, released: int = 0):
+    """
+    Refuse a booking the availability cache already knows cannot fit, before
+    any transaction is opened. `released` seats on the same day, given back by
+    the same operation, count as free. Anything else is left to the transaction.
+    """
+    available = availability_index.available(restaurant, date, settings.BOOKING_SOLD_OUT_MAX_AGE_SECONDS)
+    if available is not None and available + released < guests:
+        BOOKING_SOLD_OUT.labels(operation, "cache").inc()
+        raise SoldOut(f"Only {max(0, available + released)} seats available")
+
+
+async def release_reservation_seats(transaction, ledger: CapacityLedger, ref, reservation: dict):
+    """Stage the release of a reservation's seats, unless its capacity doc is gone."""
+    capacity_doc = await ref.get(transaction=transaction)
+    if capacity_doc.exists:
+        release_seats(
+            ledger, ref, int(reservation.get("guests", 0)), reservation.get("capacity_allocation"),
+            shard_count=int(capacity_doc.to_dict().get("shard_count", 1))
+        )
+
+
+async def create_booking(
+    db,
+    reservation_data: dict,
+    idempotency_key: Optional[str] = None,
+    fingerprint: str = "",
+    hold_id: Optional[str] = None
+) -> str:
+    """
+    Reserve the seats for a new reservation and write it, with its rollups and
+    confirmation email. Returns the reservation id. Raises SoldOut, ValueError
+    (no capacity set for the day) or BookingContention.
+
+    With an `idempotency_key`, a retry of a booking that already went through
+    (same key, same request `fingerprint`) returns the original reservation
+    id without booking again; the key's doc is written in the same
+    transaction as the reservation. Raises IdempotencyKeyReused if the key
+    came with a different request.
+
+    With a `hold_id`, the seats of that hold (see place_hold) become the
+    reservation's without touching the capacity doc. A hold that was already
+    swept is ignored and the seats are booked as usual; one for other seats
+    or placed by another room raises HoldMismatch.
+    """
+    restaurant = restaurant_of(reservation_data)
+    date, time, guests = reservation_data["date"], reservation_data["time"], int(reservation_data["guests"])
+
+    if idempotency_key:
+        # Retries usually come back within seconds: check before any transaction
+        replayed = idempotency_cache.lookup(idempotency_key, fingerprint)
+        if replayed:
+            IDEMPOTENT_REPLAYS.labels("cache").inc()
+            return replayed
+        key_ref = idempotency_ref(db, idempotency_key)
+        replayed = replayed_reservation((await key_ref.get()).to_dict(), fingerprint)
+        if replayed:
+            IDEMPOTENT_REPLAYS.labels("firestore").inc()
+            idempotency_cache.put(idempotency_key, replayed, fingerprint)
+            return replayed
+
+    if not hold_id:
+        # With a hold the day looks full to the index because of our own seats
+        fail_fast("create", restaurant, date, guests)
+
+    day_ref = capacity_ref(db, restaurant, date)
+    reservation_ref = db.collection("reservations").document()
+    limits = await slot_limits(db)
+
+    async def create_transaction(transaction):
+        if idempotency_key:
+            # A concurrent duplicate may have committed since the check above
+            replayed = replayed_reservation(
+                (await key_ref.get(transaction=transaction)).to_dict(), fingerprint
+            )
+            if replayed:
+                return replayed, False
+
+        hold = None
+        if hold_id:
+            hold_doc = await hold_ref(db, hold_id).get(transaction=transaction)
+            hold = hold_doc.to_dict() if hold_doc.exists else None
+            if hold and not hold_matches(hold, restaurant, date, time, guests, reservation_data.get("room")):
+                raise HoldMismatch("The seat hold is for a different room, restaurant, date, time or party size")
+
+        if hold:
+            # Already counted on the day and in the slot: the seats just change hands
+            allocation = hold.get("capacity_allocation") or {}
+            transaction.delete(hold_ref(db, hold_id))
+        else:
+            ledger = CapacityLedger()
+            pacing = SlotPacing(db, limits)
+            allocation = await reserve_seats(transaction, ledger, day_ref, guests, restaurant, date)
+            await pacing.reserve(transaction, restaurant, date, time, guests)
+            ledger.apply(transaction)
+            pacing.apply(transaction)
+
+        transaction.set(reservation_ref, {**reservation_data, "capacity_allocation": allocation})
+        rollups = Rollups()
+        rollups.add_reservation(reservation_data, 1, seats=not hold)
+        rollups.stage(transaction, db)
+        if idempotency_key:
+            transaction.set(key_ref, idempotency_record(reservation_ref.id, fingerprint))
+
+        # Queue the confirmation in the same commit so it survives restarts
+        stage_email(transaction, db, confirmation_message(
+            reservation_id=reservation_ref.id, **reservation_data
+        ))
+        return reservation_ref.id, bool(hold)
+
+    reservation_id, converted = await run_transaction(db, "create", create_transaction)
+    if idempotency_key:
+        idempotency_cache.put(idempotency_key, reservation_id, fingerprint)
+    if reservation_id != reservation_ref.id:
+        IDEMPOTENT_REPLAYS.labels("transaction").inc()
+        return reservation_id
+
+    if converted:
+        HOLDS.labels("converted").inc()
+    else:
+        availability_index.invalidate(restaurant, date)
+    email_outbox.wake()
+    rollup_worker.wake()
+    return reservation_id
+
+
+async def place_hold(db, restaurant: str, date: str, time: str, guests: int, room: str) -> dict:
+    """
+    Take `guests` seats at `time` for HOLD_TTL_SECONDS while the guest of
+    `room` fills in the rest of the booking, so the booking itself only has
+    to convert the hold. Returns {"hold_id", "expires_at"}. Raises SoldOut,
+    HoldLimitReached, ValueError (no capacity set for the day) or
+    BookingContention.
+    """
+    fail_fast("hold", restaurant, date, guests)
+
+    day_ref = capacity_ref(db, restaurant, date)
+    ref = hold_ref(db)
+    limits = await slot_limits(db)
+
+    async def hold_transaction(transaction):
+        await check_hold_limit(transaction, db, room)
+        ledger = CapacityLedger()
+        pacing = SlotPacing(db, limits)
+        allocation = await reserve_seats(transaction, ledger, day_ref, guests, restaurant, date)
+        await pacing.reserve(transaction, restaurant, date, time, guests)
+        ledger.apply(transaction)
+        pacing.apply(transaction)
+
+        record = hold_record(restaurant, date, time, guests, allocation, room)
+        transaction.set(ref, record)
+        rollups = Rollups()
+        rollups.add_slots(restaurant, date, {time: guests})
+        rollups.stage(transaction, db)
+        return record
+
+    record = await run_transaction(db, "hold", hold_transaction)
+    availability_index.invalidate(restaurant, date)
+    rollup_worker.wake()
+    HOLDS.labels("placed").inc()
+    return {"hold_id": ref.id, "expires_at": record["expires_at"]}
+
+
+async def release_hold(db, hold_id: str) -> bool:
+    """
+    Give a hold's seats back before it expires (the guest changed the date,
+    time or party size, or left). Returns False if it was already converted
+    or swept.
+    """
+    ref = hold_ref(db, hold_id)
+    limits = await slot_limits(db)
+
+    async def release_transaction(transaction):
+        hold_doc = await ref.get(transaction=transaction)
+        if not hold_doc.exists:
+            return None
+        hold = hold_doc.to_dict()
+        restaurant, date, time, guests = hold["restaurant"], hold["date"], hold["time"], int(hold["guests"])
+
+        ledger = CapacityLedger()
+        pacing = SlotPacing(db, limits)
+        await release_reservation_seats(transaction, ledger, capacity_ref(db, restaurant, date), hold)
+        await pacing.release(transaction, restaurant, date, time, guests)
+        ledger.apply(transaction)
+        pacing.apply(transaction)
+        transaction.delete(ref)
+        rollups = Rollups()
+        rollups.add_slots(restaurant, date, {time: -guests})
+        rollups.stage(transaction, db)
+        return hold
+
+    hold = await run_transaction(db, "release_hold", release_transaction)
+    if hold is None:
+        return False
+    availability_index.invalidate(hold["restaurant"], hold["date"])
+    rollup_worker.wake()
+    HOLDS.labels("released").inc()
+    return True
+
+
+async def modify_booking(db, reservation_id: str, date: str, time: str, guests: int) -> dict:
+    """
+    Move a reservation to another date/time and/or party size, re-checking
+    capacity on the new day and releasing the seats on the old one, and queue
+    the updated confirmation. Returns the reservation as it was before.
+    Raises ReservationNotFound, SoldOut, ValueError or BookingContention.
+    """
+    reservation_ref = db.collection("reservations").document(reservation_id)
+
+    # Reading the reservation first lets a sold-out change fail without a transaction
+    current = await reservation_ref.get()
+    if not current.exists:
+        raise ReservationNotFound(reservation_id)
+    current_data = current.to_dict()
+    restaurant = restaurant_of(current_data)
+    same_day = current_data.get("date") == date
+    fail_fast(
+        "modify", restaurant, date, guests,
+        released=int(current_data.get("guests", 0)) if same_day else 0
+    )
+    limits = await slot_limits(db)
+
+    async def modify_transaction(transaction):
+        reservation_doc = await reservation_ref.get(transaction=transaction)
+        if not reservation_doc.exists:
+            raise ReservationNotFound(reservation_id)
+
+        old_data = reservation_doc.to_dict()
+        old_date = old_data.get("date")
+        old_time = old_data.get("time")
+        old_guests = int(old_data.get("guests", 0))
+
+        # Seats this reservation already holds in the slot count as free
+        pacing = SlotPacing(db, limits)
+        await pacing.release(transaction, restaurant, old_date, old_time, old_guests)
+        await pacing.reserve(transaction, restaurant, date, time, guests)
+
+        updates = {
+            "date": date,
+            "time": time,
+            "guests": guests,
+            "updated_at": SERVER_TIMESTAMP
+        }
+
+        if old_date != date or old_guests != guests:
+            # Release the old seats first so they count as free when the same
+            # day is re-checked; all writes are staged after the reads.
+            ledger = CapacityLedger()
+            await release_reservation_seats(
+                transaction, ledger, capacity_ref(db, restaurant, old_date), old_data
+            )
+            updates["capacity_allocation"] = await reserve_seats(
+                transaction, ledger, capacity_ref(db, restaurant, date), guests, restaurant, date
+            )
+            ledger.apply(transaction)
+        pacing.apply(transaction)
+
+        transaction.update(reservation_ref, updates)
+
+        rollups = Rollups()
+        if old_date != date:
+            rollups.add_reservation(old_data, -1)
+            rollups.add_reservation({**old_data, **updates}, 1)
+        else:
+            rollups.add_stats(restaurant, date, guests=guests - old_guests)
+            slot_changes = {old_time: -old_guests}
+            slot_changes[time] = slot_changes.get(time, 0) + guests
+            rollups.add_slots(restaurant, date, slot_changes)
+            rollups.add_prep(restaurant, date, covers=slot_changes)
+        rollups.stage(transaction, db)
+
+        # Queue the updated confirmation (old data merged with the new values)
+        email_data = {**old_data, "date": date, "time": time, "guests": guests}
+        stage_email(transaction, db, confirmation_message(reservation_id=reservation_id, **email_data))
+        return old_data
+
+    old_data = await run_transaction(db, "modify", modify_transaction)
+    availability_index.invalidate(restaurant, old_data.get("date"))
+    availability_index.invalidate(restaurant, date)
+    email_outbox.wake()
+    rollup_worker.wake()
+    return old_data
+
+
+async def cancel_booking(db, reservation_id: str) -> dict:
+    """
+    Delete a reservation and give its seats back. The reservation is read
+    inside the transaction, so concurrent cancellations release the seats
+    once. Returns the deleted reservation; raises ReservationNotFound.
+    """
+    reservation_ref = db.collection("reservations").document(reservation_id)
+    limits = await slot_limits(db)
+
+    async def cancel_transaction(transaction):
+        reservation_doc = await reservation_ref.get(transaction=transaction)
+        if not reservation_doc.exists:
+            raise ReservationNotFound(reservation_id)
+        data = reservation_doc.to_dict()
+        restaurant, date = restaurant_of(data), data.get("date")
+
+        ledger = CapacityLedger()
+        pacing = SlotPacing(db, limits)
+        await release_reservation_seats(transaction, ledger, capacity_ref(db, restaurant, date), data)
+        await pacing.release(transaction, restaurant, date, data.get("time"), int(data.get("guests", 0)))
+        ledger.apply(transaction)
+        pacing.apply(transaction)
+
+        transaction.delete(reservation_ref)
+        rollups = Rollups()
+        rollups.add_reservation(data, -1)
+        rollups.stage(transaction, db)
+        return data
+
+    data = await run_transaction(db, "cancel", cancel_transaction)
+    availability_index.invalidate(restaurant_of(data), data.get("date"))
+    rollup_worker.wake()
+    return data
@@ -0,0 +1,248 @@
+import random
+from typing import Dict, List, Optional
+
+from firebase_admin import firestore_async
+from google.cloud.firestore_v1 import Increment
+
+from app.core.config import settings
+
+SHARDS_COLLECTION = "shards"
+
+# Capacity documents live at capacities/{restaurant}_{date}. In sharded mode the
+# seats are split across capacities/{key}/shards/{i} documents, each holding its
+# own slice of the capacity and its own reserved_guests counter. A booking only
+# has to lock the shard(s) it draws seats from, and because no shard can go over
+# its own slice the total can never exceed the parent capacity.
+#
+# The parent's reserved_guests keeps counting seats booked before the document
+# was sharded (those reservations carry no shard allocation), so the total
+# reserved is always parent.reserved_guests + sum(shard.reserved_guests). The
+# shards' capacities add up to the parent capacity minus those legacy seats;
+# releasing legacy seats moves them from the parent onto a shard's capacity.
+
+
+class SoldOut(ValueError):
+    """The seats asked for are not available (on the day, or in the time slot)."""
+
+
+def capacity_ref(db, restaurant: str, date: str):
+    return db.collection("capacities").document(f"{restaurant}_{date}")
+
+
+def shard_count_for(restaurant: str) -> int:
+    """Configured shard count for a restaurant (1 = single counter document)."""
+    return max(1, int(settings.CAPACITY_SHARDS.get(restaurant, 1)))
+
+
+def split_evenly(total: int, parts: int) -> List[int]:
+    """Split `total` into `parts` integers that differ by at most one."""
+    base, extra = divmod(max(0, total), parts)
+    return [base + (1 if i < extra else 0) for i in range(parts)]
+
+
+def shard_refs(capacity_ref, shard_count: int) -> list:
+    shards = capacity_ref.collection(SHARDS_COLLECTION)
+    return [shards.document(str(i)) for i in range(shard_count)]
+
+
+def is_sharded(capacity_data: dict) -> bool:
+    return int(capacity_data.get("shard_count", 1)) > 1
+
+
+class CapacityLedger:
+    """
+    Collects the net reserved_guests (and capacity) delta per capacity/shard
+    document touched by one transaction, so that a release and a reserve on the
+    same document turn into a single write and pending releases count as free
+    seats when checking.
+    """
+
+    def __init__(self):
+        self._refs = {}
+        self._deltas: Dict[str, int] = {}
+        self._capacity: Dict[str, int] = {}
+
+    def add(self, ref, delta: int):
+        self._refs[ref.path] = ref
+        self._deltas[ref.path] = self._deltas.get(ref.path, 0) + delta
+
+    def grow(self, ref, seats: int):
+        """Add `seats` to a document's capacity."""
+        self._refs[ref.path] = ref
+        self._capacity[ref.path] = self._capacity.get(ref.path, 0) + seats
+
+    def pending(self, ref) -> int:
+        """Seats taken on `ref` by this transaction so far (negative if freed)."""
+        return self._deltas.get(ref.path, 0) - self._capacity.get(ref.path, 0)
+
+    def apply(self, transaction):
+        """Stage the collected increments on `transaction` (call after all reads)."""
+        for path, ref in self._refs.items():
+            fields = {}
+            if self._deltas.get(path):
+                fields["reserved_guests"] = Increment(self._deltas[path])
+            if self._capacity.get(path):
+                fields["capacity"] = Increment(self._capacity[path])
+            if fields:
+                transaction.update(ref, fields)
+
+
+def release_seats(
+    ledger: CapacityLedger,
+    capacity_ref,
+    guests: int,
+    allocation: Optional[dict],
+    shard_count: int = 1
+):
+    """
+    Give back the seats of a reservation, shard by shard if it was allocated on
+    shards. Seats booked before the document was sharded (no allocation) come
+    off the parent counter and are added to a random shard's capacity, since
+    only shards are ever booked from; `shard_count` is the document's.
+    """
+    shards = capacity_ref.collection(SHARDS_COLLECTION)
+    if allocation:
+        for shard_id, seats in allocation.items():
+            ledger.add(shards.document(str(shard_id)), -int(seats))
+        return
+
+    ledger.add(capacity_ref, -int(guests))
+    if shard_count > 1:
+        ledger.grow(shards.document(str(random.randrange(shard_count))), int(guests))
+
+
+async def reserve_seats(
+    transaction,
+    ledger: CapacityLedger,
+    capacity_ref,
+    guests: int,
+    restaurant: str,
+    date: str
+) -> Dict[str, int]:
+    """
+    Check and stage `guests` seats on a capacity document inside `transaction`.
+
+    Returns the shard allocation ({shard_id: seats}) to store on the reservation,
+    or an empty dict for an unsharded document. Raises SoldOut when the seats
+    do not fit, and ValueError if the day has no capacity document.
+    """
+    capacity_doc = await capacity_ref.get(transaction=transaction)
+
+    if not capacity_doc.exists:
+        raise ValueError(f"No capacity set for {restaurant} on {date}")
+
+    capacity_data = capacity_doc.to_dict()
+
+    if not is_sharded(capacity_data):
+        total_capacity = capacity_data.get("capacity", 0)
+        reserved_guests = capacity_data.get("reserved_guests", 0) + ledger.pending(capacity_ref)
+
+        if reserved_guests + guests > total_capacity:
+            remaining = max(0, total_capacity - reserved_guests)
+            raise SoldOut(f"Only {remaining} seats available")
+
+        ledger.add(capacity_ref, guests)
+        return {}
+
+    # Visit shards in random order and stop as soon as enough free seats were
+    # found, so concurrent bookings usually lock different single shards.
+    refs = shard_refs(capacity_ref, int(capacity_data["shard_count"]))
+    random.shuffle(refs)
+
+    allocation = {}
+    needed = guests
+    free_seen = 0
+
+    for ref in refs:
+        shard_doc = await ref.get(transaction=transaction)
+        shard = shard_doc.to_dict() if shard_doc.exists else {}
+        free = shard.get("capacity", 0) - shard.get("reserved_guests", 0) - ledger.pending(ref)
+        if free <= 0:
+            continue
+
+        take = min(free, needed)
+        allocation[ref.id] = take
+        free_seen += free
+        needed -= take
+        if needed == 0:
+            break
+
+    if needed > 0:
+        raise SoldOut(f"Only {free_seen} seats available")
+
+    for shard_id, seats in allocation.items():
+        ledger.add(capacity_ref.collection(SHARDS_COLLECTION).document(shard_id), seats)
+    return allocation
+
+
+async def summarize_capacities(db, capacity_docs: list) -> List[dict]:
+    """
+    Turn capacity snapshots into dicts with the true reserved_guests, summing the
+    shards of sharded documents with a single batched read.
+    """
+    summaries = [doc.to_dict() for doc in capacity_docs]
+
+    shard_owner = {}
+    refs = []
+    for doc, data in zip(capacity_docs, summaries):
+        if is_sharded(data):
+            for ref in shard_refs(doc.reference, int(data["shard_count"])):
+                shard_owner[ref.path] = data
+                refs.append(ref)
+
+    if refs:
+        async for shard_doc in db.get_all(refs):
+            if shard_doc.exists:
+                owner = shard_owner[shard_doc.reference.path]
+                owner["reserved_guests"] = (
+                    owner.get("reserved_guests", 0) + shard_doc.to_dict().get("reserved_guests", 0)
+                )
+
+    return summaries
+
+
+async def resize_capacity(db, capacity_ref, restaurant: str, date: str, new_capacity: int, shard_count: int):
+    """
+    Set the capacity of a sharded (or to-be-sharded) document in a transaction,
+    redistributing the free seats across shards without moving booked seats.
+    Raises ValueError if the new capacity is below the seats already reserved.
+    """
+    transaction = db.transaction()
+
+    @firestore_async.async_transactional
+    async def resize_transaction(transaction):
+        capacity_doc = await capacity_ref.get(transaction=transaction)
+        data = capacity_doc.to_dict() if capacity_doc.exists else {}
+        legacy_reserved = data.get("reserved_guests", 0)
+        count = max(int(data.get("shard_count", 1)), shard_count)
+
+        refs = shard_refs(capacity_ref, count)
+        shard_reserved = [0] * count
+        if is_sharded(data):
+            async for shard_doc in db.get_all(refs, transaction=transaction):
+                if shard_doc.exists:
+                    shard_reserved[int(shard_doc.id)] = shard_doc.to_dict().get("reserved_guests", 0)
+
+        reserved = legacy_reserved + sum(shard_reserved)
+        if new_capacity < reserved:
+            raise ValueError(
+                f"Cannot reduce capacity for {restaurant} on {date}. "
+                f"Already {reserved} guests reserved, cannot set to {new_capacity}."
+            )
+
+        free = split_evenly(new_capacity - reserved, count)
+        for i, ref in enumerate(refs):
+            transaction.set(ref, {
+                "capacity": shard_reserved[i] + free[i],
+                "reserved_guests": shard_reserved[i]
+            })
+
+        transaction.set(capacity_ref, {
+            "restaurant": restaurant,
+            "date": date,
+            "capacity": new_capacity,
+            "reserved_guests": legacy_reserved,
+            "shard_count": count
+        })
+
+    await resize_transaction(transaction)
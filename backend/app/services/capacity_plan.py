@@ -0,0 +1,191 @@
+from datetime import date as Date, timedelta
+from typing import Dict, Iterable, List, Tuple
+
+from app.services.availability import availability_index
+from app.services.capacity import (
+    capacity_ref,
+    is_sharded,
+    resize_capacity,
+    shard_count_for,
+    shard_refs,
+    split_evenly,
+    summarize_capacities
+)
+from app.services.stats import BACKFILL_BATCH_SIZE
+
+# Longest range one plan or template may cover
+PLAN_MAX_DAYS = 366
+
+# Python weekday numbers (Monday is 0): Friday and Saturday nights
+DEFAULT_WEEKEND_DAYS = (4, 5)
+
+CapacityKey = Tuple[str, str]
+
+
+class CapacityPlanError(ValueError):
+    """A capacity plan failed validation; nothing was written."""
+
+    def __init__(self, errors: List[str]):
+        super().__init__("; ".join(errors))
+        self.errors = errors
+
+
+def split_capacity_key(key: str) -> CapacityKey:
+    """(restaurant, date) of a `{restaurant}_{date}` key; the restaurant id may contain "_"."""
+    restaurant, separator, date = key.rpartition("_")
+    if not separator or not restaurant:
+        raise ValueError(f"Invalid capacity key {key!r}")
+    return restaurant, date
+
+
+def expand_template(
+    restaurants: Iterable[str],
+    from_date: str,
+    days: int,
+    weekday: int,
+    weekend: int,
+    weekend_days: Iterable[int] = DEFAULT_WEEKEND_DAYS
+) -> Dict[CapacityKey, int]:
+    """
+    A plan giving every restaurant `weekday` seats, or `weekend` on
+    `weekend_days`, for `days` days starting at `from_date`.
+    """
+    start = Date.fromisoformat(from_date)
+    weekend_days = set(weekend_days)
+    plan = {}
+    for offset in range(days):
+        day = start + timedelta(days=offset)
+        seats = weekend if day.weekday() in weekend_days else weekday
+        for restaurant in restaurants:
+            plan[(restaurant, day.isoformat())] = seats
+    return plan
+
+
+def validate_keys(plan: Dict[CapacityKey, int], first_date: str, last_date: str) -> List[str]:
+    """Problems with the plan's dates and seat counts, without any reads."""
+    errors = []
+    for (restaurant, date), capacity in plan.items():
+        try:
+            Date.fromisoformat(date)
+        except ValueError:
+            errors.append(f"Invalid date {date!r} for {restaurant}")
+            continue
+        if not first_date <= date <= last_date:
+            errors.append(f"{restaurant} on {date} is outside {first_date} to {last_date}")
+        if capacity < 0:
+            errors.append(f"Capacity for {restaurant} on {date} cannot be negative")
+    return errors
+
+
+async def save_capacity_plan(db, plan: Dict[CapacityKey, int]) -> dict:
+    """
+    Set the capacity of every (restaurant, date) in `plan`.
+
+    The current docs are fetched with one get_all (plus one for the shards of
+    sharded days) and the whole plan is checked before anything is written:
+    any capacity below the seats already reserved raises CapacityPlanError
+    listing all of them. Unchanged days are skipped, new and unsharded days
+    go out in chunked batches (a day's docs never span two batches), and
+    sharded days are rebalanced in their own transactions. New days are
+    created and updated days carry the update_time they were read at, so a
+    day written meanwhile (a booking raced the plan) fails its batch instead
+    of being overwritten.
+
+    Once writing has started nothing is raised: a batch or resize that fails
+    (a booking raced the plan, contention, a lost connection) is listed under
+    "failed" with its error, and "created" and "updated" count only the days
+    actually written, so the caller knows exactly what was applied.
+    """
+    refs = {key: capacity_ref(db, *key) for key in plan}
+    keys = {ref.path: key for key, ref in refs.items()}
+    docs = [doc async for doc in db.get_all(list(refs.values())) if doc.exists]
+    snapshots = {keys[doc.reference.path]: doc for doc in docs}
+    current = {
+        keys[doc.reference.path]: data
+        for doc, data in zip(docs, await summarize_capacities(db, docs))
+    }
+
+    errors = [
+        f"Cannot reduce capacity for {restaurant} on {date}. "
+        f"Already {current[(restaurant, date)].get('reserved_guests', 0)} guests reserved, "
+        f"cannot set to {capacity}."
+        for (restaurant, date), capacity in plan.items()
+        if (restaurant, date) in current and capacity < current[(restaurant, date)].get("reserved_guests", 0)
+    ]
+    if errors:
+        raise CapacityPlanError(errors)
+
+    # (key, "created" or "updated", [(ref, fields, snapshot), ...]) per day,
+    # where the snapshot an update was checked against is None for a create
+    writes: List[Tuple[CapacityKey, str, list]] = []
+    resizes = []
+    report = {"created": 0, "updated": 0, "unchanged": 0, "failed": []}
+    for (restaurant, date), capacity in plan.items():
+        ref = refs[(restaurant, date)]
+        data = current.get((restaurant, date))
+        shard_count = shard_count_for(restaurant)
+
+        if data is None:
+            day_writes = [(ref, {
+                "restaurant": restaurant,
+                "date": date,
+                "capacity": capacity,
+                "reserved_guests": 0,
+                "shard_count": shard_count
+            }, None)]
+            if shard_count > 1:
+                for shard, seats in zip(shard_refs(ref, shard_count), split_evenly(capacity, shard_count)):
+                    day_writes.append((shard, {"capacity": seats, "reserved_guests": 0}, None))
+            writes.append(((restaurant, date), "created", day_writes))
+        elif shard_count > 1 or is_sharded(data):
+            if capacity != data.get("capacity") or shard_count > int(data.get("shard_count", 1)):
+                resizes.append((ref, restaurant, date, capacity, shard_count))
+            else:
+                report["unchanged"] += 1
+        elif capacity != data.get("capacity"):
+            writes.append(((restaurant, date), "updated", [(ref, {"capacity": capacity}, snapshots[(restaurant, date)])]))
+        else:
+            report["unchanged"] += 1
+
+    def fail(restaurant: str, date: str, error: Exception):
+        report["failed"].append({"restaurant": restaurant, "date": date, "error": str(error)})
+
+    async def commit(days: list):
+        batch = db.batch()
+        for _, _, day_writes in days:
+            for ref, fields, snapshot in day_writes:
+                if snapshot is None:
+                    batch.create(ref, fields)
+                else:
+                    batch.update(ref, fields, option=db.write_option(last_update_time=snapshot.update_time))
+        try:
+            await batch.commit()
+        except Exception as e:
+            for (restaurant, date), _, _ in days:
+                fail(restaurant, date, e)
+            return
+        for _, outcome, _ in days:
+            report[outcome] += 1
+
+    chunk, size = [], 0
+    for day in writes:
+        if chunk and size + len(day[2]) > BACKFILL_BATCH_SIZE:
+            await commit(chunk)
+            chunk, size = [], 0
+        chunk.append(day)
+        size += len(day[2])
+    if chunk:
+        await commit(chunk)
+
+    # Sharded counters are rebalanced in their own transaction
+    for ref, restaurant, date, capacity, shard_count in resizes:
+        try:
+            await resize_capacity(db, ref, restaurant, date, capacity, shard_count)
+        except Exception as e:
+            fail(restaurant, date, e)
+        else:
+            report["updated"] += 1
+
+    if writes or resizes:
+        availability_index.invalidate()
+    return report
@@ -0,0 +1,97 @@
+import asyncio
+import hashlib
+import time
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+from fastapi import Request, Response
+from pydantic import TypeAdapter
+
+from app.core.config import settings
+from app.models.config import RestaurantConfig
+from app.models.restaurant import Restaurant
+
+
+class CatalogCache:
+    """
+    Serialized JSON body of a public catalog endpoint, with its ETag.
+
+    The body is validated against the endpoint's response model and serialized
+    once per version; the write endpoints call `invalidate()` to bump the
+    version. The TTL only catches edits made on another instance or outside
+    the API. The ETag is a hash of the body, so every instance serving the
+    same catalog hands out the same tag and caches can revalidate anywhere.
+    """
+
+    def __init__(self, load: Callable[[Any], Awaitable[Any]], adapter: TypeAdapter, ttl_seconds: float):
+        self._load = load
+        self._adapter = adapter
+        self.ttl_seconds = ttl_seconds
+        self.version = 0
+        self._built_version: Optional[int] = None
+        self._built_at = 0.0
+        self._data = None
+        self._body = b""
+        self._etag = ""
+        self._lock = asyncio.Lock()
+
+    def invalidate(self):
+        self.version += 1
+
+    def _fresh(self) -> bool:
+        return (
+            self._built_version == self.version
+            and time.monotonic() - self._built_at < self.ttl_seconds
+        )
+
+    async def _ensure_fresh(self, db):
+        if not self._fresh():
+            async with self._lock:
+                if not self._fresh():
+                    version = self.version
+                    self._data = self._adapter.validate_python(await self._load(db))
+                    self._body = self._adapter.dump_json(self._data)
+                    self._etag = '"' + hashlib.sha256(self._body).hexdigest()[:32] + '"'
+                    self._built_version = version
+                    self._built_at = time.monotonic()
+
+    async def get(self, db):
+        """The validated catalog (models), for server-side use. Do not mutate it."""
+        await self._ensure_fresh(db)
+        return self._data
+
+    async def body(self, db) -> tuple:
+        """(JSON bytes, ETag) of the current catalog, rebuilding it if needed."""
+        await self._ensure_fresh(db)
+        return self._body, self._etag
+
+    async def respond(self, db, request: Request) -> Response:
+        """The catalog as a JSON response, or a 304 if the client's copy is current."""
+        body, etag = await self.body(db)
+        headers = {
+            "ETag": etag,
+            "Cache-Control": f"public, max-age={settings.CATALOG_MAX_AGE_SECONDS}, must-revalidate"
+        }
+
+        # If-None-Match uses weak comparison, and compressing proxies weaken our tag
+        if_none_match = request.headers.get("if-none-match", "")
+        client_tags = [tag.strip().removeprefix("W/") for tag in if_none_match.split(",")]
+        if etag in client_tags or "*" in client_tags:
+            return Response(status_code=304, headers=headers)
+
+        return Response(content=body, media_type="application/json", headers=headers)
+
+
+async def load_restaurants(db) -> list:
+    return [doc.to_dict() async for doc in db.collection("restaurants").order_by("order").stream()]
+
+
+async def load_restaurant_configs(db) -> dict:
+    return {doc.id: doc.to_dict() async for doc in db.collection("restaurant_configs").stream()}
+
+
+restaurant_catalog = CatalogCache(
+    load_restaurants, TypeAdapter(List[Restaurant]), ttl_seconds=settings.CATALOG_CACHE_TTL_SECONDS
+)
+config_catalog = CatalogCache(
+    load_restaurant_configs, TypeAdapter(Dict[str, RestaurantConfig]), ttl_seconds=settings.CATALOG_CACHE_TTL_SECONDS
+)
@@ -1,8 +1,8 @@
-import requests
-import asyncio # Import asyncio for async operations
+import time
+
+import httpx
 from app.core.config import settings
-from firebase_admin import firestore
-from google.cloud.firestore_v1 import SERVER_TIMESTAMP
+from app.core.metrics import EMAIL_SEND_FAILURES, EMAIL_SEND_LATENCY
 
 def build_email_html(name: str, **kwargs) -> str:
     """Build HTML email template."""
@@ -73,55 +73,25 @@ def build_email_html(name: str, **kwargs) -> str:
     """
     return html_content
 
-async def send_confirmation_email(
+def confirmation_message(
     email: str,
     name: str,
     reservation_id: str,
     **kwargs
-):
-    """Send confirmation email via Mailgun with retry."""
-    max_retries = 3
-    db = firestore.client()
-    
-    for attempt in range(max_retries):
-        try:
-            html_content = build_email_html(name=name, **kwargs)
-            
-            # Simulate async operation
-            await asyncio.sleep(1) 
-            
-            response = requests.post(
-                f"https://api.mailgun.net/v3/{settings.MAILGUN_DOMAIN}/messages",
-                auth=("api", settings.MAILGUN_API_KEY),
-                data={
-                    "from": f"Seagull Restaurant <{settings.EMAIL_FROM}>",
-                    "to": [email],
-                    "subject": "Reservation Confirmation",
-                    "html": html_content
-                },
-                timeout=30
-            )
-            response.raise_for_status()
-            
-            # Update status
-            db.collection("reservations").document(reservation_id).update({
-                "email_status": "sent",
-                "email_sent_at": SERVER_TIMESTAMP
-            })
-            
-            return True
-            
-        except Exception as e:
-            if attempt == max_retries - 1:
-                # Final failure
-                db.collection("reservations").document(reservation_id).update({
-                    "email_status": "failed",
-                    "email_error": str(e)
-                })
-                return False
+) -> dict:
+    """Build the outbox message for a reservation confirmation email."""
+    return {
+        "kind": "confirmation",
+        "from": f"Seagull Restaurant <{settings.EMAIL_FROM}>",
+        "to": [email],
+        "subject": "Reservation Confirmation",
+        "html": build_email_html(name=name, **kwargs),
+        # The reservation's email_status is written back once this is sent
+        "reservation_id": reservation_id
+    }
 
-async def send_review_request_email(to_email, guest_name, restaurant, token):
-    """Send review request email."""
+def review_request_message(to_email, guest_name, restaurant, token) -> dict:
+    """Build the outbox message for a review request email."""
     review_url = f"{settings.FRONTEND_BASE_URL}/review/{token}"
     html_content = f"""
     <html>
@@ -139,19 +109,34 @@ async def send_review_request_email(to_email, guest_name, restaurant, token):
       </body>
     </html>
     """
-    
-    # Simulate async operation
-    await asyncio.sleep(1)
-    
-    response = requests.post(
-        f"https://api.mailgun.net/v3/{settings.MAILGUN_DOMAIN}/messages",
-        auth=("api", settings.MAILGUN_API_KEY),
-        data={
-            "from": f"Seagull Reviews <reviews@{settings.MAILGUN_DOMAIN}>",
-            "to": [to_email],
-            "subject": f"Rate your {restaurant} dinner",
-            "html": html_content
-        },
-        timeout=15
-    )
-    response.raise_for_status()
+    return {
+        "kind": "review_request",
+        "from": f"Seagull Reviews <reviews@{settings.MAILGUN_DOMAIN}>",
+        "to": [to_email],
+        "subject": f"Rate your {restaurant} dinner",
+        "html": html_content,
+        "reservation_id": None
+    }
+
+async def post_to_mailgun(http: httpx.AsyncClient, message: dict):
+    """Send one outbox message through Mailgun; raises httpx.HTTPError on failure."""
+    kind = message.get("kind") or "unknown"
+    started = time.perf_counter()
+    try:
+        response = await http.post(
+            f"https://api.mailgun.net/v3/{settings.MAILGUN_DOMAIN}/messages",
+            auth=("api", settings.MAILGUN_API_KEY),
+            data={
+                "from": message["from"],
+                "to": message["to"],
+                "subject": message["subject"],
+                "html": message["html"]
+            }
+        )
+        response.raise_for_status()
+    except Exception as e:
+        reason = str(e.response.status_code) if isinstance(e, httpx.HTTPStatusError) else type(e).__name__
+        EMAIL_SEND_FAILURES.labels(kind, reason).inc()
+        raise
+    finally:
+        EMAIL_SEND_LATENCY.labels(kind).observe(time.perf_counter() - started)
@@ -0,0 +1,275 @@
+import asyncio
+import random
+import time
+from datetime import timedelta
+from typing import List, Optional
+
+import httpx
+from firebase_admin import firestore_async
+from google.api_core.exceptions import NotFound
+from google.cloud.firestore_v1 import SERVER_TIMESTAMP
+
+from app.core.config import settings
+from app.services.email import post_to_mailgun
+from app.services.firestore import get_db
+from app.utils.datetime import get_utc_now
+
+OUTBOX_COLLECTION = "email_outbox"
+
+# Firestore allows 500 writes per batch; a sent confirmation costs two
+# (outbox doc + reservation), so flush well below that.
+STATUS_BATCH_WRITES = 400
+
+# A claimed message is retried by any worker once its lease runs out
+# (e.g. the instance that claimed it was shut down mid-send).
+CLAIM_LEASE = timedelta(minutes=5)
+
+
+def stage_email(writer, db, message: dict):
+    """
+    Add an outbox document to a transaction or batch, so the email is persisted
+    atomically with the write that triggered it. Returns the new document ref.
+    """
+    ref = db.collection(OUTBOX_COLLECTION).document()
+    writer.set(ref, {
+        **message,
+        "status": "pending",
+        "attempts": 0,
+        "next_attempt_at": get_utc_now(),
+        "created_at": SERVER_TIMESTAMP
+    })
+    return ref
+
+
+def backoff_delay(attempts: int) -> timedelta:
+    """
+    Exponential backoff with equal jitter, capped at one hour: half the delay
+    is fixed and half random, so retries spread out but never come back early.
+    """
+    ceiling = min(3600, settings.EMAIL_BACKOFF_BASE_SECONDS * (2 ** (attempts - 1)))
+    return timedelta(seconds=random.uniform(ceiling / 2, ceiling))
+
+
+def is_permanent_failure(error: Exception) -> bool:
+    """4xx answers other than 429 will not succeed on retry."""
+    if isinstance(error, httpx.HTTPStatusError):
+        status = error.response.status_code
+        return 400 <= status < 500 and status != 429
+    return False
+
+
+class RateLimiter:
+    """Spaces out acquisitions to at most `rate` per second across all workers."""
+
+    def __init__(self, rate: float):
+        self.interval = 1.0 / rate
+        self._next = 0.0
+        self._lock = asyncio.Lock()
+
+    async def acquire(self):
+        async with self._lock:
+            now = time.monotonic()
+            wait = self._next - now
+            self._next = max(now, self._next) + self.interval
+        if wait > 0:
+            await asyncio.sleep(wait)
+
+
+class EmailOutboxWorker:
+    """
+    Drains the email_outbox collection.
+
+    A poller claims due messages in one transaction, a pool of senders posts them
+    to Mailgun over one shared keep-alive HTTP client (rate limited), and a
+    flusher writes the per-message results back in batches.
+    """
+
+    def __init__(
+        self,
+        concurrency: int,
+        rate_per_second: float,
+        max_attempts: int,
+        poll_interval: float,
+        claim_size: int = 50,
+        flush_interval: float = 1.0
+    ):
+        self.concurrency = concurrency
+        self.max_attempts = max_attempts
+        self.poll_interval = poll_interval
+        self.claim_size = claim_size
+        self.flush_interval = flush_interval
+        self.limiter = RateLimiter(rate_per_second)
+
+        self._http: Optional[httpx.AsyncClient] = None
+        self._queue: Optional[asyncio.Queue] = None
+        self._results: List[tuple] = []
+        self._wake = asyncio.Event()
+        self._tasks: List[asyncio.Task] = []
+
+    def wake(self):
+        """Poll right away instead of waiting for the next interval."""
+        self._wake.set()
+
+    async def start(self):
+        self._http = httpx.AsyncClient(
+            timeout=30,
+            limits=httpx.Limits(
+                max_connections=self.concurrency,
+                max_keepalive_connections=self.concurrency
+            )
+        )
+        self._queue = asyncio.Queue(maxsize=self.claim_size)
+        self._tasks = [asyncio.create_task(self._poll_loop()), asyncio.create_task(self._flush_loop())]
+        self._tasks += [asyncio.create_task(self._send_loop()) for _ in range(self.concurrency)]
+
+    async def stop(self):
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        await self.flush()
+        if self._http:
+            await self._http.aclose()
+            self._http = None
+
+    async def claim_due(self) -> list:
+        """Lease up to claim_size due messages to this worker in a single commit."""
+        db = get_db()
+        now = get_utc_now()
+        query = (db.collection(OUTBOX_COLLECTION)
+            .where("status", "in", ["pending", "sending"])
+            .where("next_attempt_at", "<=", now)
+            .order_by("next_attempt_at")
+            .limit(self.claim_size))
+        transaction = db.transaction()
+
+        @firestore_async.async_transactional
+        async def claim_transaction(transaction):
+            docs = [doc async for doc in query.stream(transaction=transaction)]
+            for doc in docs:
+                transaction.update(doc.reference, {
+                    "status": "sending",
+                    "next_attempt_at": now + CLAIM_LEASE
+                })
+            return docs
+
+        return await claim_transaction(transaction)
+
+    async def _poll_loop(self):
+        while True:
+            try:
+                docs = await self.claim_due()
+            except Exception as e:
+                print(f"Email outbox poll error: {e}")
+                docs = []
+
+            for doc in docs:
+                await self._queue.put(doc)
+
+            if len(docs) < self.claim_size:
+                self._wake.clear()
+                try:
+                    await asyncio.wait_for(self._wake.wait(), timeout=self.poll_interval)
+                except asyncio.TimeoutError:
+                    pass
+
+    async def _send_loop(self):
+        while True:
+            doc = await self._queue.get()
+            try:
+                await self.limiter.acquire()
+                await post_to_mailgun(self._http, doc.to_dict())
+                self._results.append((doc, None))
+            except Exception as e:
+                self._results.append((doc, e))
+            finally:
+                self._queue.task_done()
+
+            if len(self._results) * 2 >= STATUS_BATCH_WRITES:
+                try:
+                    await self.flush()
+                except Exception as e:
+                    print(f"Email outbox flush error: {e}")
+
+    async def _flush_loop(self):
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            try:
+                await self.flush()
+            except Exception as e:
+                print(f"Email outbox flush error: {e}")
+
+    async def flush(self):
+        """Write back the status of every message sent since the last flush."""
+        results, self._results = self._results, []
+        if not results:
+            return
+
+        db = get_db()
+        batch = db.batch()
+        now = get_utc_now()
+        writes = []
+
+        def write(ref, fields):
+            writes.append((ref, fields))
+            batch.update(ref, fields)
+
+        for doc, error in results:
+            data = doc.to_dict()
+            reservation_id = data.get("reservation_id")
+            reservation_ref = (
+                db.collection("reservations").document(reservation_id) if reservation_id else None
+            )
+
+            if error is None:
+                write(doc.reference, {"status": "sent", "sent_at": SERVER_TIMESTAMP})
+                if reservation_ref:
+                    write(reservation_ref, {
+                        "email_status": "sent",
+                        "email_sent_at": SERVER_TIMESTAMP
+                    })
+                continue
+
+            attempts = data.get("attempts", 0) + 1
+            if attempts >= self.max_attempts or is_permanent_failure(error):
+                write(doc.reference, {
+                    "status": "failed",
+                    "attempts": attempts,
+                    "last_error": str(error)
+                })
+                if reservation_ref:
+                    write(reservation_ref, {
+                        "email_status": "failed",
+                        "email_error": str(error)
+                    })
+            else:
+                write(doc.reference, {
+                    "status": "pending",
+                    "attempts": attempts,
+                    "last_error": str(error),
+                    "next_attempt_at": now + backoff_delay(attempts)
+                })
+
+        try:
+            await batch.commit()
+        except NotFound:
+            # A reservation was deleted after its email was queued, which fails
+            # the whole batch; fall back to individual writes and skip the missing docs.
+            for ref, fields in writes:
+                try:
+                    await ref.update(fields)
+                except NotFound:
+                    pass
+        except Exception:
+            # Keep the results for the next flush rather than re-sending the
+            # messages once their lease expires.
+            self._results = results + self._results
+            raise
+
+
+email_outbox = EmailOutboxWorker(
+    concurrency=settings.EMAIL_WORKERS,
+    rate_per_second=settings.EMAIL_RATE_PER_SECOND,
+    max_attempts=settings.EMAIL_MAX_ATTEMPTS,
+    poll_interval=settings.EMAIL_POLL_INTERVAL_SECONDS
+)
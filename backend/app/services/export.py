@@ -0,0 +1,148 @@
+import asyncio
+import csv
+import io
+import json
+import tempfile
+from typing import AsyncIterator, List, Optional
+
+from google.cloud.firestore_v1.field_path import FieldPath
+
+# Documents fetched per Firestore round-trip while streaming an export
+EXPORT_PAGE_SIZE = 500
+
+EXPORT_COLUMNS = [
+    "id", "date", "time", "restaurant", "name", "room", "email", "guests",
+    "status", "paid", "upsell_total_price", "upsell_items", "main_courses",
+    "comments", "is_vip", "vip_level", "email_status", "created_at"
+]
+
+EXPORT_FORMATS = {
+    "csv": "text/csv; charset=utf-8",
+    "ndjson": "application/x-ndjson",
+    "xlsx": "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+}
+
+# Bytes per chunk when streaming the finished .xlsx file
+XLSX_CHUNK_SIZE = 64 * 1024
+
+
+async def iter_reservation_pages(
+    db,
+    restaurant: Optional[str] = None,
+    from_date: Optional[str] = None,
+    to_date: Optional[str] = None,
+    page_size: int = EXPORT_PAGE_SIZE
+) -> AsyncIterator[list]:
+    """
+    Reservations in the date range, by date, one page of snapshots at a time.
+    Each page continues from the previous page's last snapshot, so no cursor
+    document is ever re-read.
+    """
+    query = db.collection("reservations")
+    if restaurant:
+        query = query.where("restaurant", "==", restaurant)
+    if from_date:
+        query = query.where("date", ">=", from_date)
+    if to_date:
+        query = query.where("date", "<=", to_date)
+    query = query.order_by("date").order_by(FieldPath.document_id())
+
+    last_doc = None
+    while True:
+        page = query.limit(page_size) if last_doc is None else query.start_after(last_doc).limit(page_size)
+        docs = await page.get()
+        if docs:
+            yield docs
+        if len(docs) < page_size:
+            return
+        last_doc = docs[-1]
+
+
+def export_row(doc) -> dict:
+    """Flatten a reservation snapshot into the export columns."""
+    data = doc.to_dict()
+    created_at = data.get("created_at")
+    return {
+        "id": doc.id,
+        "date": data.get("date"),
+        "time": data.get("time"),
+        "restaurant": data.get("restaurant") or data.get("restaurantId"),
+        "name": data.get("name"),
+        "room": data.get("room"),
+        "email": data.get("email"),
+        "guests": data.get("guests"),
+        "status": data.get("status"),
+        "paid": data.get("paid", False),
+        "upsell_total_price": data.get("upsell_total_price") or 0.0,
+        "upsell_items": "; ".join(f"{item} x{count}" for item, count in (data.get("upsell_items") or {}).items()),
+        "main_courses": "; ".join(data.get("main_courses") or []),
+        "comments": data.get("comments") or "",
+        "is_vip": data.get("is_vip", False),
+        "vip_level": data.get("vip_level", "Standard"),
+        "email_status": data.get("email_status"),
+        "created_at": created_at.isoformat() if hasattr(created_at, "isoformat") else created_at
+    }
+
+
+async def _csv_chunks(pages) -> AsyncIterator[bytes]:
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=EXPORT_COLUMNS)
+    writer.writeheader()
+    # BOM so Excel opens the UTF-8 file with the right encoding
+    yield b"\xef\xbb\xbf" + buffer.getvalue().encode()
+
+    async for docs in pages:
+        buffer.seek(0)
+        buffer.truncate()
+        writer.writerows(export_row(doc) for doc in docs)
+        yield buffer.getvalue().encode()
+
+
+async def _ndjson_chunks(pages) -> AsyncIterator[bytes]:
+    async for docs in pages:
+        yield "".join(json.dumps(export_row(doc), default=str) + "\n" for doc in docs).encode()
+
+
+async def _xlsx_chunks(pages) -> AsyncIterator[bytes]:
+    # A zip can only be sent once it is complete: rows go through openpyxl's
+    # write-only mode (flushed to disk as they are added) and the finished
+    # file is then streamed from disk, so memory stays flat either way.
+    from openpyxl import Workbook
+
+    workbook = Workbook(write_only=True)
+    sheet = workbook.create_sheet("Reservations")
+    sheet.append(EXPORT_COLUMNS)
+    async for docs in pages:
+        for doc in docs:
+            row = export_row(doc)
+            sheet.append([row[column] for column in EXPORT_COLUMNS])
+
+    with tempfile.TemporaryFile() as file:
+        await asyncio.to_thread(workbook.save, file)
+        file.seek(0)
+        while chunk := await asyncio.to_thread(file.read, XLSX_CHUNK_SIZE):
+            yield chunk
+
+
+def export_chunks(
+    db,
+    export_format: str,
+    restaurant: Optional[str] = None,
+    from_date: Optional[str] = None,
+    to_date: Optional[str] = None,
+    page_size: int = EXPORT_PAGE_SIZE
+) -> AsyncIterator[bytes]:
+    """The export file as a stream of byte chunks, one Firestore page at a time."""
+    pages = iter_reservation_pages(db, restaurant, from_date, to_date, page_size)
+    if export_format == "csv":
+        return _csv_chunks(pages)
+    if export_format == "ndjson":
+        return _ndjson_chunks(pages)
+    if export_format == "xlsx":
+        return _xlsx_chunks(pages)
+    raise ValueError(f"Unsupported export format: {export_format}")
+
+
+def export_filename(export_format: str, from_date: Optional[str], to_date: Optional[str]) -> str:
+    parts: List[str] = ["reservations"] + [d for d in (from_date, to_date) if d]
+    return "_".join(parts) + f".{export_format}"
@@ -1,10 +1,124 @@
-from firebase_admin import firestore
+import inspect
+
+from firebase_admin import firestore_async
+
+from app.core.config import settings
+from app.core.metrics import record_firestore
 
 _db_client = None
 
+# Calls returning another client object (reference, query, batch, transaction)
+# that stays wrapped so its reads and writes are counted too
+_CHAINED = {
+    "collection", "collection_group", "document", "where", "order_by", "limit", "limit_to_last",
+    "offset", "select", "start_at", "start_after", "end_at", "end_before", "count", "sum", "avg",
+    "batch", "transaction"
+}
+# Document writes, whether direct on a reference or staged in a batch/transaction
+_WRITES = {"add", "create", "set", "update", "delete"}
+# Reads; streams are billed at least one read per query, get_all per document
+_READS = {"get": 1, "stream": 1, "get_all": 0}
+
+
+def _unwrap(value):
+    if isinstance(value, InstrumentedFirestore):
+        return value._target
+    if isinstance(value, (list, tuple)):
+        return type(value)(_unwrap(item) for item in value)
+    return value
+
+
+async def _counted_stream(stream, min_reads: int):
+    reads = 0
+    try:
+        async for item in stream:
+            reads += 1
+            yield item
+    finally:
+        record_firestore("read", max(reads, min_reads))
+
+
+async def _counted_get(awaitable, min_reads: int):
+    result = await awaitable
+    if hasattr(result, "__aiter__"):
+        # Transaction.get()/get_all() hand back a stream
+        return _counted_stream(result, min_reads)
+    if isinstance(result, list):
+        # Aggregation results come back as a list of lists and bill one read
+        reads = 1 if result and isinstance(result[0], list) else max(len(result), 1)
+    else:
+        reads = 1
+    record_firestore("read", reads)
+    return result
+
+
+class InstrumentedFirestore:
+    """
+    Thin proxy over the async Firestore client and the references, queries,
+    batches and transactions it hands out, counting document reads, writes
+    and transaction retries into app.core.metrics for the current request.
+
+    Reads are counted as Firestore bills them: one per returned document, at
+    least one per query, one per aggregation.
+    """
+
+    __slots__ = ("_target",)
+
+    def __init__(self, target):
+        object.__setattr__(self, "_target", target)
+
+    def __getattr__(self, name):
+        attr = getattr(self._target, name)
+        if not callable(attr):
+            return attr
+
+        def call(*args, **kwargs):
+            args = _unwrap(args)
+            kwargs = {key: _unwrap(value) for key, value in kwargs.items()}
+
+            if name == "_begin" and kwargs.get("retry_id") is not None:
+                # async_transactional re-begins with the failed transaction's id
+                record_firestore("transaction_retry")
+            elif name in _WRITES:
+                record_firestore("write")
+
+            result = attr(*args, **kwargs)
+            if name in _CHAINED:
+                return InstrumentedFirestore(result)
+            if name in _READS:
+                if hasattr(result, "__aiter__"):
+                    return _counted_stream(result, _READS[name])
+                if inspect.isawaitable(result):
+                    return _counted_get(result, _READS[name])
+            return result
+
+        return call
+
+    def __setattr__(self, name, value):
+        setattr(self._target, name, value)
+
+    def __eq__(self, other):
+        return self._target == _unwrap(other)
+
+    def __hash__(self):
+        return hash(self._target)
+
+    def __repr__(self):
+        return f"InstrumentedFirestore({self._target!r})"
+
+
 def get_db():
-    """Returns the Firestore client instance."""
+    """
+    Returns the shared async Firestore client instance.
+
+    Every call site must await document/query/batch operations
+    (`await ref.get()`, `async for doc in query.stream()`, `await batch.commit()`),
+    so a slow Firestore round-trip only suspends the current request
+    instead of blocking the whole event loop.
+    """
     global _db_client
     if _db_client is None:
-        _db_client = firestore.client()
+        _db_client = firestore_async.client()
+    if settings.METRICS_ENABLED:
+        return InstrumentedFirestore(_db_client)
     return _db_client
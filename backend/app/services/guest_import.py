@@ -0,0 +1,224 @@
+import asyncio
+import csv
+import io
+import time
+from typing import TYPE_CHECKING, BinaryIO, Iterator, List, Optional, Tuple
+
+from google.cloud.firestore_v1 import SERVER_TIMESTAMP
+
+if TYPE_CHECKING:
+    import pandas as pd
+
+GUEST_LIST_COLLECTION = "guest_list"
+
+# Room numbers of every guest_list doc, kept by the importer so a replace-mode
+# import can find departed guests without scanning the collection. Stays well
+# under the 1 MiB document limit for any realistic hotel.
+GUEST_LIST_MANIFEST = "guest_list_meta/rooms"
+
+# One write per row; stay under Firestore's 500 writes per batch
+IMPORT_BATCH_SIZE = 400
+
+# Batches committed concurrently while the next rows are parsed
+IMPORT_MAX_IN_FLIGHT = 4
+
+REQUIRED_COLUMNS = ("room", "last_name")
+NON_VIP_LEVELS = ["standard", "nan", "none", ""]
+
+
+def normalize_header(cell) -> str:
+    return str(cell or "").strip().lower().replace(" ", "_")
+
+
+def iter_rows(file: BinaryIO, filename: str) -> Iterator[tuple]:
+    """
+    Stream the rows of an .xlsx or .csv upload, header row first, without
+    loading the whole sheet: openpyxl in read-only mode, or the csv module.
+    """
+    name = filename.lower()
+    file.seek(0)
+
+    if name.endswith(".xlsx"):
+        from openpyxl import load_workbook
+
+        workbook = load_workbook(file, read_only=True, data_only=True)
+        try:
+            yield from workbook.active.iter_rows(values_only=True)
+        finally:
+            workbook.close()
+
+    elif name.endswith(".csv"):
+        text = io.TextIOWrapper(file, encoding="utf-8-sig", newline="")
+        sample = text.read(4096)
+        text.seek(0)
+        try:
+            dialect = csv.Sniffer().sniff(sample, delimiters=",;\t")
+        except csv.Error:
+            dialect = csv.excel
+        try:
+            yield from (tuple(row) for row in csv.reader(text, dialect))
+        finally:
+            text.detach()
+
+    else:
+        raise ValueError("Invalid file type. Please upload .xlsx or .csv")
+
+
+def _text(column: "pd.Series") -> "pd.Series":
+    return column.astype(object).where(column.notna(), "").astype(str).str.strip()
+
+
+def normalize_rows(columns: List[str], rows: List[tuple]) -> "pd.DataFrame":
+    """
+    Normalize one chunk of raw rows column-wise into guest_list fields. Rows
+    without a room or last name are dropped.
+    """
+    # pandas (and numpy) cost ~0.4s to import; only guest-list uploads need them
+    import pandas as pd
+
+    width = len(columns)
+    df = pd.DataFrame([tuple(row[:width]) + (None,) * (width - len(row)) for row in rows], columns=columns)
+
+    guests = pd.DataFrame({
+        # Excel hands back room 101 as 101 or 101.0 depending on the column's cells
+        "room": _text(df["room"]).str.replace(r"\.0$", "", regex=True),
+        "last_name": _text(df["last_name"])
+    })
+    guests["last_name_normalized"] = guests["last_name"].str.lower()
+
+    vip = _text(df["vip"]) if "vip" in df.columns else pd.Series("", index=df.index)
+    guests["vip_level"] = vip.where(vip != "", "Standard")
+    guests["is_vip"] = ~guests["vip_level"].str.lower().isin(NON_VIP_LEVELS)
+
+    return guests[(guests["room"] != "") & (guests["last_name"] != "")]
+
+
+def read_chunk(rows: Iterator[tuple], columns: List[str], size: int) -> Optional[Tuple[int, "pd.DataFrame"]]:
+    """
+    Read up to `size` non-blank rows and normalize them: how many were read and
+    the resulting guests, or None once the file is exhausted. Blocking (file
+    parsing and pandas), so the importer runs it in a worker thread.
+    """
+    chunk = []
+    for row in rows:
+        if all(cell in (None, "") for cell in row):
+            continue
+        chunk.append(row)
+        if len(chunk) == size:
+            break
+    if not chunk:
+        return None
+    return len(chunk), normalize_rows(columns, chunk)
+
+
+async def _previous_rooms(db) -> set:
+    manifest = await db.document(GUEST_LIST_MANIFEST).get()
+    if manifest.exists:
+        return set(manifest.to_dict().get("rooms", []))
+
+    # Lists imported before the manifest existed: read the keys once
+    return {doc.id async for doc in db.collection(GUEST_LIST_COLLECTION).select([]).stream()}
+
+
+async def import_guest_list(
+    db,
+    file: BinaryIO,
+    filename: str,
+    replace: bool = False,
+    batch_size: int = IMPORT_BATCH_SIZE,
+    max_in_flight: int = IMPORT_MAX_IN_FLIGHT
+) -> dict:
+    """
+    Upsert guest_list docs (keyed by room) from a PMS export.
+
+    Rows are parsed in chunks of `batch_size`, normalized column-wise and
+    committed as one batch each, with at most `max_in_flight` batches
+    committing at once. A room that appears twice keeps its first row. With
+    `replace`, rooms missing from the file are deleted afterwards, found via
+    the room manifest rather than a collection scan.
+    """
+    started = time.perf_counter()
+    report = {
+        "mode": "replace" if replace else "merge",
+        "rows": 0,
+        "imported": 0,
+        "skipped": 0,
+        "duplicates": 0,
+        "deleted": 0,
+        "batches": 0,
+        "failed": []
+    }
+
+    # Parsing and normalizing block, so they run in a worker thread and only
+    # the batch commits stay on the event loop
+    rows = iter_rows(file, filename)
+    header = await asyncio.to_thread(next, rows, ())
+    columns = [normalize_header(cell) for cell in header]
+    missing = [col for col in REQUIRED_COLUMNS if col not in columns]
+    if missing:
+        raise ValueError(f"File must contain columns: Room, Last Name. Found: {columns}")
+
+    collection_ref = db.collection(GUEST_LIST_COLLECTION)
+    semaphore = asyncio.Semaphore(max_in_flight)
+    tasks = []
+    rooms = set()
+    undeleted = set()
+
+    async def commit_batch(batch, batch_rooms: list, deletes: bool):
+        try:
+            await batch.commit()
+            report["deleted" if deletes else "imported"] += len(batch_rooms)
+            report["batches"] += 1
+        except Exception as e:
+            report["failed"].append({"rooms": batch_rooms, "delete": deletes, "error": str(e)})
+            if deletes:
+                undeleted.update(batch_rooms)
+
+    async def submit(batch, batch_rooms: list, deletes: bool = False):
+        await semaphore.acquire()
+        task = asyncio.create_task(commit_batch(batch, batch_rooms, deletes))
+        task.add_done_callback(lambda _: semaphore.release())
+        tasks.append(task)
+
+    async def flush(read: int, guests: "pd.DataFrame"):
+        report["rows"] += read
+        report["skipped"] += read - len(guests)
+
+        unique = guests.drop_duplicates("room")
+        unique = unique[~unique["room"].isin(rooms)]
+        report["duplicates"] += len(guests) - len(unique)
+        if unique.empty:
+            return
+
+        batch = db.batch()
+        for guest in unique.to_dict("records"):
+            batch.set(collection_ref.document(guest["room"]), {**guest, "is_vip": bool(guest["is_vip"])})
+        rooms.update(unique["room"])
+        await submit(batch, unique["room"].tolist())
+
+    while (chunk := await asyncio.to_thread(read_chunk, rows, columns, batch_size)) is not None:
+        await flush(*chunk)
+
+    previous = await _previous_rooms(db)
+    if replace:
+        departed = sorted(previous - rooms)
+        for start in range(0, len(departed), batch_size):
+            batch = db.batch()
+            batch_rooms = departed[start:start + batch_size]
+            for room in batch_rooms:
+                batch.delete(collection_ref.document(room))
+            await submit(batch, batch_rooms, deletes=True)
+
+    await asyncio.gather(*tasks)
+
+    # Rooms whose import failed stay listed (deleting them later is a no-op),
+    # and so do departed rooms whose delete failed, for the next replace.
+    await db.document(GUEST_LIST_MANIFEST).set({
+        "rooms": sorted(rooms | undeleted if replace else previous | rooms),
+        "updated_at": SERVER_TIMESTAMP
+    })
+
+    elapsed = time.perf_counter() - started
+    report["elapsed_seconds"] = round(elapsed, 3)
+    report["rows_per_second"] = round(report["rows"] / elapsed, 1) if elapsed > 0 else 0.0
+    return report
@@ -0,0 +1,111 @@
+import threading
+from collections import OrderedDict
+from typing import Optional
+
+from app.core.config import settings
+from app.services.guest_import import GUEST_LIST_COLLECTION
+
+
+def guest_entry(data: dict) -> dict:
+    """The guest_list fields VIP detection needs, kept small for the cache."""
+    return {
+        "last_name_normalized": data.get("last_name_normalized", ""),
+        "is_vip": data.get("is_vip", False),
+        "vip_level": data.get("vip_level", "Standard")
+    }
+
+
+class GuestListCache:
+    """
+    In-process copy of guest_list keyed by room, so VIP detection on the
+    booking path costs no Firestore read.
+
+    `load()` reads the whole collection at startup and after every guest-list
+    upload, and a snapshot listener applies changes made elsewhere (other
+    instances, the console) as they happen. At most `max_entries` rooms are
+    kept; past that the cache degrades to an LRU in front of point reads and
+    can no longer answer "not on the list" by itself.
+    """
+
+    def __init__(self, max_entries: int):
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._entries: "OrderedDict[str, Optional[dict]]" = OrderedDict()
+        self._complete = False
+        self._watch = None
+        # Snapshot callbacks run on the listener's thread
+        self._lock = threading.Lock()
+
+    def _put(self, room: str, entry: Optional[dict]):
+        self._entries[room] = entry
+        self._entries.move_to_end(room)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self._complete = False
+
+    async def load(self, db):
+        """Replace the cache with the current contents of guest_list."""
+        entries = OrderedDict()
+        complete = True
+        async for doc in db.collection(GUEST_LIST_COLLECTION).stream():
+            if len(entries) == self.max_entries:
+                complete = False
+                break
+            entries[doc.id] = guest_entry(doc.to_dict())
+
+        with self._lock:
+            self._entries = entries
+            self._complete = complete
+
+    def watch(self, client):
+        """Follow guest_list changes with a snapshot listener on a sync `client`."""
+        if self._watch is not None:
+            return
+        self._watch = client.collection(GUEST_LIST_COLLECTION).on_snapshot(self._on_snapshot)
+
+    def stop(self):
+        if self._watch is not None:
+            self._watch.unsubscribe()
+            self._watch = None
+
+    def _on_snapshot(self, docs, changes, read_time):
+        with self._lock:
+            for change in changes:
+                if change.type.name == "REMOVED":
+                    if self._complete:
+                        self._entries.pop(change.document.id, None)
+                    else:
+                        self._entries[change.document.id] = None
+                else:
+                    self._put(change.document.id, guest_entry(change.document.to_dict()))
+
+    async def lookup(self, db, room: str) -> Optional[dict]:
+        """The cached guest_list entry for `room`, or None if the room has no guest."""
+        with self._lock:
+            if room in self._entries:
+                self.hits += 1
+                self._entries.move_to_end(room)
+                return self._entries[room]
+            if self._complete:
+                self.hits += 1
+                return None
+            self.misses += 1
+
+        doc = await db.collection(GUEST_LIST_COLLECTION).document(room).get()
+        entry = guest_entry(doc.to_dict()) if doc.exists else None
+        with self._lock:
+            self._put(room, entry)
+        return entry
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "complete": self._complete,
+                "hits": self.hits,
+                "misses": self.misses
+            }
+
+
+guest_list_cache = GuestListCache(max_entries=settings.GUEST_LIST_CACHE_MAX_ENTRIES)
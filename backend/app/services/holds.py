@@ -0,0 +1,184 @@
+import asyncio
+from datetime import timedelta
+from typing import Dict, Optional
+
+from firebase_admin import firestore_async
+from google.cloud.firestore_v1 import SERVER_TIMESTAMP
+
+from app.core.config import settings
+from app.core.metrics import HOLDS
+from app.services.availability import availability_index
+from app.services.capacity import CapacityLedger, capacity_ref, release_seats
+from app.services.firestore import get_db
+from app.services.rollups import Rollups, rollup_worker
+from app.services.slots import SlotPacing, slot_limits
+from app.utils.datetime import get_utc_now
+
+HOLDS_COLLECTION = "holds"
+
+# A seat hold at holds/{id} takes seats the way a reservation does: its guests
+# are counted on the capacity doc (or its shards) and in the slot counters, so
+# nobody else can book them, but it stays out of the daily, kitchen and review
+# rollups. Booking with the hold id converts it: the reservation inherits the
+# hold's seats and shard allocation, and the transaction locks the hold doc
+# instead of racing for the day's capacity doc. Holds nobody books are given
+# back by the sweeper once expires_at has passed; until then even a hold past
+# its expiry can still be converted, since its seats were never released.
+# Only verified hotel guests place holds, at most HOLD_MAX_PER_ROOM per room.
+
+
+class HoldLimitReached(ValueError):
+    """The room already has as many unexpired holds as it may."""
+
+
+class HoldMismatch(ValueError):
+    """A booking tried to convert a hold placed for other seats or another room."""
+
+
+def hold_ref(db, hold_id: Optional[str] = None):
+    """The hold doc `hold_id`, or a new one with an auto id."""
+    return db.collection(HOLDS_COLLECTION).document(hold_id)
+
+
+def hold_record(
+    restaurant: str,
+    date: str,
+    time: str,
+    guests: int,
+    allocation: Dict[str, int],
+    room: str
+) -> dict:
+    return {
+        "room": room,
+        "restaurant": restaurant,
+        "date": date,
+        "time": time,
+        "guests": guests,
+        "capacity_allocation": allocation,
+        "expires_at": get_utc_now() + timedelta(seconds=settings.HOLD_TTL_SECONDS),
+        "created_at": SERVER_TIMESTAMP
+    }
+
+
+async def check_hold_limit(transaction, db, room: str):
+    """
+    Raise HoldLimitReached if `room` already has HOLD_MAX_PER_ROOM unexpired
+    holds. Read in the transaction, so concurrent holds for one room serialize.
+    """
+    now = get_utc_now()
+    query = db.collection(HOLDS_COLLECTION).where("room", "==", room)
+    active = [doc async for doc in query.stream(transaction=transaction) if doc.get("expires_at") > now]
+    if len(active) >= settings.HOLD_MAX_PER_ROOM:
+        raise HoldLimitReached(f"Room {room} already holds seats {len(active)} times")
+
+
+def hold_matches(hold: dict, restaurant: str, date: str, time: str, guests: int, room: str) -> bool:
+    """Whether a booking for these seats, by this room, can take over the hold's."""
+    return (
+        str(hold.get("room", "")).strip() == str(room or "").strip()
+        and hold.get("restaurant") == restaurant
+        and hold.get("date") == date
+        and hold.get("time") == time
+        and int(hold.get("guests", 0)) == int(guests)
+    )
+
+
+class HoldSweeper:
+    """
+    Gives back the seats of expired holds: every `interval` seconds, and right
+    away again while there is a backlog, up to `batch_size` holds are deleted
+    and released in one transaction. Their capacity releases are merged per
+    document, so a batch costs one write per hold plus a few per day touched.
+    """
+
+    def __init__(self, batch_size: int, interval: float):
+        self.batch_size = batch_size
+        self.interval = interval
+        self.released = 0
+        self._task: Optional[asyncio.Task] = None
+
+    async def start(self):
+        self._task = asyncio.create_task(self._loop())
+
+    async def stop(self):
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def sweep(self, db) -> int:
+        """Release one batch of expired holds; returns how many."""
+        query = (db.collection(HOLDS_COLLECTION)
+            .where("expires_at", "<=", get_utc_now())
+            .order_by("expires_at")
+            .limit(self.batch_size))
+        limits = await slot_limits(db)
+        transaction = db.transaction()
+
+        @firestore_async.async_transactional
+        async def sweep_transaction(transaction):
+            # Read inside the transaction: a hold converted meanwhile is not released twice
+            holds = [doc async for doc in query.stream(transaction=transaction)]
+            days = {}
+            for doc in holds:
+                data = doc.to_dict()
+                days[(data["restaurant"], data["date"])] = capacity_ref(db, data["restaurant"], data["date"])
+
+            # A day whose capacity doc was deleted has no seats to give back
+            shard_counts = {
+                doc.reference.path: int(doc.to_dict().get("shard_count", 1))
+                async for doc in db.get_all(list(days.values()), transaction=transaction)
+                if doc.exists
+            }
+
+            ledger = CapacityLedger()
+            pacing = SlotPacing(db, limits)
+            rollups = Rollups()
+            for doc in holds:
+                data = doc.to_dict()
+                day = (data["restaurant"], data["date"])
+                guests = int(data.get("guests", 0))
+                if days[day].path in shard_counts:
+                    release_seats(
+                        ledger, days[day], guests, data.get("capacity_allocation"),
+                        shard_count=shard_counts[days[day].path]
+                    )
+                await pacing.release(transaction, *day, data["time"], guests)
+                rollups.add_slots(*day, {data["time"]: -guests})
+
+            # All reads are done: stage the writes
+            ledger.apply(transaction)
+            pacing.apply(transaction)
+            for doc in holds:
+                transaction.delete(doc.reference)
+            rollups.stage(transaction, db)
+            return len(holds), list(days)
+
+        count, days = await sweep_transaction(transaction)
+        for restaurant, date in days:
+            availability_index.invalidate(restaurant, date)
+        if count:
+            rollup_worker.wake()
+        HOLDS.labels("expired").inc(count)
+        self.released += count
+        return count
+
+    async def _loop(self):
+        while True:
+            try:
+                count = await self.sweep(get_db())
+            except Exception as e:
+                print(f"Hold sweeper error: {e}")
+                count = 0
+
+            if count < self.batch_size:
+                await asyncio.sleep(self.interval)
+
+
+hold_sweeper = HoldSweeper(
+    batch_size=settings.HOLD_SWEEP_BATCH_SIZE,
+    interval=settings.HOLD_SWEEP_INTERVAL_SECONDS
+)
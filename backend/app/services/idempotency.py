@@ -0,0 +1,105 @@
+import hashlib
+import json
+import time
+from collections import OrderedDict
+from datetime import timedelta
+from typing import Optional, Tuple
+
+from app.core.config import settings
+from app.utils.datetime import get_utc_now
+
+IDEMPOTENCY_COLLECTION = "idempotency"
+
+# Keys are client-chosen (a UUID per booking attempt is enough)
+MAX_KEY_LENGTH = 255
+
+
+class IdempotencyKeyReused(ValueError):
+    """The key was already used for a request with a different body."""
+
+
+def validate_key(key: str) -> str:
+    key = key.strip()
+    if not key or len(key) > MAX_KEY_LENGTH:
+        raise ValueError(f"Idempotency-Key must be 1 to {MAX_KEY_LENGTH} characters")
+    return key
+
+
+def request_fingerprint(body: dict) -> str:
+    """Hash of a request body, to tell a retry from a different request reusing the key."""
+    return hashlib.sha256(json.dumps(body, sort_keys=True, default=str).encode()).hexdigest()
+
+
+def idempotency_ref(db, key: str):
+    # Hashed: client keys may contain "/" and other characters doc ids cannot
+    return db.collection(IDEMPOTENCY_COLLECTION).document(hashlib.sha256(key.encode()).hexdigest())
+
+
+def idempotency_record(reservation_id: str, fingerprint: str) -> dict:
+    """
+    The idempotency doc written with a new reservation. `expires_at` is the
+    field of the collection's Firestore TTL policy, which deletes it once a
+    retry of the original request can no longer arrive.
+    """
+    return {
+        "reservation_id": reservation_id,
+        "fingerprint": fingerprint,
+        "expires_at": get_utc_now() + timedelta(hours=settings.IDEMPOTENCY_TTL_HOURS)
+    }
+
+
+def replayed_reservation(record: Optional[dict], fingerprint: str) -> Optional[str]:
+    """
+    The reservation id an idempotency doc points to, or None if there is no
+    live doc (TTL deletion can lag by a day, so expiry is checked here too).
+    Raises IdempotencyKeyReused if it was written for a different body.
+    """
+    if not record or record["expires_at"] <= get_utc_now():
+        return None
+    if record["fingerprint"] != fingerprint:
+        raise IdempotencyKeyReused("Idempotency-Key was already used for a different reservation")
+    return record["reservation_id"]
+
+
+class IdempotencyCache:
+    """
+    Front cache of recent idempotency keys, so a retried booking that lands on
+    the instance that served the original costs no Firestore read. Holds at
+    most `max_entries` keys, least recently used first out; the idempotency
+    docs remain the source of truth for every other instance.
+    """
+
+    def __init__(self, max_entries: int):
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        # key -> (reservation id, request fingerprint, monotonic expiry)
+        self._entries: "OrderedDict[str, Tuple[str, str, float]]" = OrderedDict()
+
+    def lookup(self, key: str, fingerprint: str) -> Optional[str]:
+        """The reservation created under `key`, if cached; raises IdempotencyKeyReused."""
+        entry = self._entries.get(key)
+        if entry is None or time.monotonic() >= entry[2]:
+            self._entries.pop(key, None)
+            self.misses += 1
+            return None
+
+        if entry[1] != fingerprint:
+            raise IdempotencyKeyReused("Idempotency-Key was already used for a different reservation")
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return entry[0]
+
+    def put(self, key: str, reservation_id: str, fingerprint: str):
+        self._entries[key] = (
+            reservation_id, fingerprint, time.monotonic() + settings.IDEMPOTENCY_TTL_HOURS * 3600
+        )
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def clear(self):
+        self._entries.clear()
+
+
+idempotency_cache = IdempotencyCache(max_entries=settings.IDEMPOTENCY_CACHE_MAX_ENTRIES)
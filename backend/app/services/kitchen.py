@@ -0,0 +1,122 @@
+from collections import Counter
+from typing import Dict, Optional
+
+from google.cloud.firestore_v1 import SERVER_TIMESTAMP, Increment
+
+from app.services.stats import BACKFILL_BATCH_SIZE
+
+KITCHEN_PREP_COLLECTION = "kitchen_prep"
+
+# kitchen_prep/{restaurant}_{date} holds the whole prep sheet for one service:
+# reservations and covers, dishes per main course id, items per upsell id and
+# covers per time slot. The rollup worker adds the bookings' changes to it from
+# rollup_outbox events, so the kitchen screen reads one document.
+
+
+def kitchen_prep_ref(db, restaurant: str, date: str):
+    return db.collection(KITCHEN_PREP_COLLECTION).document(f"{restaurant}_{date}")
+
+
+def _increments(counts: Dict[str, int]) -> dict:
+    return {key: Increment(value) for key, value in counts.items() if key and value}
+
+
+def stage_kitchen_prep(
+    writer,
+    db,
+    restaurant: str,
+    date: str,
+    reservations: int = 0,
+    covers: Optional[Dict[str, int]] = None,
+    main_courses: Optional[Dict[str, int]] = None,
+    upsells: Optional[Dict[str, int]] = None
+):
+    """Add blind increments to a restaurant-day prep sheet in a transaction or batch."""
+    data = {
+        "covers_by_time": _increments(covers or {}),
+        "main_courses": _increments(main_courses or {}),
+        "upsells": _increments(upsells or {})
+    }
+    data = {field: counts for field, counts in data.items() if counts}
+    total_covers = sum((covers or {}).values())
+    if reservations:
+        data["reservations"] = Increment(reservations)
+    if total_covers:
+        data["covers"] = Increment(total_covers)
+    if not data:
+        return
+
+    writer.set(kitchen_prep_ref(db, restaurant, date), {
+        "restaurant": restaurant,
+        "date": date,
+        "updated_at": SERVER_TIMESTAMP,
+        **data
+    }, merge=True)
+
+
+def reservation_prep_counts(reservation: dict) -> dict:
+    """A reservation's contribution to its prep sheet."""
+    return {
+        "covers": {reservation.get("time"): int(reservation.get("guests", 0))},
+        "main_courses": dict(Counter(reservation.get("main_courses") or [])),
+        "upsells": {item: int(count) for item, count in (reservation.get("upsell_items") or {}).items()}
+    }
+
+
+async def backfill_kitchen_prep(db, from_date: Optional[str] = None, to_date: Optional[str] = None) -> int:
+    """
+    Recompute kitchen_prep from the confirmed reservations in [from_date, to_date]
+    (all dates if omitted), deleting sheets for days left without bookings.
+    Returns the number of sheets written. Run it while bookings are quiet.
+    """
+    query = db.collection("reservations").where("status", "==", "confirmed")
+    prep_query = db.collection(KITCHEN_PREP_COLLECTION)
+    if from_date:
+        query = query.where("date", ">=", from_date)
+        prep_query = prep_query.where("date", ">=", from_date)
+    if to_date:
+        query = query.where("date", "<=", to_date)
+        prep_query = prep_query.where("date", "<=", to_date)
+
+    sheets: Dict[tuple, dict] = {}
+    async for doc in query.stream():
+        data = doc.to_dict()
+        restaurant = data.get("restaurant") or data.get("restaurantId")
+        sheet = sheets.setdefault((restaurant, data.get("date")), {
+            "restaurant": restaurant,
+            "date": data.get("date"),
+            "reservations": 0,
+            "covers": 0,
+            "covers_by_time": Counter(),
+            "main_courses": Counter(),
+            "upsells": Counter()
+        })
+        counts = reservation_prep_counts(data)
+        sheet["reservations"] += 1
+        sheet["covers"] += int(data.get("guests", 0))
+        for field in ("main_courses", "upsells"):
+            sheet[field].update(counts[field])
+        sheet["covers_by_time"].update({time: covers for time, covers in counts["covers"].items() if time})
+
+    writes = [
+        (doc.reference, None) async for doc in prep_query.stream()
+        if (doc.get("restaurant"), doc.get("date")) not in sheets
+    ]
+    writes += [
+        (kitchen_prep_ref(db, restaurant, date), {
+            **{field: dict(value) if isinstance(value, Counter) else value for field, value in sheet.items()},
+            "updated_at": SERVER_TIMESTAMP
+        })
+        for (restaurant, date), sheet in sheets.items()
+    ]
+
+    for start in range(0, len(writes), BACKFILL_BATCH_SIZE):
+        batch = db.batch()
+        for ref, data in writes[start:start + BACKFILL_BATCH_SIZE]:
+            if data is None:
+                batch.delete(ref)
+            else:
+                batch.set(ref, data)
+        await batch.commit()
+
+    return len(sheets)
@@ -0,0 +1,57 @@
+import base64
+import binascii
+import json
+import time
+from typing import Dict, Hashable, Tuple
+
+from app.core.config import settings
+
+
+def encode_cursor(*values) -> str:
+    """Opaque page cursor carrying the order-by values of the last row of a page."""
+    raw = json.dumps(list(values), separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str, size: int) -> list:
+    """The `size` order-by values in `cursor`; raises ValueError if it is malformed."""
+    try:
+        values = json.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+    except (binascii.Error, UnicodeDecodeError, json.JSONDecodeError) as e:
+        raise ValueError("Invalid cursor") from e
+
+    if not isinstance(values, list) or len(values) != size:
+        raise ValueError("Invalid cursor")
+    return values
+
+
+class CountCache:
+    """
+    Results of aggregation count() queries keyed by their filter combination,
+    each kept for `ttl_seconds`. Counts shown next to a paged list only need
+    to be roughly current, and this keeps page flips from re-running them.
+    """
+
+    def __init__(self, ttl_seconds: float):
+        self.ttl_seconds = ttl_seconds
+        self._entries: Dict[Hashable, Tuple[int, float]] = {}
+
+    async def count(self, key: Hashable, query) -> int:
+        entry = self._entries.get(key)
+        if entry and time.monotonic() - entry[1] < self.ttl_seconds:
+            return entry[0]
+
+        results = await query.count(alias="total").get()
+        total = int(results[0][0].value)
+
+        now = time.monotonic()
+        # Drop expired combinations so the cache cannot grow without bound
+        self._entries = {k: v for k, v in self._entries.items() if now - v[1] < self.ttl_seconds}
+        self._entries[key] = (total, now)
+        return total
+
+    def clear(self):
+        self._entries.clear()
+
+
+count_cache = CountCache(ttl_seconds=settings.COUNT_CACHE_TTL_SECONDS)
@@ -0,0 +1,137 @@
+import asyncio
+import secrets
+import time
+
+from google.cloud.firestore_v1 import SERVER_TIMESTAMP
+from google.cloud.firestore_v1.field_path import FieldPath
+
+from app.services.email import review_request_message
+from app.services.email_outbox import email_outbox, stage_email
+
+REVIEW_TOKENS_COLLECTION = "review_tokens"
+
+# Each reservation costs three writes (reservation update, review token and
+# outbox message), which keeps a full chunk at 450 writes, under Firestore's
+# 500-per-batch limit.
+REVIEW_CHUNK_SIZE = 150
+
+# Chunks committed concurrently while the next page is being read.
+REVIEW_MAX_IN_FLIGHT = 4
+
+
+def generate_review_token():
+    return secrets.token_urlsafe(24)
+
+
+def review_token_record(reservation_id: str, reservation: dict) -> dict:
+    """
+    The review_tokens/{token} lookup doc. It carries everything a review
+    submission needs, so submitting is a single point read.
+    """
+    return {
+        "reservationId": reservation_id,
+        "restaurantId": reservation.get("restaurantId") or reservation.get("restaurant"),
+        "guestName": reservation.get("name"),
+        "guestEmail": reservation.get("email"),
+        "room": reservation.get("room"),
+        "dinnerDate": reservation.get("date"),
+        "used": bool(reservation.get("review", {}).get("received")),
+        "createdAt": SERVER_TIMESTAMP
+    }
+
+
+def stage_review_token(writer, db, token: str, reservation_id: str, reservation: dict):
+    """Add the review_tokens/{token} lookup doc to a transaction or batch."""
+    writer.set(
+        db.collection(REVIEW_TOKENS_COLLECTION).document(token),
+        review_token_record(reservation_id, reservation)
+    )
+
+
+async def dispatch_review_requests(
+    db,
+    dinner_date: str,
+    chunk_size: int = REVIEW_CHUNK_SIZE,
+    max_in_flight: int = REVIEW_MAX_IN_FLIGHT
+) -> dict:
+    """
+    Queue review-request emails for every confirmed reservation on `dinner_date`
+    that has not been asked yet.
+
+    Pages through the query by document id and commits each page as one batch
+    that marks the reservations, creates their review tokens and stages their
+    outbox emails, with at most `max_in_flight` batches committing at once. A
+    reservation is only marked together with its email, so an interrupted or
+    partially failed run can simply be re-run: already-requested reservations
+    no longer match.
+    """
+    started = time.perf_counter()
+    report = {"date": dinner_date, "scanned": 0, "sent": 0, "skipped": 0, "chunks": 0, "failed": []}
+
+    query = (db.collection("reservations")
+        .where("status", "==", "confirmed")
+        .where("review.requestSent", "==", False)
+        .where("date", "==", dinner_date)
+        .order_by(FieldPath.document_id()))
+
+    semaphore = asyncio.Semaphore(max_in_flight)
+    tasks = []
+
+    async def commit_chunk(docs):
+        batch = db.batch()
+        queued = []
+
+        for doc in docs:
+            data = doc.to_dict()
+            email = data.get("email")
+            restaurant = data.get("restaurantId") or data.get("restaurant")
+
+            if not email or not restaurant:
+                report["skipped"] += 1
+                continue
+
+            token = generate_review_token()
+            stage_review_token(batch, db, token, doc.id, data)
+            stage_email(batch, db, review_request_message(email, data.get("name"), restaurant, token))
+            batch.update(doc.reference, {
+                "review.requestSent": True,
+                "review.requestSentAt": SERVER_TIMESTAMP,
+                "review.token": token
+            })
+            queued.append(doc.id)
+
+        if not queued:
+            return
+
+        try:
+            await batch.commit()
+            report["sent"] += len(queued)
+            report["chunks"] += 1
+            email_outbox.wake()
+        except Exception as e:
+            report["failed"].extend({"id": doc_id, "error": str(e)} for doc_id in queued)
+
+    last_doc = None
+    while True:
+        page = query.limit(chunk_size) if last_doc is None else query.start_after(last_doc).limit(chunk_size)
+        docs = await page.get()
+        if not docs:
+            break
+
+        report["scanned"] += len(docs)
+        last_doc = docs[-1]
+
+        await semaphore.acquire()
+        task = asyncio.create_task(commit_chunk(docs))
+        task.add_done_callback(lambda _: semaphore.release())
+        tasks.append(task)
+
+        if len(docs) < chunk_size:
+            break
+
+    await asyncio.gather(*tasks)
+
+    elapsed = time.perf_counter() - started
+    report["elapsed_seconds"] = round(elapsed, 3)
+    report["per_second"] = round(report["sent"] / elapsed, 1) if elapsed > 0 else 0.0
+    return report
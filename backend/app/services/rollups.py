@@ -0,0 +1,226 @@
+import asyncio
+from typing import Dict, Optional, Tuple
+
+from firebase_admin import firestore_async
+
+from app.core.config import settings
+from app.services.availability import availability_index
+from app.services.firestore import get_db
+from app.services.kitchen import reservation_prep_counts, stage_kitchen_prep
+from app.services.slots import stage_slot_changes
+from app.services.stats import stage_daily_stats
+from app.utils.datetime import get_utc_now
+
+ROLLUP_OUTBOX_COLLECTION = "rollup_outbox"
+
+# The per-day rollups (daily_stats, the slot_counts report, the kitchen_prep
+# sheets) are read-side reports that every booking on a day would otherwise
+# write to, which serializes the day's bookings on one document no matter how
+# the capacity is sharded. Instead a booking transaction writes its deltas as
+# a new rollup_outbox/{auto id} event, which contends with nothing, and the
+# RollupWorker folds batches of events into the rollup docs and deletes them,
+# in one transaction per batch so every event is counted exactly once. The
+# reports lag by about one worker wake-up; anything that must be exact
+# (capacity, pacing) stays out of here.
+
+Day = Tuple[str, str]
+
+PREP_COUNTS = ("covers", "main_courses", "upsells")
+
+
+def _add_counts(target: Dict[str, int], changes: Dict[str, int]):
+    for key, delta in changes.items():
+        if key:
+            target[key] = target.get(key, 0) + int(delta)
+
+
+def _is_empty(deltas: dict) -> bool:
+    prep = deltas["prep"]
+    return not (
+        any(deltas["stats"].values())
+        or any(deltas["slots"].values())
+        or prep["reservations"]
+        or any(any(prep[field].values()) for field in PREP_COUNTS)
+    )
+
+
+class Rollups:
+    """
+    Rollup deltas per restaurant-day, collected by one booking transaction
+    (and staged as outbox events) or merged from a batch of events by the
+    worker (and applied to the rollup docs).
+    """
+
+    def __init__(self):
+        self._days: Dict[Day, dict] = {}
+
+    def _day(self, restaurant: str, date: str) -> dict:
+        return self._days.setdefault((restaurant, date), {
+            "stats": {"reservations": 0, "guests": 0, "revenue": 0.0},
+            "slots": {},
+            "prep": {"reservations": 0, **{field: {} for field in PREP_COUNTS}}
+        })
+
+    def add_stats(self, restaurant: str, date: str, reservations: int = 0, guests: int = 0, revenue: float = 0.0):
+        stats = self._day(restaurant, date)["stats"]
+        stats["reservations"] += reservations
+        stats["guests"] += guests
+        stats["revenue"] += float(revenue)
+
+    def add_slots(self, restaurant: str, date: str, changes: Dict[str, int]):
+        """Per-slot seat deltas ({time: delta}) for the slot_counts report."""
+        _add_counts(self._day(restaurant, date)["slots"], changes)
+
+    def add_prep(
+        self,
+        restaurant: str,
+        date: str,
+        reservations: int = 0,
+        covers: Optional[Dict[str, int]] = None,
+        main_courses: Optional[Dict[str, int]] = None,
+        upsells: Optional[Dict[str, int]] = None
+    ):
+        """Deltas for the kitchen_prep sheet, as taken by stage_kitchen_prep."""
+        prep = self._day(restaurant, date)["prep"]
+        prep["reservations"] += reservations
+        for field, changes in (("covers", covers), ("main_courses", main_courses), ("upsells", upsells)):
+            _add_counts(prep[field], changes or {})
+
+    def add_reservation(self, reservation: dict, sign: int, seats: bool = True):
+        """
+        Count (sign=1) or un-count (sign=-1) a confirmed reservation. Without
+        `seats` its guests stay out of the slot report: a booking converting a
+        hold takes over seats the hold already counted there.
+        """
+        restaurant = reservation.get("restaurant") or reservation.get("restaurantId")
+        date, guests = reservation.get("date"), int(reservation.get("guests", 0))
+        self.add_stats(
+            restaurant, date,
+            reservations=sign,
+            guests=sign * guests,
+            revenue=sign * float(reservation.get("upsell_total_price") or 0.0)
+        )
+        if seats:
+            self.add_slots(restaurant, date, {reservation.get("time"): sign * guests})
+        self.add_prep(
+            restaurant, date,
+            reservations=sign,
+            **{
+                field: {key: sign * value for key, value in counts.items()}
+                for field, counts in reservation_prep_counts(reservation).items()
+            }
+        )
+
+    def add_event(self, event: dict):
+        """Merge the deltas of one outbox event."""
+        stats = event.get("stats") or {}
+        self.add_stats(
+            event["restaurant"], event["date"],
+            reservations=int(stats.get("reservations", 0)),
+            guests=int(stats.get("guests", 0)),
+            revenue=float(stats.get("revenue", 0.0))
+        )
+        self.add_slots(event["restaurant"], event["date"], event.get("slots") or {})
+        prep = event.get("prep") or {}
+        self.add_prep(
+            event["restaurant"], event["date"],
+            reservations=int(prep.get("reservations", 0)),
+            **{field: prep.get(field) for field in PREP_COUNTS}
+        )
+
+    def slot_days(self) -> list:
+        """Restaurant-days whose slot report changes."""
+        return [day for day, deltas in self._days.items() if any(deltas["slots"].values())]
+
+    def stage(self, writer, db):
+        """Add one outbox event per restaurant-day to a transaction or batch."""
+        for (restaurant, date), deltas in self._days.items():
+            if _is_empty(deltas):
+                continue
+            writer.set(db.collection(ROLLUP_OUTBOX_COLLECTION).document(), {
+                "restaurant": restaurant,
+                "date": date,
+                **deltas,
+                "created_at": get_utc_now()
+            })
+
+    def apply(self, writer, db):
+        """Add the merged deltas to the rollup docs in a transaction or batch."""
+        for (restaurant, date), deltas in self._days.items():
+            stage_daily_stats(writer, db, restaurant, date, **deltas["stats"])
+            stage_slot_changes(writer, db, restaurant, date, deltas["slots"])
+            stage_kitchen_prep(writer, db, restaurant, date, **deltas["prep"])
+
+
+class RollupWorker:
+    """
+    Applies rollup_outbox events: every `interval` seconds, right after a
+    booking wakes it, and right away again while there is a backlog.
+    """
+
+    def __init__(self, batch_size: int, interval: float):
+        self.batch_size = batch_size
+        self.interval = interval
+        self.applied = 0
+        self._wake = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+
+    def wake(self):
+        """Apply pending events right away instead of waiting for the next interval."""
+        self._wake.set()
+
+    async def start(self):
+        self._task = asyncio.create_task(self._loop())
+
+    async def stop(self):
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def apply(self, db) -> int:
+        """Fold one batch of events into the rollups; returns how many."""
+        query = db.collection(ROLLUP_OUTBOX_COLLECTION).order_by("created_at").limit(self.batch_size)
+        transaction = db.transaction()
+
+        @firestore_async.async_transactional
+        async def apply_transaction(transaction):
+            # Read in the transaction: a batch another instance applied meanwhile aborts this one
+            events = [doc async for doc in query.stream(transaction=transaction)]
+            rollups = Rollups()
+            for doc in events:
+                rollups.add_event(doc.to_dict())
+                transaction.delete(doc.reference)
+            rollups.apply(transaction, db)
+            return len(events), rollups.slot_days()
+
+        count, slot_days = await apply_transaction(transaction)
+        for restaurant, date in slot_days:
+            availability_index.invalidate_slots(restaurant, date)
+        self.applied += count
+        return count
+
+    async def _loop(self):
+        while True:
+            # Cleared before reading, so a booking committed during apply() wakes the next round
+            self._wake.clear()
+            try:
+                count = await self.apply(get_db())
+            except Exception as e:
+                print(f"Rollup worker error: {e}")
+                count = 0
+
+            if count < self.batch_size:
+                try:
+                    await asyncio.wait_for(self._wake.wait(), timeout=self.interval)
+                except asyncio.TimeoutError:
+                    pass
+
+
+rollup_worker = RollupWorker(
+    batch_size=settings.ROLLUP_BATCH_SIZE,
+    interval=settings.ROLLUP_INTERVAL_SECONDS
+)
@@ -0,0 +1,68 @@
+import re
+import unicodedata
+from typing import List, Optional
+
+from app.services.stats import BACKFILL_BATCH_SIZE
+
+# Reservations carry a `search_keys` array of normalized prefixes of the guest
+# name (each word and the full name), the room number and the email, so
+# reception search is a single `array_contains` query over the whole date range.
+
+# Longest prefix indexed; longer search terms are cut to this length
+MAX_PREFIX_LENGTH = 20
+
+
+def normalize_search_text(text: Optional[str]) -> str:
+    """Lowercase, strip accents and collapse whitespace."""
+    text = unicodedata.normalize("NFKD", str(text or ""))
+    text = "".join(c for c in text if not unicodedata.combining(c))
+    return re.sub(r"\s+", " ", text).strip().lower()
+
+
+def _prefixes(text: str) -> List[str]:
+    return [text[:i] for i in range(1, min(len(text), MAX_PREFIX_LENGTH) + 1)]
+
+
+def search_keys(reservation: dict) -> List[str]:
+    """All search terms that should find `reservation`."""
+    keys = set()
+
+    name = normalize_search_text(reservation.get("name"))
+    for word in name.split(" "):
+        keys.update(_prefixes(word))
+    keys.update(_prefixes(name))
+
+    keys.update(_prefixes(normalize_search_text(reservation.get("room")).replace(" ", "")))
+
+    keys.update(_prefixes(normalize_search_text(reservation.get("email"))))
+
+    return sorted(keys)
+
+
+def search_term(search: Optional[str]) -> Optional[str]:
+    """The `search_keys` value to query for a search box input, or None if it is empty."""
+    term = normalize_search_text(search)[:MAX_PREFIX_LENGTH]
+    return term or None
+
+
+async def backfill_search_keys(db) -> int:
+    """Add or refresh `search_keys` on every reservation. Returns the number updated."""
+    batch = db.batch()
+    pending = updated = 0
+
+    async for doc in db.collection("reservations").stream():
+        data = doc.to_dict()
+        keys = search_keys(data)
+        if data.get("search_keys") == keys:
+            continue
+        batch.update(doc.reference, {"search_keys": keys})
+        pending += 1
+        updated += 1
+        if pending == BACKFILL_BATCH_SIZE:
+            await batch.commit()
+            batch, pending = db.batch(), 0
+
+    if pending:
+        await batch.commit()
+
+    return updated
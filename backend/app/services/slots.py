@@ -0,0 +1,225 @@
+from typing import Dict, List, Optional
+
+from google.cloud.firestore_v1 import Increment
+
+from app.services.capacity import SoldOut
+from app.services.catalog import config_catalog, restaurant_catalog
+from app.services.stats import BACKFILL_BATCH_SIZE
+
+SLOT_COUNTS_COLLECTION = "slot_counts"
+SLOT_PACING_COLLECTION = "slot_pacing"
+
+# Seats booked per time slot are reported at slot_counts/{restaurant}_{date} as
+# {"restaurant", "date", "reserved": {"19:00": 12, ...}}. That report is kept by
+# the rollup worker from rollup_outbox events, never by booking transactions.
+# Restaurants with a per-slot pacing limit also keep an exact counter per slot
+# at slot_pacing/{restaurant}_{date}_{time}, which their booking transactions
+# read and increment, so only bookings for the same time contend. The slot
+# grid itself (which times exist and how many seats each may take) is derived
+# from the cached restaurant catalogs, never stored.
+
+
+def slot_counts_ref(db, restaurant: str, date: str):
+    return db.collection(SLOT_COUNTS_COLLECTION).document(f"{restaurant}_{date}")
+
+
+def slot_pacing_ref(db, restaurant: str, date: str, time: str):
+    return db.collection(SLOT_PACING_COLLECTION).document(f"{restaurant}_{date}_{time}")
+
+
+def slot_times(opening: str, closing: str, interval_minutes: int) -> List[str]:
+    """Slot start times from opening up to (not including) closing, past midnight if needed."""
+    def minutes(hhmm: str) -> int:
+        hours, mins = hhmm.split(":")
+        return int(hours) * 60 + int(mins)
+
+    start, end = minutes(opening), minutes(closing)
+    if end <= start:
+        end += 24 * 60
+    return [
+        f"{(t // 60) % 24:02d}:{t % 60:02d}"
+        for t in range(start, end, max(1, int(interval_minutes)))
+    ]
+
+
+async def slot_settings(db) -> Dict[str, dict]:
+    """
+    {restaurant: {"times": [...], "slot_capacity": int | None}} for every
+    restaurant with opening hours. The restaurant_configs entry wins over the
+    restaurant's own time config.
+    """
+    settings_by_restaurant = {}
+
+    for restaurant in await restaurant_catalog.get(db):
+        settings_by_restaurant[restaurant.id] = {
+            "times": slot_times(
+                restaurant.config.openingTime,
+                restaurant.config.closingTime,
+                restaurant.config.timeSlotInterval
+            ),
+            "slot_capacity": None
+        }
+
+    for restaurant_id, config in (await config_catalog.get(db)).items():
+        settings_by_restaurant[restaurant_id] = {
+            "times": slot_times(config.openingTime, config.closingTime, config.intervalMinutes),
+            "slot_capacity": config.slotCapacity
+        }
+
+    return settings_by_restaurant
+
+
+async def slot_limits(db) -> Dict[str, int]:
+    """
+    {restaurant: slot_capacity} for every restaurant with a pacing limit.
+    Resolve it before opening a transaction: the catalogs may need a reload.
+    """
+    return {
+        restaurant: settings["slot_capacity"]
+        for restaurant, settings in (await slot_settings(db)).items()
+        if settings["slot_capacity"]
+    }
+
+
+class SlotPacing:
+    """
+    The slot_pacing counters touched by one transaction, for restaurants with
+    a limit in `limits` (see slot_limits); a no-op for the others. Each slot's
+    counter is read once, and seats released earlier in the transaction count
+    as free. A counter that does not exist yet (pacing was just switched on,
+    or backfill_slot_counts reset it) is seeded from the slot_counts report.
+    Stage the writes with apply() once every read is done.
+    """
+
+    def __init__(self, db, limits: Dict[str, int]):
+        self._db = db
+        self._limits = limits
+        self._refs = {}
+        self._counts: Dict[str, int] = {}
+        self._deltas: Dict[str, int] = {}
+        self._seeded = {}
+
+    async def _read(self, transaction, restaurant: str, date: str, time: str) -> str:
+        ref = slot_pacing_ref(self._db, restaurant, date, time)
+        if ref.path not in self._refs:
+            doc = await ref.get(transaction=transaction)
+            if doc.exists:
+                count = doc.to_dict().get("reserved", 0)
+            else:
+                report = await slot_counts_ref(self._db, restaurant, date).get(transaction=transaction)
+                count = report.to_dict().get("reserved", {}).get(time, 0) if report.exists else 0
+                self._seeded[ref.path] = {"restaurant": restaurant, "date": date, "time": time}
+            self._refs[ref.path] = ref
+            self._counts[ref.path] = count
+        return ref.path
+
+    async def reserve(self, transaction, restaurant: str, date: str, time: str, guests: int):
+        """Check and count `guests` seats at `time`; raises SoldOut when the slot is full."""
+        slot_capacity = self._limits.get(restaurant)
+        if not slot_capacity:
+            return
+        path = await self._read(transaction, restaurant, date, time)
+        reserved = self._counts[path] + self._deltas.get(path, 0)
+        if reserved + guests > slot_capacity:
+            raise SoldOut(f"Only {max(0, slot_capacity - reserved)} seats available at {time}")
+        self._deltas[path] = self._deltas.get(path, 0) + guests
+
+    async def release(self, transaction, restaurant: str, date: str, time: str, guests: int):
+        if not self._limits.get(restaurant) or not time:
+            return
+        path = await self._read(transaction, restaurant, date, time)
+        self._deltas[path] = self._deltas.get(path, 0) - guests
+
+    def apply(self, transaction):
+        for path, delta in self._deltas.items():
+            if path in self._seeded:
+                transaction.set(self._refs[path], {
+                    **self._seeded[path],
+                    "reserved": max(0, self._counts[path] + delta)
+                })
+            elif delta:
+                transaction.update(self._refs[path], {"reserved": Increment(delta)})
+
+
+def stage_slot_changes(writer, db, restaurant: str, date: str, changes: Dict[str, int]):
+    """Add blind per-slot increments ({time: delta}) for one restaurant-day to a transaction or batch."""
+    changes = {time: delta for time, delta in changes.items() if time and delta}
+    if not changes:
+        return
+    writer.set(slot_counts_ref(db, restaurant, date), {
+        "restaurant": restaurant,
+        "date": date,
+        "reserved": {time: Increment(delta) for time, delta in changes.items()}
+    }, merge=True)
+
+
+def slot_grid(day: dict, reserved: Dict[str, int], settings: Optional[dict]) -> List[dict]:
+    """
+    Remaining seats per slot for one restaurant-day: the smaller of the day's
+    free seats and the slot's own pacing headroom.
+    """
+    if not settings:
+        return []
+
+    day_available = max(0, day.get("capacity", 0) - day.get("reserved_guests", 0))
+    slot_capacity = settings["slot_capacity"]
+
+    grid = []
+    for time in settings["times"]:
+        booked = reserved.get(time, 0)
+        available = day_available
+        if slot_capacity:
+            available = min(available, max(0, slot_capacity - booked))
+        grid.append({"time": time, "reserved": booked, "available": available})
+    return grid
+
+
+async def backfill_slot_counts(db, from_date: Optional[str] = None, to_date: Optional[str] = None) -> int:
+    """
+    Recompute slot_counts from the confirmed reservations in [from_date, to_date]
+    (all dates if omitted), deleting counters for days left without bookings.
+    The slot_pacing counters in the range are deleted too, so each is seeded
+    again from the rebuilt report. Returns the number of restaurant-days
+    written. Run it while bookings are quiet and the rollup outbox is empty.
+    """
+    query = db.collection("reservations").where("status", "==", "confirmed")
+    counts_query = db.collection(SLOT_COUNTS_COLLECTION)
+    pacing_query = db.collection(SLOT_PACING_COLLECTION)
+    if from_date:
+        query = query.where("date", ">=", from_date)
+        counts_query = counts_query.where("date", ">=", from_date)
+        pacing_query = pacing_query.where("date", ">=", from_date)
+    if to_date:
+        query = query.where("date", "<=", to_date)
+        counts_query = counts_query.where("date", "<=", to_date)
+        pacing_query = pacing_query.where("date", "<=", to_date)
+
+    totals: Dict[tuple, Dict[str, int]] = {}
+    async for doc in query.stream():
+        data = doc.to_dict()
+        if not data.get("time"):
+            continue
+        key = (data.get("restaurant") or data.get("restaurantId"), data.get("date"))
+        slots = totals.setdefault(key, {})
+        slots[data["time"]] = slots.get(data["time"], 0) + int(data.get("guests", 0))
+
+    writes = [
+        (doc.reference, None) async for doc in counts_query.stream()
+        if (doc.get("restaurant"), doc.get("date")) not in totals
+    ]
+    writes += [(doc.reference, None) async for doc in pacing_query.select([]).stream()]
+    writes += [
+        (slot_counts_ref(db, restaurant, date), {"restaurant": restaurant, "date": date, "reserved": reserved})
+        for (restaurant, date), reserved in totals.items()
+    ]
+
+    for start in range(0, len(writes), BACKFILL_BATCH_SIZE):
+        batch = db.batch()
+        for ref, data in writes[start:start + BACKFILL_BATCH_SIZE]:
+            if data is None:
+                batch.delete(ref)
+            else:
+                batch.set(ref, data)
+        await batch.commit()
+
+    return len(totals)
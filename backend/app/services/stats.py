@@ -0,0 +1,188 @@
+from typing import Dict, Iterable, Optional, Tuple
+
+from google.cloud.firestore_v1 import SERVER_TIMESTAMP, Increment
+
+from app.utils.datetime import get_local_timezone
+
+DAILY_STATS_COLLECTION = "daily_stats"
+REVIEW_STATS_COLLECTION = "review_stats"
+
+# Stay under Firestore's 500 writes per batch
+BACKFILL_BATCH_SIZE = 400
+
+
+def daily_stats_ref(db, restaurant: str, date: str):
+    return db.collection(DAILY_STATS_COLLECTION).document(f"{restaurant}_{date}")
+
+
+def stage_daily_stats(
+    writer,
+    db,
+    restaurant: str,
+    date: str,
+    reservations: int = 0,
+    guests: int = 0,
+    revenue: float = 0.0
+):
+    """
+    Add a blind increment of the daily_stats/{restaurant}_{date} rollup to a
+    transaction or batch. No read is needed, so it adds no lock contention to
+    the booking transaction beyond the write itself.
+    """
+    if not (reservations or guests or revenue):
+        return
+    writer.set(daily_stats_ref(db, restaurant, date), {
+        "restaurant": restaurant,
+        "date": date,
+        "reservations": Increment(reservations),
+        "guests": Increment(guests),
+        "revenue": Increment(float(revenue)),
+        "updated_at": SERVER_TIMESTAMP
+    }, merge=True)
+
+
+async def backfill_daily_stats(db, from_date: Optional[str] = None, to_date: Optional[str] = None) -> int:
+    """
+    Recompute daily_stats from the confirmed reservations in [from_date, to_date]
+    (all dates if omitted), overwriting existing rollups and deleting rollups for
+    days that no longer have any reservation. Returns the number of rollups written.
+
+    Run it while bookings are quiet: reservations written during the scan can be
+    counted twice or missed until the next backfill.
+    """
+    query = db.collection("reservations").where("status", "==", "confirmed")
+    stats_query = db.collection(DAILY_STATS_COLLECTION)
+    if from_date:
+        query = query.where("date", ">=", from_date)
+        stats_query = stats_query.where("date", ">=", from_date)
+    if to_date:
+        query = query.where("date", "<=", to_date)
+        stats_query = stats_query.where("date", "<=", to_date)
+
+    totals: Dict[Tuple[str, str], dict] = {}
+    async for doc in query.stream():
+        data = doc.to_dict()
+        restaurant = data.get("restaurant") or data.get("restaurantId")
+        date = data.get("date")
+        row = totals.setdefault((restaurant, date), {
+            "restaurant": restaurant,
+            "date": date,
+            "reservations": 0,
+            "guests": 0,
+            "revenue": 0.0
+        })
+        row["reservations"] += 1
+        row["guests"] += int(data.get("guests", 0))
+        row["revenue"] += float(data.get("upsell_total_price") or 0.0)
+
+    stale = [
+        doc.reference async for doc in stats_query.stream()
+        if (doc.get("restaurant"), doc.get("date")) not in totals
+    ]
+
+    batch = db.batch()
+    pending = 0
+
+    for ref in stale:
+        batch.delete(ref)
+        pending += 1
+        if pending == BACKFILL_BATCH_SIZE:
+            await batch.commit()
+            batch, pending = db.batch(), 0
+
+    for (restaurant, date), row in totals.items():
+        batch.set(daily_stats_ref(db, restaurant, date), {**row, "updated_at": SERVER_TIMESTAMP})
+        pending += 1
+        if pending == BACKFILL_BATCH_SIZE:
+            await batch.commit()
+            batch, pending = db.batch(), 0
+
+    if pending:
+        await batch.commit()
+
+    return len(totals)
+
+
+def review_stats_ref(db, restaurant: str, date: str):
+    return db.collection(REVIEW_STATS_COLLECTION).document(f"{restaurant}_{date}")
+
+
+def stage_review_stats(writer, db, restaurant: str, date: str, rating: int):
+    """
+    Add one rating to the review_stats/{restaurant}_{date} bucket (count, sum and
+    a 1-10 histogram) in a transaction or batch, keyed by the day it was submitted.
+    """
+    writer.set(review_stats_ref(db, restaurant, date), {
+        "restaurantId": restaurant,
+        "date": date,
+        "count": Increment(1),
+        "sum": Increment(rating),
+        "histogram": {str(rating): Increment(1)}
+    }, merge=True)
+
+
+def merge_review_stats(buckets: Iterable[dict]) -> dict:
+    """Combine daily review buckets into the count/avg/histogram summary."""
+    count = 0
+    total_rating = 0
+    histogram = {i: 0 for i in range(1, 11)}
+
+    for bucket in buckets:
+        count += bucket.get("count", 0)
+        total_rating += bucket.get("sum", 0)
+        for rating, hits in (bucket.get("histogram") or {}).items():
+            if 1 <= int(rating) <= 10:
+                histogram[int(rating)] += hits
+
+    avg = (total_rating / count) if count > 0 else 0
+    return {"count": count, "avg": round(avg, 1), "histogram": histogram}
+
+
+async def backfill_review_stats(db, timezone_str: str) -> int:
+    """
+    Rebuild every review_stats bucket from restaurant_reviews, bucketing each
+    review by its local submission date. Returns the number of buckets written.
+    """
+    buckets: Dict[Tuple[str, str], dict] = {}
+    async for doc in db.collection("restaurant_reviews").stream():
+        data = doc.to_dict()
+        rating = int(data.get("rating", 0))
+        created_at = data.get("createdAt")
+        if not created_at or not 1 <= rating <= 10:
+            continue
+
+        restaurant = data.get("restaurantId")
+        date = created_at.astimezone(get_local_timezone(timezone_str)).strftime("%Y-%m-%d")
+        bucket = buckets.setdefault((restaurant, date), {
+            "restaurantId": restaurant,
+            "date": date,
+            "count": 0,
+            "sum": 0,
+            "histogram": {}
+        })
+        bucket["count"] += 1
+        bucket["sum"] += rating
+        bucket["histogram"][str(rating)] = bucket["histogram"].get(str(rating), 0) + 1
+
+    batch = db.batch()
+    pending = 0
+    async for doc in db.collection(REVIEW_STATS_COLLECTION).stream():
+        if (doc.get("restaurantId"), doc.get("date")) in buckets:
+            continue
+        batch.delete(doc.reference)
+        pending += 1
+        if pending == BACKFILL_BATCH_SIZE:
+            await batch.commit()
+            batch, pending = db.batch(), 0
+
+    for (restaurant, date), bucket in buckets.items():
+        batch.set(review_stats_ref(db, restaurant, date), bucket)
+        pending += 1
+        if pending == BACKFILL_BATCH_SIZE:
+            await batch.commit()
+            batch, pending = db.batch(), 0
+
+    if pending:
+        await batch.commit()
+
+    return len(buckets)
@@ -0,0 +1,103 @@
+import asyncio
+import time
+from typing import Dict, Optional
+
+from firebase_admin import firestore
+
+from app.core.config import settings
+from app.services.availability import availability_index
+from app.services.catalog import config_catalog, restaurant_catalog
+from app.services.firestore import get_db
+from app.services.guest_list import guest_list_cache
+
+# Delay between attempts when a warmup step fails (Firestore not reachable yet)
+WARMUP_RETRY_SECONDS = (1, 2, 5, 10, 30)
+
+
+class Warmup:
+    """
+    Gets an instance ready to serve before it takes traffic: builds the
+    Firestore client and opens its channel, then fills the catalog, guest-list
+    and availability caches. Runs in the background from startup; `/ready`
+    reports 503 until it has finished, so a startup probe on `/ready` keeps
+    the first requests off a cold instance.
+    """
+
+    def __init__(self):
+        self.ready = False
+        self.steps: Dict[str, float] = {}
+        self.import_seconds: Optional[float] = None
+        self.cold_start_seconds: Optional[float] = None
+        self.attempts = 0
+        self.error: Optional[str] = None
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self, process_started: float, import_seconds: Optional[float] = None):
+        """
+        Warm up in the background; `process_started` is a perf_counter() taken
+        at import and `import_seconds` how long the app's imports took.
+        """
+        self.import_seconds = import_seconds
+        self._task = asyncio.create_task(self._run(process_started))
+
+    async def stop(self):
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _step(self, name: str, coro):
+        started = time.perf_counter()
+        result = await coro
+        self.steps[name] = round(time.perf_counter() - started, 3)
+        return result
+
+    async def _warm(self):
+        db = await self._step("firestore_client", asyncio.to_thread(get_db))
+        # First RPC: credentials, DNS, TLS and the gRPC channel
+        await self._step("firestore_channel", db.collection("restaurants").limit(1).get())
+        await self._step("catalogs", asyncio.gather(restaurant_catalog.get(db), config_catalog.get(db)))
+        await self._step("guest_list", guest_list_cache.load(db))
+        await self._step("availability", availability_index.query(db))
+
+        if settings.GUEST_LIST_LISTENER_ENABLED:
+            await self._step("guest_list_listener", asyncio.to_thread(
+                lambda: guest_list_cache.watch(firestore.client())
+            ))
+
+    async def _run(self, process_started: float):
+        while True:
+            self.attempts += 1
+            try:
+                await self._warm()
+                break
+            except Exception as e:
+                self.error = str(e)
+                delay = WARMUP_RETRY_SECONDS[min(self.attempts, len(WARMUP_RETRY_SECONDS)) - 1]
+                print(f"⚠️ Warmup attempt {self.attempts} failed ({e}); retrying in {delay}s")
+                await asyncio.sleep(delay)
+
+        self.error = None
+        self.cold_start_seconds = round(time.perf_counter() - process_started, 3)
+        self.ready = True
+        print(
+            f"✅ Warm in {self.cold_start_seconds}s since import "
+            f"({', '.join(f'{name} {seconds}s' for name, seconds in self.steps.items())}, "
+            f"{guest_list_cache.stats()['entries']} guests cached)"
+        )
+
+    def status(self) -> dict:
+        return {
+            "ready": self.ready,
+            "import_seconds": self.import_seconds,
+            "cold_start_seconds": self.cold_start_seconds,
+            "steps": self.steps,
+            "attempts": self.attempts,
+            "error": self.error
+        }
+
+
+warmup = Warmup()
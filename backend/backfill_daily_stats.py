@@ -0,0 +1,55 @@
+# backend/backfill_daily_stats.py
+# Rebuilds the daily_stats rollups read by the admin analytics dashboard
+# from the confirmed reservations, e.g. after deploying the rollups or to
+# repair drift:  python backfill_daily_stats.py --from 2025-01-01 --to 2025-12-31
+# Pass --reviews to also rebuild the review_stats buckets behind /reviews/summary,
+# --slots to rebuild the per-slot slot_counts behind GET /availability and
+# --kitchen to rebuild the kitchen_prep sheets behind GET /kitchen/prep.
+import argparse
+import asyncio
+
+import firebase_admin
+from firebase_admin import credentials
+
+from app.core.config import settings
+from app.services.firestore import get_db
+from app.services.kitchen import backfill_kitchen_prep
+from app.services.slots import backfill_slot_counts
+from app.services.stats import backfill_daily_stats, backfill_review_stats
+
+async def main():
+    parser = argparse.ArgumentParser(description="Backfill daily_stats rollups")
+    parser.add_argument("--from", dest="from_date", help="First dinner date (YYYY-MM-DD)")
+    parser.add_argument("--to", dest="to_date", help="Last dinner date (YYYY-MM-DD)")
+    parser.add_argument("--reviews", action="store_true", help="Also rebuild review_stats")
+    parser.add_argument("--slots", action="store_true", help="Also rebuild slot_counts")
+    parser.add_argument("--kitchen", action="store_true", help="Also rebuild kitchen_prep")
+    args = parser.parse_args()
+
+    if not firebase_admin._apps:
+        cred = credentials.Certificate("service-account.json")
+        firebase_admin.initialize_app(cred, {
+            'storageBucket': settings.FIREBASE_STORAGE_BUCKET
+        })
+
+    print("📊 Backfilling daily stats...")
+    count = await backfill_daily_stats(get_db(), args.from_date, args.to_date)
+    print(f"✅ Wrote {count} daily_stats rollups.")
+
+    if args.reviews:
+        print("⭐ Backfilling review stats...")
+        count = await backfill_review_stats(get_db(), settings.LOCAL_TIMEZONE)
+        print(f"✅ Wrote {count} review_stats buckets.")
+
+    if args.slots:
+        print("🕖 Backfilling slot counts...")
+        count = await backfill_slot_counts(get_db(), args.from_date, args.to_date)
+        print(f"✅ Wrote {count} slot_counts days.")
+
+    if args.kitchen:
+        print("🍝 Backfilling kitchen prep sheets...")
+        count = await backfill_kitchen_prep(get_db(), args.from_date, args.to_date)
+        print(f"✅ Wrote {count} kitchen_prep sheets.")
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,25 @@
+# backend/backfill_search_keys.py
+# Adds the search_keys index used by reception search (GET /reservations?search=)
+# to reservations created before it existed:  python backfill_search_keys.py
+import asyncio
+
+import firebase_admin
+from firebase_admin import credentials
+
+from app.core.config import settings
+from app.services.firestore import get_db
+from app.services.search import backfill_search_keys
+
+async def main():
+    if not firebase_admin._apps:
+        cred = credentials.Certificate("service-account.json")
+        firebase_admin.initialize_app(cred, {
+            'storageBucket': settings.FIREBASE_STORAGE_BUCKET
+        })
+
+    print("🔎 Indexing reservations for search...")
+    count = await backfill_search_keys(get_db())
+    print(f"✅ Updated {count} reservations.")
+
+if __name__ == "__main__":
+    asyncio.run(main())
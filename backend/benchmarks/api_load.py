@@ -0,0 +1,216 @@
+# backend/benchmarks/api_load.py
+"""
+Load benchmark for the booking API, runnable offline.
+
+Drives create_reservation, list_reservations, get_capacities and the
+analytics dashboard through the ASGI app in-process (no server, no network)
+with --concurrency requests in flight, and prints req/s, p50/p95/p99 latency,
+Firestore reads and writes per request and aborted transaction commits for
+each endpoint. Auth is bypassed with an admin user.
+
+By default Firestore is the in-memory fake from tests/, with --latency-ms
+per round-trip so concurrent requests interleave (and contend) as they do
+against the real service:
+
+    python -m benchmarks.api_load --requests 500 --concurrency 50 --latency-ms 5
+
+or the Firestore emulator (never production):
+
+    FIRESTORE_EMULATOR_HOST=localhost:8080 python -m benchmarks.api_load --emulator
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import time
+from collections import Counter
+from datetime import timedelta
+from typing import Callable, Dict, List, Optional, Tuple
+
+import httpx
+from firebase_admin import firestore_async
+
+import app.services.firestore as firestore_service
+from app.api.deps import get_current_user
+from app.core.config import settings
+from app.main import app
+from app.services.availability import availability_index
+from app.services.catalog import config_catalog, restaurant_catalog
+from app.services.pagination import count_cache
+from app.utils.datetime import get_local_now
+from tests.fake_firestore import use_fake_db
+
+RESTAURANT = "BenchRestaurant"
+DAYS = 14
+SCENARIOS = ("create", "list", "capacities", "analytics")
+
+BENCH_USER = {"uid": "bench", "email": "bench@example.com", "role": "admin"}
+
+Request = Tuple[str, str, Optional[dict]]
+
+
+def bench_dates() -> List[str]:
+    tomorrow = get_local_now(settings.LOCAL_TIMEZONE) + timedelta(days=1)
+    return [(tomorrow + timedelta(days=day)).strftime("%Y-%m-%d") for day in range(DAYS)]
+
+
+def request_builders(dates: List[str]) -> Dict[str, Callable[[int], Request]]:
+    window = f"from_date={dates[0]}&to_date={dates[-1]}"
+    return {
+        "create": lambda i: ("POST", "/api/v1/reservations", {
+            "date": dates[i % len(dates)],
+            "time": f"{18 + i % 4}:00",
+            "guests": 1 + i % 4,
+            "room": str(100 + i % 400),
+            "first_name": "Bench",
+            "last_name": f"Guest{i}",
+            "email": f"guest{i}@example.com",
+            "restaurant": RESTAURANT,
+            "main_courses": ["pasta"],
+            "upsell_items": {"Sushi Platter": i % 2}
+        }),
+        "list": lambda i: ("GET", f"/api/v1/reservations?restaurant={RESTAURANT}&limit=50", None),
+        "capacities": lambda i: ("GET", f"/api/v1/capacities?restaurant={RESTAURANT}&{window}", None),
+        "analytics": lambda i: ("GET", f"/api/v1/analytics/dashboard?restaurant={RESTAURANT}&{window}", None)
+    }
+
+
+async def seed(db, dates: List[str], capacity: int):
+    batch = db.batch()
+    for date in dates:
+        batch.set(db.collection("capacities").document(f"{RESTAURANT}_{date}"), {
+            "restaurant": RESTAURANT,
+            "date": date,
+            "capacity": capacity,
+            "reserved_guests": 0
+        })
+    await batch.commit()
+
+
+def percentile(sorted_values: List[float], fraction: float) -> float:
+    return sorted_values[min(len(sorted_values) - 1, int(fraction * len(sorted_values)))]
+
+
+async def run_scenario(
+    client: httpx.AsyncClient,
+    build: Callable[[int], Request],
+    requests: int,
+    concurrency: int
+) -> dict:
+    latencies: List[float] = []
+    statuses: Counter = Counter()
+    indexes = iter(range(requests))
+
+    async def worker():
+        # Workers share one iterator, so exactly `requests` are sent
+        for i in indexes:
+            method, url, body = build(i)
+            started = time.perf_counter()
+            response = await client.request(method, url, json=body)
+            latencies.append(time.perf_counter() - started)
+            statuses[response.status_code] += 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - started
+
+    latencies.sort()
+    return {
+        "requests": requests,
+        "rps": requests / elapsed,
+        "p50": percentile(latencies, 0.50),
+        "p95": percentile(latencies, 0.95),
+        "p99": percentile(latencies, 0.99),
+        "mean": statistics.fmean(latencies),
+        "errors": sum(count for status, count in statuses.items() if status >= 400),
+        "statuses": dict(statuses)
+    }
+
+
+def reset_caches():
+    availability_index.invalidate()
+    restaurant_catalog.invalidate()
+    config_catalog.invalidate()
+    count_cache.clear()
+
+
+async def run(
+    scenarios=SCENARIOS,
+    requests: int = 200,
+    concurrency: int = 20,
+    latency: float = 0.0,
+    capacity: int = 100000,
+    emulator: bool = False
+) -> Dict[str, dict]:
+    """Run each scenario in order against a fresh database; results keyed by scenario."""
+    if emulator:
+        db = firestore_async.AsyncClient(project=os.environ.get("GCLOUD_PROJECT", "demo-bench"))
+        firestore_service._db_client = db
+    else:
+        db = use_fake_db(latency)
+
+    dates = bench_dates()
+    builders = request_builders(dates)
+    await seed(db, dates, capacity)
+    reset_caches()
+
+    app.dependency_overrides[get_current_user] = lambda: BENCH_USER
+    results = {}
+    try:
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+            for name in scenarios:
+                before = (db.reads, db.writes, db.aborted_commits) if not emulator else None
+                results[name] = await run_scenario(client, builders[name], requests, concurrency)
+                if before:
+                    reads, writes, aborts = (
+                        after - start for after, start in
+                        zip((db.reads, db.writes, db.aborted_commits), before)
+                    )
+                    results[name].update(
+                        reads_per_request=reads / requests,
+                        writes_per_request=writes / requests,
+                        aborted_commits=aborts
+                    )
+    finally:
+        app.dependency_overrides.pop(get_current_user, None)
+        reset_caches()
+
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Offline API load benchmark")
+    parser.add_argument("--requests", type=int, default=500, help="Requests per scenario")
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--latency-ms", type=float, default=5.0, help="Fake Firestore round-trip time")
+    parser.add_argument("--capacity", type=int, default=100000, help="Seats per bench restaurant-day")
+    parser.add_argument("--scenarios", nargs="+", choices=SCENARIOS, default=list(SCENARIOS))
+    parser.add_argument("--emulator", action="store_true", help="Use FIRESTORE_EMULATOR_HOST instead of the fake")
+    args = parser.parse_args()
+
+    if args.emulator and not os.environ.get("FIRESTORE_EMULATOR_HOST"):
+        raise SystemExit("Set FIRESTORE_EMULATOR_HOST; this benchmark must not run against production.")
+
+    backend = "Firestore emulator" if args.emulator else f"fake Firestore, {args.latency_ms}ms per RPC"
+    print(f"🏋️ {args.requests} requests per scenario, {args.concurrency} in flight ({backend})")
+    results = asyncio.run(run(
+        args.scenarios, args.requests, args.concurrency,
+        args.latency_ms / 1000, args.capacity, args.emulator
+    ))
+
+    print(f"{'scenario':<11} {'req/s':>8} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'errors':>7} {'reads/req':>10} {'writes/req':>11} {'aborts':>7}")
+    for name, result in results.items():
+        print(
+            f"{name:<11} {result['rps']:8.0f} {result['p50'] * 1000:8.1f} {result['p95'] * 1000:8.1f} "
+            f"{result['p99'] * 1000:8.1f} {result['errors']:7d} "
+            f"{result.get('reads_per_request', float('nan')):10.1f} "
+            f"{result.get('writes_per_request', float('nan')):11.1f} "
+            f"{result.get('aborted_commits', 0):7d}"
+        )
+        if result["errors"]:
+            print(f"   ⚠️ statuses: {result['statuses']}")
+
+
+if __name__ == "__main__":
+    main()
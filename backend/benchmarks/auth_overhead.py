@@ -0,0 +1,68 @@
+# backend/benchmarks/auth_overhead.py
+"""
+Auth overhead per staff request.
+
+Drives `require_role("kitchen")` the way FastAPI does for a table refresh,
+first with every request verifying its token (the old behaviour) and then
+through the verified-token cache, and prints the mean, p50 and p95 cost per
+request. Token verification is replaced by a stub that sleeps for
+--latency-ms, standing in for the Firebase Auth revocation round-trip, so no
+Firebase project is needed:
+
+    python -m benchmarks.auth_overhead --requests 2000 --users 20 --latency-ms 40
+"""
+import argparse
+import asyncio
+import statistics
+import time
+
+from app.api.deps import get_current_user, require_role
+from app.core import security
+
+
+def stub_verifier(latency_seconds: float):
+    def verify_id_token(id_token, check_revoked=False):
+        time.sleep(latency_seconds)
+        return {"uid": id_token, "email": f"{id_token}@example.com", "role": "kitchen", "exp": time.time() + 3600}
+    return verify_id_token
+
+
+async def run(label: str, requests: int, users: int, revocation_check_seconds: float) -> None:
+    cache = security.token_cache
+    cache.clear()
+    cache.hits = cache.misses = 0
+    cache.revocation_check_seconds = revocation_check_seconds
+    check_role = require_role("kitchen")
+
+    timings = []
+    for i in range(requests):
+        started = time.perf_counter()
+        user = await get_current_user(f"Bearer staff-{i % users}")
+        await check_role(user)
+        timings.append((time.perf_counter() - started) * 1000)
+
+    timings.sort()
+    print(
+        f"{label:<12} mean {statistics.mean(timings):8.3f} ms   "
+        f"p50 {timings[len(timings) // 2]:8.3f} ms   "
+        f"p95 {timings[int(len(timings) * 0.95) - 1]:8.3f} ms   "
+        f"verifications {cache.misses}"
+    )
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--users", type=int, default=20, help="distinct staff tokens")
+    parser.add_argument("--latency-ms", type=float, default=40.0)
+    args = parser.parse_args()
+
+    security.admin_auth.verify_id_token = stub_verifier(args.latency_ms / 1000)
+    print(f"🔐 {args.requests} requests from {args.users} staff tokens, {args.latency_ms:g} ms verify latency")
+
+    await run("uncached", args.requests, args.users, revocation_check_seconds=0)
+    await run("cached", args.requests, args.users, revocation_check_seconds=300)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,167 @@
+# backend/benchmarks/capacity_contention.py
+"""
+Contention benchmark for one hot restaurant/date capacity document.
+
+Fires concurrent bookings at a single capacities/{restaurant}_{date} doc, once
+with a single counter and once per requested shard count, and prints the
+bookings/second and transaction failures for each run. Two scenarios:
+"reserve" runs bare reserve_seats transactions, "create" runs the full
+create_booking path (reservation, pacing, rollup and email outbox writes,
+retries with backoff), which is what guests actually wait on.
+
+Run it against the Firestore emulator (never production):
+
+    gcloud emulators firestore start --host-port=localhost:8080
+    FIRESTORE_EMULATOR_HOST=localhost:8080 python -m benchmarks.capacity_contention \
+        --bookings 400 --concurrency 50 --shards 1 4 8 16
+
+or offline against the in-memory fake from tests/, with --latency-ms per RPC:
+
+    python -m benchmarks.capacity_contention --fake --latency-ms 5 --scenarios create
+"""
+import argparse
+import asyncio
+import os
+import time
+
+from firebase_admin import firestore_async
+
+import app.services.firestore as firestore_service
+from app.services.availability import availability_index
+from app.services.booking import create_booking
+from app.services.capacity import (
+    CapacityLedger,
+    capacity_ref,
+    reserve_seats,
+    shard_refs,
+    split_evenly,
+    summarize_capacities
+)
+from app.services.catalog import config_catalog, restaurant_catalog
+from app.services.rollups import ROLLUP_OUTBOX_COLLECTION
+from tests.fake_firestore import use_fake_db
+
+RESTAURANT = "BenchRestaurant"
+DATE = "2099-01-01"
+SCENARIOS = ("reserve", "create")
+
+
+async def seed(db, day_ref, restaurant: str, capacity: int, shard_count: int):
+    batch = db.batch()
+    batch.set(day_ref, {
+        "restaurant": restaurant,
+        "date": DATE,
+        "capacity": capacity,
+        "reserved_guests": 0,
+        "shard_count": shard_count
+    })
+    if shard_count > 1:
+        for ref, seats in zip(shard_refs(day_ref, shard_count), split_evenly(capacity, shard_count)):
+            batch.set(ref, {"capacity": seats, "reserved_guests": 0})
+    await batch.commit()
+
+
+async def reserve(db, restaurant: str, guests: int, i: int) -> bool:
+    transaction = db.transaction()
+
+    @firestore_async.async_transactional
+    async def booking_transaction(transaction):
+        ledger = CapacityLedger()
+        await reserve_seats(transaction, ledger, capacity_ref(db, restaurant, DATE), guests, restaurant, DATE)
+        ledger.apply(transaction)
+
+    try:
+        await booking_transaction(transaction)
+        return True
+    except Exception:
+        return False
+
+
+async def create(db, restaurant: str, guests: int, i: int) -> bool:
+    try:
+        await create_booking(db, {
+            "name": f"Bench Guest {i}",
+            "first_name": "Bench",
+            "last_name": f"Guest {i}",
+            "email": f"bench{i}@example.com",
+            "room": str(100 + i % 400),
+            "restaurant": restaurant,
+            "restaurantId": restaurant,
+            "date": DATE,
+            "time": "19:00",
+            "guests": guests,
+            "status": "confirmed",
+            "main_courses": [],
+            "upsell_items": {},
+            "upsell_total_price": 0.0,
+            "cancel_token": f"bench-{i}"
+        })
+        return True
+    except Exception:
+        return False
+
+
+async def run(db, scenario: str, shard_count: int, bookings: int, concurrency: int, guests: int):
+    restaurant = f"{RESTAURANT}-{scenario}-{shard_count}"
+    day_ref = capacity_ref(db, restaurant, DATE)
+    await seed(db, day_ref, restaurant, bookings * guests, shard_count)
+    book = reserve if scenario == "reserve" else create
+
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def one(i: int):
+        async with semaphore:
+            return await book(db, restaurant, guests, i)
+
+    aborts, writes = getattr(db, "aborted_commits", None), getattr(db, "writes", None)
+    started = time.perf_counter()
+    results = await asyncio.gather(*(one(i) for i in range(bookings)))
+    elapsed = time.perf_counter() - started
+
+    summary = (await summarize_capacities(db, [await day_ref.get()]))[0]
+    ok = sum(results)
+    line = (
+        f"{scenario:<8} shards={shard_count:<3} bookings={ok}/{bookings} failed={bookings - ok:<4} "
+        f"reserved={summary['reserved_guests']}/{summary['capacity']} "
+        f"elapsed={elapsed:.2f}s rate={ok / elapsed:.1f} bookings/s"
+    )
+    if aborts is not None:
+        line += f" aborted_commits={db.aborted_commits - aborts} writes/booking={(db.writes - writes) / max(ok, 1):.1f}"
+    print(line)
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--bookings", type=int, default=400)
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--guests", type=int, default=2)
+    parser.add_argument("--shards", type=int, nargs="+", default=[1, 4, 8, 16])
+    parser.add_argument("--scenarios", nargs="+", choices=SCENARIOS, default=list(SCENARIOS))
+    parser.add_argument("--fake", action="store_true", help="Use the in-memory fake instead of the emulator")
+    parser.add_argument("--latency-ms", type=float, default=5.0, help="Fake Firestore round-trip time")
+    args = parser.parse_args()
+
+    if args.fake:
+        db = use_fake_db(args.latency_ms / 1000)
+    elif not os.environ.get("FIRESTORE_EMULATOR_HOST"):
+        raise SystemExit("Set FIRESTORE_EMULATOR_HOST; this benchmark must not run against production.")
+    else:
+        # The emulator accepts anonymous credentials, so no service account is needed
+        db = firestore_async.AsyncClient(project=os.environ.get("GCLOUD_PROJECT", "demo-bench"))
+        # create_booking queues its email through get_db()
+        firestore_service._db_client = db
+
+    for cache in (availability_index, restaurant_catalog, config_catalog):
+        cache.invalidate()
+
+    for scenario in args.scenarios:
+        for shard_count in args.shards:
+            await run(db, scenario, shard_count, args.bookings, args.concurrency, args.guests)
+
+    if args.fake:
+        pending = sum(path.startswith(f"{ROLLUP_OUTBOX_COLLECTION}/") for path in db.docs)
+        print(f"rollup_outbox events left for the worker: {pending}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
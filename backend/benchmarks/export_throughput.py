@@ -0,0 +1,95 @@
+# backend/benchmarks/export_throughput.py
+"""
+Throughput and memory benchmark for the streaming reservation export.
+
+Seeds --rows reservations for a far-future date range (skipped with
+--no-seed), then streams the export in each requested format and prints
+rows/second, bytes produced and the peak Python heap while streaming, which
+should stay flat as --rows grows.
+
+Run it against the Firestore emulator (never production):
+
+    gcloud emulators firestore start --host-port=localhost:8080
+    FIRESTORE_EMULATOR_HOST=localhost:8080 python -m benchmarks.export_throughput \
+        --rows 50000 --formats csv ndjson xlsx
+"""
+import argparse
+import asyncio
+import os
+import time
+import tracemalloc
+
+from firebase_admin import firestore_async
+
+from app.services.export import EXPORT_PAGE_SIZE, export_chunks
+
+FROM_DATE = "2099-01-01"
+TO_DATE = "2099-01-28"
+
+
+async def seed(db, rows: int):
+    batch, pending = db.batch(), 0
+    for i in range(rows):
+        batch.set(db.collection("reservations").document(f"bench-export-{i:07d}"), {
+            "name": f"Bench Guest {i}",
+            "email": f"guest{i}@example.com",
+            "room": str(1000 + i % 1500),
+            "date": f"2099-01-{1 + i % 28:02d}",
+            "time": "19:00",
+            "guests": 1 + i % 6,
+            "restaurant": "BenchRestaurant",
+            "status": "confirmed",
+            "paid": False,
+            "upsell_items": {"Wine": 1},
+            "upsell_total_price": 12.5,
+            "main_courses": ["Pasta"],
+            "email_status": "sent"
+        })
+        pending += 1
+        if pending == 400:
+            await batch.commit()
+            batch, pending = db.batch(), 0
+    if pending:
+        await batch.commit()
+
+
+async def run(db, export_format: str, rows: int, page_size: int):
+    tracemalloc.start()
+    started = time.perf_counter()
+    produced = 0
+    async for chunk in export_chunks(db, export_format, "BenchRestaurant", FROM_DATE, TO_DATE, page_size):
+        produced += len(chunk)
+    elapsed = time.perf_counter() - started
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    print(
+        f"{export_format:<7} {rows / elapsed:10.0f} rows/s   "
+        f"{produced / 1e6:8.1f} MB   peak heap {peak / 1e6:6.1f} MB"
+    )
+
+
+async def main():
+    parser = argparse.ArgumentParser(description="Streaming export benchmark")
+    parser.add_argument("--rows", type=int, default=20000)
+    parser.add_argument("--page-size", type=int, default=EXPORT_PAGE_SIZE)
+    parser.add_argument("--formats", nargs="+", default=["csv", "ndjson", "xlsx"])
+    parser.add_argument("--no-seed", action="store_true", help="Reuse rows seeded by a previous run")
+    args = parser.parse_args()
+
+    if not os.environ.get("FIRESTORE_EMULATOR_HOST"):
+        raise SystemExit("Set FIRESTORE_EMULATOR_HOST; this benchmark must not run against production.")
+
+    db = firestore_async.AsyncClient(project=os.environ.get("GCLOUD_PROJECT", "demo-bench"))
+
+    if not args.no_seed:
+        print(f"🌱 Seeding {args.rows} reservations...")
+        await seed(db, args.rows)
+
+    print(f"📦 Exporting {args.rows} rows, {args.page_size} per page")
+    for export_format in args.formats:
+        await run(db, export_format, args.rows, args.page_size)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
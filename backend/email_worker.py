@@ -0,0 +1,31 @@
+# backend/email_worker.py
+# Drains the email outbox in its own process. Run this (and set
+# EMAIL_OUTBOX_WORKER_ENABLED=false on the API) to keep Mailgun traffic
+# off the instances that serve bookings.
+import asyncio
+
+import firebase_admin
+from firebase_admin import credentials
+
+from app.core.config import settings
+from app.services.email_outbox import email_outbox
+
+async def main():
+    if not firebase_admin._apps:
+        cred = credentials.Certificate("service-account.json")
+        firebase_admin.initialize_app(cred, {
+            'storageBucket': settings.FIREBASE_STORAGE_BUCKET
+        })
+
+    await email_outbox.start()
+    print(f"📬 Email outbox worker running ({settings.EMAIL_WORKERS} senders)...")
+    try:
+        await asyncio.Event().wait()
+    finally:
+        await email_outbox.stop()
+
+if __name__ == "__main__":
+    try:
+        asyncio.run(main())
+    except KeyboardInterrupt:
+        print("⬇️ Email worker stopped")
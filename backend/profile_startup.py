@@ -0,0 +1,31 @@
+# backend/profile_startup.py
+# Startup timing report: where a cold import of the app spends its time.
+#   python profile_startup.py [--top 25] [--module app.main]
+import argparse
+
+from app.core.profiling import DEFERRED_MODULES, cold_import, profile_imports
+
+def main():
+    parser = argparse.ArgumentParser(description="Cold-start import timing report")
+    parser.add_argument("--module", default="app.main")
+    parser.add_argument("--top", type=int, default=25, help="Slowest imports to list")
+    args = parser.parse_args()
+
+    result = cold_import(args.module)
+    print(f"⏱️  import {args.module}: {result['seconds']:.3f}s")
+    if result["deferred_loaded"]:
+        print(f"⚠️  Loaded at startup but meant to be deferred: {', '.join(result['deferred_loaded'])}")
+    else:
+        print(f"✅ Deferred until first use: {', '.join(DEFERRED_MODULES)}")
+
+    timings = profile_imports(args.module)
+    print("\n📦 Slowest top-level packages (cumulative, -X importtime):")
+    for timing in sorted(
+        (t for t in timings if "." not in t.module or t.module.startswith("app.")),
+        key=lambda t: t.cumulative_seconds,
+        reverse=True
+    )[:args.top]:
+        print(f"  {timing.cumulative_seconds * 1000:8.1f} ms  {timing.module}")
+
+if __name__ == "__main__":
+    main()
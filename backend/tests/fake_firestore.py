@@ -0,0 +1,463 @@
+"""
+In-memory stand-in for the async Firestore client used by the app.
+
+Implements the subset of the google-cloud-firestore async surface the
+services call (collections, documents, queries, batches, transactions), with
+the same write semantics for SERVER_TIMESTAMP, Increment, dotted field paths
+and the 500-writes-per-batch limit. Install it with `use_fake_db()`.
+
+Transactions work with `firestore_async.async_transactional`: a commit
+aborts if a document the transaction read has been written since, and the
+decorator retries, as under contention on real Firestore. A per-RPC
+`latency` lets concurrent requests interleave the way they do over the
+network; the benchmarks use it to run offline.
+"""
+import asyncio
+import copy
+from datetime import datetime, timezone
+
+from google.api_core.exceptions import Aborted, AlreadyExists, FailedPrecondition, NotFound
+from google.cloud.firestore_v1 import SERVER_TIMESTAMP
+from google.cloud.firestore_v1.transforms import Increment
+
+import app.services.firestore as firestore_service
+
+MAX_BATCH_WRITES = 500
+DOCUMENT_ID = "__name__"
+
+
+def use_fake_db(latency: float = 0.0) -> "FakeFirestore":
+    """Make get_db() return a fresh fake client, with `latency` seconds per RPC."""
+    db = FakeFirestore(latency)
+    firestore_service._db_client = db
+    return db
+
+
+def _get_field(data: dict, path: str):
+    value = data
+    for part in path.split("."):
+        if not isinstance(value, dict) or part not in value:
+            raise KeyError(path)
+        value = value[part]
+    return value
+
+
+def _set_field(data: dict, path: str, value):
+    parts = path.split(".")
+    for part in parts[:-1]:
+        data = data.setdefault(part, {})
+    current = data.get(parts[-1])
+    if isinstance(value, dict):
+        value = _resolve(value)
+    elif value is SERVER_TIMESTAMP:
+        value = datetime.now(timezone.utc)
+    elif isinstance(value, Increment):
+        value = (current if isinstance(current, (int, float)) else 0) + value.value
+    data[parts[-1]] = value
+
+
+def _resolve(data: dict) -> dict:
+    resolved = {}
+    for key, value in data.items():
+        _set_field(resolved, key, value)
+    return resolved
+
+
+def _merge(target: dict, data: dict):
+    for key, value in data.items():
+        if isinstance(value, dict) and isinstance(target.get(key), dict):
+            _merge(target[key], value)
+        else:
+            _set_field(target, key, value)
+
+
+class FakeSnapshot:
+    # Writes replace a document's dict rather than mutate it, so a snapshot
+    # can hold the stored data as of its read without copying it. Its
+    # update_time is the document's write version rather than a timestamp.
+    def __init__(self, reference, data, update_time=None):
+        self.reference = reference
+        self.id = reference.id
+        self._data = data
+        self.update_time = update_time if data is not None else None
+
+    @property
+    def exists(self) -> bool:
+        return self._data is not None
+
+    def to_dict(self):
+        return copy.deepcopy(self._data) if self._data is not None else None
+
+    def get(self, field_path: str):
+        return _get_field(self._data, field_path)
+
+
+class FakeDocumentReference:
+    def __init__(self, db, path: str):
+        self._db = db
+        self.path = path
+        self.id = path.rsplit("/", 1)[-1]
+
+    def collection(self, name: str) -> "FakeCollectionReference":
+        return FakeCollectionReference(self._db, f"{self.path}/{name}")
+
+    def _snapshot(self) -> FakeSnapshot:
+        self._db.reads += 1
+        return FakeSnapshot(self, self._db.docs.get(self.path), self._db.versions.get(self.path, 0))
+
+    async def get(self, transaction=None) -> FakeSnapshot:
+        await self._db._rpc()
+        if transaction is not None:
+            transaction._read(self.path)
+        return self._snapshot()
+
+    async def create(self, data: dict):
+        await self._db._rpc()
+        self._db._write(self, "create", data)
+
+    async def set(self, data: dict, merge: bool = False):
+        await self._db._rpc()
+        self._db._write(self, "set", data, merge)
+
+    async def update(self, data: dict):
+        await self._db._rpc()
+        self._db._write(self, "update", data)
+
+    async def delete(self):
+        await self._db._rpc()
+        self._db._write(self, "delete")
+
+
+class FakeQuery:
+    def __init__(self, db, collection_path: str, filters=(), orders=(), limit=None, cursor=None):
+        self._db = db
+        self._path = collection_path
+        self._filters = list(filters)
+        self._orders = list(orders)
+        self._limit = limit
+        self._cursor = cursor
+
+    def _copy(self, **changes) -> "FakeQuery":
+        fields = {
+            "filters": self._filters,
+            "orders": self._orders,
+            "limit": self._limit,
+            "cursor": self._cursor
+        }
+        fields.update(changes)
+        return FakeQuery(self._db, self._path, **fields)
+
+    def where(self, field_path: str, op_string: str, value) -> "FakeQuery":
+        return self._copy(filters=self._filters + [(field_path, op_string, value)])
+
+    def order_by(self, field_path: str, direction: str = "ASCENDING") -> "FakeQuery":
+        return self._copy(orders=self._orders + [(field_path, direction)])
+
+    def limit(self, count: int) -> "FakeQuery":
+        return self._copy(limit=count)
+
+    def select(self, field_paths) -> "FakeQuery":
+        return self._copy()
+
+    def start_after(self, document_fields) -> "FakeQuery":
+        return self._copy(cursor=document_fields)
+
+    @staticmethod
+    def _value(snapshot: FakeSnapshot, field_path: str):
+        if field_path == DOCUMENT_ID:
+            return snapshot.reference.path
+        return _get_field(snapshot._data, field_path)
+
+    def _matches(self, snapshot: FakeSnapshot) -> bool:
+        for field_path, op, expected in self._filters:
+            try:
+                value = self._value(snapshot, field_path)
+            except KeyError:
+                return False
+            if op == "==" and not value == expected:
+                return False
+            if op == "!=" and not value != expected:
+                return False
+            if op == "<" and not value < expected:
+                return False
+            if op == "<=" and not value <= expected:
+                return False
+            if op == ">" and not value > expected:
+                return False
+            if op == ">=" and not value >= expected:
+                return False
+            if op == "in" and value not in expected:
+                return False
+            if op == "array_contains" and expected not in (value or []):
+                return False
+        return True
+
+    def _sort_key(self, snapshot: FakeSnapshot) -> list:
+        # Firestore always breaks ties by document name
+        orders = self._orders + [(DOCUMENT_ID, "ASCENDING")]
+        return [(self._value(snapshot, field), direction) for field, direction in orders]
+
+    def _run(self) -> list:
+        prefix = self._path + "/"
+        snapshots = [
+            FakeSnapshot(FakeDocumentReference(self._db, path), data, self._db.versions.get(path, 0))
+            for path, data in self._db.docs.items()
+            if path.startswith(prefix) and "/" not in path[len(prefix):]
+        ]
+        snapshots = [s for s in snapshots if self._matches(s)]
+
+        for field, _ in self._orders:
+            # Documents missing an order-by field are excluded, as in Firestore
+            snapshots = [s for s in snapshots if self._has_field(s, field)]
+
+        orders = self._orders + [(DOCUMENT_ID, "ASCENDING")]
+        for field, direction in reversed(orders):
+            snapshots.sort(key=lambda s: self._value(s, field), reverse=direction == "DESCENDING")
+
+        if self._cursor is not None:
+            cursor_key = self._cursor_key()
+            snapshots = [s for s in snapshots if self._after(self._sort_key(s), cursor_key)]
+
+        if self._limit is not None:
+            snapshots = snapshots[:self._limit]
+
+        self._db.reads += max(1, len(snapshots))
+        return snapshots
+
+    def _cursor_key(self) -> list:
+        if isinstance(self._cursor, FakeSnapshot):
+            return self._sort_key(self._cursor)
+        # Dict cursors: order-by values, with the document id for __name__
+        return [
+            (f"{self._path}/{self._cursor[field]}" if field == DOCUMENT_ID else self._cursor[field], direction)
+            for field, direction in self._orders
+        ]
+
+    @classmethod
+    def _has_field(cls, snapshot: FakeSnapshot, field: str) -> bool:
+        try:
+            cls._value(snapshot, field)
+            return True
+        except KeyError:
+            return False
+
+    @staticmethod
+    def _after(key: list, cursor: list) -> bool:
+        for (value, direction), (cursor_value, _) in zip(key, cursor):
+            if value == cursor_value:
+                continue
+            return value < cursor_value if direction == "DESCENDING" else value > cursor_value
+        return False
+
+    async def get(self, transaction=None) -> list:
+        return [snapshot async for snapshot in self.stream(transaction)]
+
+    def count(self, alias: str = None) -> "FakeAggregationQuery":
+        return FakeAggregationQuery(self, alias)
+
+    async def stream(self, transaction=None):
+        await self._db._rpc()
+        for snapshot in self._run():
+            if transaction is not None:
+                transaction._read(snapshot.reference.path)
+            yield snapshot
+
+
+class FakeAggregationResult:
+    def __init__(self, alias, value):
+        self.alias = alias
+        self.value = value
+
+
+class FakeAggregationQuery:
+    def __init__(self, query: FakeQuery, alias: str = None):
+        self._query = query
+        self._alias = alias
+
+    async def get(self, transaction=None) -> list:
+        db = self._query._db
+        await db._rpc()
+        reads = db.reads
+        matches = len(self._query._run())
+        # Billed as one read per 1000 index entries
+        db.reads = reads + 1 + matches // 1000
+        return [[FakeAggregationResult(self._alias, matches)]]
+
+
+class FakeCollectionReference(FakeQuery):
+    def __init__(self, db, path: str):
+        super().__init__(db, path)
+        self.id = path.rsplit("/", 1)[-1]
+
+    def document(self, document_id: str = None) -> FakeDocumentReference:
+        if document_id is None:
+            self._db.auto_ids += 1
+            document_id = f"auto{self._db.auto_ids:08d}"
+        return FakeDocumentReference(self._db, f"{self._path}/{document_id}")
+
+    async def add(self, data: dict):
+        ref = self.document()
+        await ref.set(data)
+        return None, ref
+
+
+class FakeWriteOption:
+    """A last_update_time precondition, as made by client.write_option()."""
+
+    def __init__(self, last_update_time):
+        self.last_update_time = last_update_time
+
+
+class FakeWriteBatch:
+    # Writes are (reference, kind, data, merge) with the update's write
+    # option, if any, in place of merge
+    def __init__(self, db):
+        self._db = db
+        self._writes = []
+
+    def create(self, reference, document_data: dict):
+        self._writes.append((reference, "create", document_data, False))
+
+    def set(self, reference, document_data: dict, merge: bool = False):
+        self._writes.append((reference, "set", document_data, merge))
+
+    def update(self, reference, field_updates: dict, option: FakeWriteOption = None):
+        self._writes.append((reference, "update", field_updates, option))
+
+    def delete(self, reference):
+        self._writes.append((reference, "delete", None, False))
+
+    async def commit(self):
+        await self._db._rpc()
+        if len(self._writes) > MAX_BATCH_WRITES:
+            raise ValueError(f"Batch of {len(self._writes)} writes exceeds the {MAX_BATCH_WRITES} limit")
+        await self._db.before_commit(self._writes)
+        self._db._apply(self._writes)
+        self._writes = []
+
+
+class FakeTransaction(FakeWriteBatch):
+    """The parts of AsyncTransaction that async_transactional drives."""
+
+    def __init__(self, db, max_attempts: int = 5, read_only: bool = False):
+        super().__init__(db)
+        self._max_attempts = max_attempts
+        self._read_only = read_only
+        self._id = None
+        # path -> version of each document when this attempt first read it
+        self._read_versions = {}
+
+    def _read(self, path: str):
+        self._read_versions.setdefault(path, self._db.versions.get(path, 0))
+
+    def _clean_up(self):
+        self._writes = []
+        self._read_versions = {}
+        self._id = None
+
+    async def _begin(self, retry_id=None):
+        await self._db._rpc()
+        self._db.transactions += 1
+        if retry_id is not None:
+            self._db.transaction_retries += 1
+        self._id = f"transaction-{self._db.transactions}".encode()
+
+    async def _commit(self):
+        if self._read_only and self._writes:
+            raise ValueError("Cannot perform write operation in read-only transaction.")
+        if len(self._writes) > MAX_BATCH_WRITES:
+            raise ValueError(f"Transaction of {len(self._writes)} writes exceeds the {MAX_BATCH_WRITES} limit")
+        await self._db._rpc()
+        await self._db.before_commit(self._writes)
+
+        # No awaits from here on: the check and the writes are one atomic step
+        conflicts = [
+            path for path, version in self._read_versions.items()
+            if self._db.versions.get(path, 0) != version
+        ]
+        if conflicts:
+            self._db.aborted_commits += 1
+            self._clean_up()
+            raise Aborted(f"Transaction contention on {conflicts[0]}")
+        self._db._apply(self._writes)
+        self._clean_up()
+
+    async def _rollback(self):
+        self._clean_up()
+
+
+class FakeFirestore:
+    def __init__(self, latency: float = 0.0):
+        self.docs = {}
+        # Bumped on every write; transactions compare them at commit
+        self.versions = {}
+        self.latency = latency
+        self.reads = 0
+        self.writes = 0
+        self.commits = 0
+        self.transactions = 0
+        self.transaction_retries = 0
+        self.aborted_commits = 0
+        self.auto_ids = 0
+
+    async def _rpc(self):
+        """One round-trip: yields to the event loop like a network call would."""
+        await asyncio.sleep(self.latency)
+
+    async def before_commit(self, writes: list):
+        """Hook for tests to inject failures or latency into commits."""
+
+    def collection(self, name: str) -> FakeCollectionReference:
+        return FakeCollectionReference(self, name)
+
+    def document(self, path: str) -> FakeDocumentReference:
+        return FakeDocumentReference(self, path)
+
+    def batch(self) -> FakeWriteBatch:
+        return FakeWriteBatch(self)
+
+    def write_option(self, last_update_time=None) -> FakeWriteOption:
+        return FakeWriteOption(last_update_time)
+
+    def transaction(self, max_attempts: int = 5, read_only: bool = False) -> FakeTransaction:
+        return FakeTransaction(self, max_attempts, read_only)
+
+    async def get_all(self, references, transaction=None):
+        await self._rpc()
+        for ref in references:
+            if transaction is not None:
+                transaction._read(ref.path)
+            yield ref._snapshot()
+
+    def _write(self, ref, kind: str, data: dict = None, merge: bool = False):
+        self._apply([(ref, kind, data, merge)])
+
+    def _apply(self, writes: list):
+        # Validate first so a failing write leaves the whole commit unapplied
+        for ref, kind, _, option in writes:
+            if kind == "update" and ref.path not in self.docs:
+                raise NotFound(f"No document to update: {ref.path}")
+            if kind == "update" and option and option.last_update_time != self.versions.get(ref.path, 0):
+                raise FailedPrecondition(f"Document changed since it was read: {ref.path}")
+            if kind == "create" and ref.path in self.docs:
+                raise AlreadyExists(f"Document already exists: {ref.path}")
+
+        for ref, kind, data, merge in writes:
+            if kind == "delete":
+                self.docs.pop(ref.path, None)
+            elif kind in ("create", "set") and not merge:
+                self.docs[ref.path] = _resolve(data)
+            elif kind == "set":
+                target = copy.deepcopy(self.docs.get(ref.path, {}))
+                _merge(target, data)
+                self.docs[ref.path] = target
+            else:
+                target = copy.deepcopy(self.docs[ref.path])
+                for field_path, value in data.items():
+                    _set_field(target, field_path, value)
+                self.docs[ref.path] = target
+
+        for ref, _, _, _ in writes:
+            self.versions[ref.path] = self.versions.get(ref.path, 0) + 1
+        self.writes += len(writes)
+        self.commits += 1
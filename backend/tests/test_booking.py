@@ -0,0 +1,355 @@
+import asyncio
+from datetime import timedelta
+
+import pytest
+from prometheus_client import REGISTRY
+
+from app.core.config import settings
+from app.services.availability import availability_index
+from app.services.booking import (
+    BookingContention,
+    ReservationNotFound,
+    cancel_booking,
+    create_booking,
+    modify_booking,
+    place_hold,
+    release_hold
+)
+from app.services.capacity import SoldOut
+from app.services.catalog import config_catalog, restaurant_catalog
+from app.services.holds import HoldLimitReached, HoldMismatch, HoldSweeper
+from app.services.idempotency import IdempotencyKeyReused, idempotency_cache
+from app.services.rollups import rollup_worker
+from app.utils.datetime import get_utc_now
+from tests.fake_firestore import use_fake_db
+
+pytestmark = pytest.mark.anyio
+
+DATE = "2099-03-01"
+OTHER_DATE = "2099-03-02"
+
+
+def reservation(guests: int, date: str = DATE, time: str = "19:00") -> dict:
+    return {
+        "name": "Anna Rossi", "email": "anna@example.com", "room": "101",
+        "restaurant": "Italian", "restaurantId": "Italian",
+        "date": date, "time": time, "guests": guests, "status": "confirmed",
+        "main_courses": [], "upsell_items": {}, "upsell_total_price": 0, "cancel_token": "t"
+    }
+
+
+async def booking_db(latency: float = 0.0, **capacities):
+    db = use_fake_db(latency)
+    availability_index.invalidate()
+    restaurant_catalog.invalidate()
+    config_catalog.invalidate()
+    idempotency_cache.clear()
+    for date, capacity in (capacities or {DATE: 10}).items():
+        db.docs[f"capacities/Italian_{date}"] = {
+            "restaurant": "Italian", "date": date, "capacity": capacity, "reserved_guests": 0
+        }
+    # Load the catalogs up front: concurrent first loads would tie the
+    # module-level cache locks to this test's event loop
+    await restaurant_catalog.get(db)
+    await config_catalog.get(db)
+    return db
+
+
+async def apply_rollups(db):
+    """Let the rollup worker catch up with the outbox."""
+    while await rollup_worker.apply(db):
+        pass
+
+
+def reserved(db, date: str = DATE) -> int:
+    return db.docs[f"capacities/Italian_{date}"]["reserved_guests"]
+
+
+async def test_rush_for_the_last_seats_never_overbooks():
+    db = await booking_db(latency=0.001, **{DATE: 4})
+
+    results = await asyncio.gather(
+        *(create_booking(db, reservation(2)) for _ in range(6)), return_exceptions=True
+    )
+
+    assert sum(isinstance(result, str) for result in results) == 2
+    assert sum(isinstance(result, SoldOut) for result in results) == 4
+    assert reserved(db) == 4
+    await apply_rollups(db)
+    assert db.docs[f"slot_counts/Italian_{DATE}"]["reserved"] == {"19:00": 4}
+
+
+async def test_sold_out_day_is_refused_from_the_cache_without_a_transaction():
+    db = await booking_db(**{DATE: 4})
+    db.docs[f"capacities/Italian_{DATE}"]["reserved_guests"] = 3
+    await availability_index.query(db, "Italian", DATE, DATE)
+    refused = REGISTRY.get_sample_value("booking_sold_out_total", {"operation": "create", "source": "cache"}) or 0
+    transactions = db.transactions
+
+    with pytest.raises(SoldOut, match="Only 1 seats available"):
+        await create_booking(db, reservation(2))
+
+    assert db.transactions == transactions
+    assert REGISTRY.get_sample_value(
+        "booking_sold_out_total", {"operation": "create", "source": "cache"}
+    ) == refused + 1
+
+    # Once the day is invalidated (e.g. a cancellation), the transaction decides
+    db.docs[f"capacities/Italian_{DATE}"]["reserved_guests"] = 0
+    availability_index.invalidate("Italian", DATE)
+    await create_booking(db, reservation(2))
+    assert reserved(db) == 2
+
+
+async def test_date_swap_moves_seats_even_if_the_old_day_lost_its_capacity():
+    db = await booking_db(**{DATE: 10, OTHER_DATE: 10})
+    reservation_id = await create_booking(db, reservation(3))
+    del db.docs[f"capacities/Italian_{DATE}"]
+
+    old = await modify_booking(db, reservation_id, OTHER_DATE, "20:00", 4)
+
+    assert old["date"] == DATE
+    assert reserved(db, OTHER_DATE) == 4
+    assert db.docs[f"reservations/{reservation_id}"]["date"] == OTHER_DATE
+    await apply_rollups(db)
+    assert db.docs[f"daily_stats/Italian_{OTHER_DATE}"]["guests"] == 4
+
+
+async def test_growing_a_party_counts_its_own_seats_as_free():
+    db = await booking_db(**{DATE: 5})
+    reservation_id = await create_booking(db, reservation(3))
+
+    await modify_booking(db, reservation_id, DATE, "19:00", 5)
+    assert reserved(db) == 5
+
+    with pytest.raises(SoldOut):
+        await modify_booking(db, reservation_id, DATE, "19:00", 6)
+    assert reserved(db) == 5
+
+    with pytest.raises(ReservationNotFound):
+        await modify_booking(db, "missing", DATE, "19:00", 2)
+
+
+async def test_concurrent_cancellations_release_the_seats_once():
+    db = await booking_db(latency=0.001)
+    reservation_id = await create_booking(db, reservation(4))
+
+    results = await asyncio.gather(
+        cancel_booking(db, reservation_id), cancel_booking(db, reservation_id), return_exceptions=True
+    )
+
+    assert sum(isinstance(result, ReservationNotFound) for result in results) == 1
+    assert reserved(db) == 0
+    assert f"reservations/{reservation_id}" not in db.docs
+
+
+async def test_contention_past_the_attempt_limit_is_reported(monkeypatch):
+    monkeypatch.setattr(settings, "BOOKING_MAX_ATTEMPTS", 3)
+    monkeypatch.setattr(settings, "BOOKING_RETRY_BASE_SECONDS", 0)
+    db = await booking_db()
+    day = db.document(f"capacities/Italian_{DATE}")
+
+    async def someone_else_books_first(writes):
+        # Another instance takes a seat between every read and commit
+        await day.update({"reserved_guests": reserved(db) + 1})
+
+    db.before_commit = someone_else_books_first
+    failures = REGISTRY.get_sample_value("booking_contention_failures_total", {"operation": "create"}) or 0
+
+    with pytest.raises(BookingContention):
+        await create_booking(db, reservation(1))
+
+    assert db.aborted_commits == 3
+    assert reserved(db) == 3
+    assert not any(path.startswith("reservations/") for path in db.docs)
+    assert REGISTRY.get_sample_value("booking_contention_failures_total", {"operation": "create"}) == failures + 1
+
+
+def reservation_docs(db) -> list:
+    return [path for path in db.docs if path.startswith("reservations/")]
+
+
+async def test_retried_booking_returns_the_original_reservation():
+    db = await booking_db()
+    reservation_id = await create_booking(db, reservation(2), idempotency_key="tap-1", fingerprint="a")
+    transactions = db.transactions
+
+    # Same instance, then another instance (nothing cached): no new transaction
+    assert await create_booking(db, reservation(2), idempotency_key="tap-1", fingerprint="a") == reservation_id
+    idempotency_cache.clear()
+    assert await create_booking(db, reservation(2), idempotency_key="tap-1", fingerprint="a") == reservation_id
+
+    assert db.transactions == transactions
+    assert reserved(db) == 2
+    assert reservation_docs(db) == [f"reservations/{reservation_id}"]
+
+    with pytest.raises(IdempotencyKeyReused):
+        await create_booking(db, reservation(3), idempotency_key="tap-1", fingerprint="b")
+
+
+async def test_double_tap_books_once():
+    db = await booking_db(latency=0.001)
+
+    results = await asyncio.gather(
+        *(create_booking(db, reservation(2), idempotency_key="tap-2", fingerprint="a") for _ in range(2))
+    )
+
+    assert results[0] == results[1]
+    assert reserved(db) == 2
+    assert len(reservation_docs(db)) == 1
+    assert len([path for path in db.docs if path.startswith("email_outbox/")]) == 1
+
+
+async def slot_reserved(db, date: str = DATE) -> dict:
+    """Booked seats per slot in the report, once the outbox is applied."""
+    await apply_rollups(db)
+    report = db.docs.get(f"slot_counts/Italian_{date}", {}).get("reserved", {})
+    return {time: seats for time, seats in report.items() if seats}
+
+
+async def test_held_seats_are_kept_for_the_booking_that_converts_the_hold():
+    db = await booking_db(**{DATE: 4})
+    hold = await place_hold(db, "Italian", DATE, "19:00", 4, "101")
+    assert reserved(db) == 4
+    assert await slot_reserved(db) == {"19:00": 4}
+
+    # The day is full for everyone else...
+    with pytest.raises(SoldOut):
+        await create_booking(db, reservation(1))
+    with pytest.raises(HoldMismatch):
+        await create_booking(db, reservation(3), hold_id=hold["hold_id"])
+    with pytest.raises(HoldMismatch):
+        await create_booking(db, {**reservation(4), "room": "102"}, hold_id=hold["hold_id"])
+
+    # ...and the holder's booking takes over the seats
+    reservation_id = await create_booking(db, reservation(4), hold_id=hold["hold_id"])
+
+    assert reserved(db) == 4
+    assert await slot_reserved(db) == {"19:00": 4}
+    assert f"holds/{hold['hold_id']}" not in db.docs
+    assert db.docs[f"reservations/{reservation_id}"]["capacity_allocation"] == {}
+    await apply_rollups(db)
+    assert db.docs[f"daily_stats/Italian_{DATE}"]["guests"] == 4
+
+
+async def test_expired_holds_are_swept_in_batches():
+    db = await booking_db(**{DATE: 10})
+    holds = [await place_hold(db, "Italian", DATE, time, 2, room) for time, room in zip(
+        ("19:00", "19:00", "20:00"), ("101", "102", "103")
+    )]
+    kept = await place_hold(db, "Italian", DATE, "20:00", 1, "104")
+    for hold in holds:
+        db.docs[f"holds/{hold['hold_id']}"]["expires_at"] = get_utc_now() - timedelta(seconds=1)
+
+    sweeper = HoldSweeper(batch_size=2, interval=0)
+    assert await sweeper.sweep(db) == 2
+    assert await sweeper.sweep(db) == 1
+    assert await sweeper.sweep(db) == 0
+
+    assert reserved(db) == 1
+    assert await slot_reserved(db) == {"20:00": 1}
+    assert f"holds/{kept['hold_id']}" in db.docs
+
+    # A swept hold no longer holds anything: the booking competes for seats as usual
+    await create_booking(db, reservation(2), hold_id=holds[0]["hold_id"])
+    assert reserved(db) == 3
+
+
+async def test_released_hold_gives_its_seats_back_once():
+    db = await booking_db(**{DATE: 4})
+    hold = await place_hold(db, "Italian", DATE, "19:00", 3, "101")
+
+    assert await release_hold(db, hold["hold_id"]) is True
+    assert await release_hold(db, hold["hold_id"]) is False
+    assert reserved(db) == 0
+    assert await slot_reserved(db) == {}
+
+
+async def test_a_room_can_only_hold_seats_a_few_times():
+    db = await booking_db(**{DATE: 20})
+    first = await place_hold(db, "Italian", DATE, "19:00", 2, "101")
+    await place_hold(db, "Italian", DATE, "20:00", 2, "101")
+
+    with pytest.raises(HoldLimitReached):
+        await place_hold(db, "Italian", DATE, "19:30", 2, "101")
+    assert reserved(db) == 4
+
+    # Other rooms are unaffected, and an expired or released hold frees a place
+    await place_hold(db, "Italian", DATE, "19:00", 2, "102")
+    db.docs[f"holds/{first['hold_id']}"]["expires_at"] = get_utc_now() - timedelta(seconds=1)
+    await place_hold(db, "Italian", DATE, "19:30", 2, "101")
+
+
+async def test_daily_stats_are_rolled_up_outside_the_booking_transactions():
+    db = await booking_db(**{DATE: 20})
+    written = []
+
+    async def record(writes):
+        written.extend(ref.path for ref, *_ in writes)
+
+    db.before_commit = record
+    ids = [await create_booking(db, reservation(2)) for _ in range(3)]
+    await modify_booking(db, ids[0], DATE, "19:00", 4)
+    await cancel_booking(db, ids[1])
+
+    assert not any(path.startswith("daily_stats/") for path in written)
+    assert f"daily_stats/Italian_{DATE}" not in db.docs
+
+    # One worker transaction folds all five events into a single write
+    written.clear()
+    assert await rollup_worker.apply(db) == 5
+    assert [path for path in written if path.startswith("daily_stats/")] == [f"daily_stats/Italian_{DATE}"]
+    stats = db.docs[f"daily_stats/Italian_{DATE}"]
+    assert (stats["reservations"], stats["guests"]) == (2, 6)
+    assert not [path for path in db.docs if path.startswith("rollup_outbox/")]
+    assert await rollup_worker.apply(db) == 0
+
+
+async def test_slot_pacing_uses_per_slot_counters_not_the_day_report():
+    db = await booking_db(**{DATE: 20})
+    db.docs["restaurant_configs/Italian"] = {
+        "restaurantId": "Italian", "openingTime": "19:00", "closingTime": "21:00",
+        "intervalMinutes": 30, "slotCapacity": 4
+    }
+    config_catalog.invalidate()
+    await config_catalog.get(db)
+    written = []
+
+    async def record(writes):
+        written.extend(ref.path for ref, *_ in writes)
+
+    db.before_commit = record
+    first = await create_booking(db, reservation(2))
+    await create_booking(db, reservation(2))
+    with pytest.raises(SoldOut, match="at 19:00"):
+        await create_booking(db, reservation(1))
+    await create_booking(db, reservation(4, time="20:00"))
+
+    await cancel_booking(db, first)
+    await create_booking(db, reservation(2))
+
+    assert db.docs[f"slot_pacing/Italian_{DATE}_19:00"]["reserved"] == 4
+    assert db.docs[f"slot_pacing/Italian_{DATE}_20:00"]["reserved"] == 4
+    assert not any(path.startswith("slot_counts/") for path in written)
+    assert await slot_reserved(db) == {"19:00": 4, "20:00": 4}
+
+
+async def test_kitchen_prep_is_rolled_up_outside_the_booking_transactions():
+    db = await booking_db(**{DATE: 20})
+    written = []
+
+    async def record(writes):
+        written.extend(ref.path for ref, *_ in writes)
+
+    db.before_commit = record
+    first = await create_booking(db, {**reservation(2), "main_courses": ["risotto", "steak"]})
+    await create_booking(db, {**reservation(1, time="20:00"), "main_courses": ["steak"], "upsell_items": {"wine": 1}})
+    await modify_booking(db, first, DATE, "19:30", 2)
+
+    assert not any(path.startswith("kitchen_prep/") for path in written)
+    await apply_rollups(db)
+    sheet = db.docs[f"kitchen_prep/Italian_{DATE}"]
+    assert (sheet["reservations"], sheet["covers"]) == (2, 3)
+    assert sheet["main_courses"] == {"risotto": 1, "steak": 2}
+    assert sheet["upsells"] == {"wine": 1}
+    assert sheet["covers_by_time"] == {"19:30": 2, "20:00": 1}
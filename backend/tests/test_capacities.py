@@ -1 +1,158 @@
 # Example test file for capacities
+import asyncio
+
+import pytest
+from firebase_admin import firestore_async
+
+from app.services.availability import AvailabilityIndex
+from app.services.booking import release_reservation_seats
+from app.services.capacity import (
+    CapacityLedger,
+    SoldOut,
+    capacity_ref,
+    reserve_seats,
+    split_evenly,
+    summarize_capacities
+)
+from tests.fake_firestore import use_fake_db
+
+
+class _Ref:
+    def __init__(self, path):
+        self.path = path
+
+
+class _Transaction:
+    def __init__(self):
+        self.updates = []
+
+    def update(self, ref, data):
+        self.updates.append((ref.path, data["reserved_guests"].value))
+
+
+def test_split_evenly_spreads_remainder():
+    assert split_evenly(10, 4) == [3, 3, 2, 2]
+    assert sum(split_evenly(57, 8)) == 57
+    assert split_evenly(-3, 2) == [0, 0]
+
+
+def test_ledger_nets_release_and_reserve_on_same_doc():
+    ledger = CapacityLedger()
+    shard = _Ref("capacities/Italian_2025-01-01/shards/0")
+    other = _Ref("capacities/Italian_2025-01-02")
+
+    ledger.add(shard, -4)
+    ledger.add(shard, 3)
+    ledger.add(other, 2)
+    assert ledger.pending(shard) == -1
+
+    transaction = _Transaction()
+    ledger.apply(transaction)
+    assert transaction.updates == [(shard.path, -1), (other.path, 2)]
+
+
+@pytest.mark.anyio
+async def test_invalidation_during_full_reload_is_not_lost():
+    db = use_fake_db(latency=0.05)
+    db.docs["capacities/Italian_2099-01-01"] = {
+        "restaurant": "Italian", "date": "2099-01-01", "capacity": 40, "reserved_guests": 10
+    }
+    index = AvailabilityIndex(ttl_seconds=60)
+
+    # The capacity query has returned, the slot counts query is still in flight
+    loading = asyncio.create_task(index.query(db, "Italian"))
+    await asyncio.sleep(0.07)
+    db.docs["capacities/Italian_2099-01-01"]["reserved_guests"] = 12
+    index.invalidate("Italian", "2099-01-01")
+    [row] = await loading
+    assert row["reserved_guests"] == 10
+
+    assert index.available("Italian", "2099-01-01", max_age=60) is None
+    [row] = await index.query(db, "Italian")
+    assert row["reserved_guests"] == 12
+
+
+def seed_sharded_day(db, legacy_reserved: int = 4) -> str:
+    """A 10-seat day sharded three ways after `legacy_reserved` seats were booked."""
+    path = "capacities/Italian_2099-01-01"
+    db.docs[path] = {
+        "restaurant": "Italian", "date": "2099-01-01", "capacity": 10,
+        "reserved_guests": legacy_reserved, "shard_count": 3
+    }
+    for i, seats in enumerate(split_evenly(10 - legacy_reserved, 3)):
+        db.docs[f"{path}/shards/{i}"] = {"capacity": seats, "reserved_guests": 0}
+    return path
+
+
+async def book(db, guests: int) -> dict:
+    """Reserve `guests` seats on the seeded day in one transaction; returns the allocation."""
+    ref = capacity_ref(db, "Italian", "2099-01-01")
+
+    @firestore_async.async_transactional
+    async def reserve(transaction):
+        ledger = CapacityLedger()
+        allocation = await reserve_seats(transaction, ledger, ref, guests, "Italian", "2099-01-01")
+        ledger.apply(transaction)
+        return allocation
+
+    return await reserve(db.transaction())
+
+
+async def release(db, guests: int, allocation: dict):
+    ref = capacity_ref(db, "Italian", "2099-01-01")
+
+    @firestore_async.async_transactional
+    async def release_transaction(transaction):
+        ledger = CapacityLedger()
+        await release_reservation_seats(transaction, ledger, ref, {"guests": guests, "capacity_allocation": allocation})
+        ledger.apply(transaction)
+
+    await release_transaction(db.transaction())
+
+
+async def reserved_total(db) -> int:
+    [summary] = await summarize_capacities(db, [await capacity_ref(db, "Italian", "2099-01-01").get()])
+    return summary["reserved_guests"]
+
+
+@pytest.mark.anyio
+async def test_sharded_day_sells_out_across_shards():
+    db = use_fake_db()
+    seed_sharded_day(db)
+
+    for _ in range(3):
+        await book(db, 2)
+    with pytest.raises(SoldOut):
+        await book(db, 1)
+    assert await reserved_total(db) == 10
+
+
+@pytest.mark.anyio
+async def test_shard_allocated_release_frees_the_seats():
+    db = use_fake_db()
+    seed_sharded_day(db)
+
+    allocation = await book(db, 5)
+    assert sum(allocation.values()) == 5
+    await release(db, 5, allocation)
+
+    assert await reserved_total(db) == 4
+    await book(db, 6)
+    with pytest.raises(SoldOut):
+        await book(db, 1)
+
+
+@pytest.mark.anyio
+async def test_legacy_release_on_sharded_day_frees_the_seats():
+    db = use_fake_db()
+    path = seed_sharded_day(db)
+
+    # Booked before the day was sharded: no allocation
+    await release(db, 4, {})
+
+    assert db.docs[path]["reserved_guests"] == 0
+    assert sum(db.docs[f"{path}/shards/{i}"]["capacity"] for i in range(3)) == 10
+    assert await reserved_total(db) == 0
+    await book(db, 10)
+    with pytest.raises(SoldOut):
+        await book(db, 1)
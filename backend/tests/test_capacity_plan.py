@@ -0,0 +1,111 @@
+import pytest
+
+from app.services.capacity_plan import (
+    CapacityPlanError,
+    expand_template,
+    save_capacity_plan,
+    split_capacity_key
+)
+from tests.fake_firestore import use_fake_db
+
+pytestmark = pytest.mark.anyio
+
+
+def test_capacity_keys_split_on_the_last_underscore():
+    assert split_capacity_key("Sea_Breeze_2099-01-01") == ("Sea_Breeze", "2099-01-01")
+    with pytest.raises(ValueError):
+        split_capacity_key("2099-01-01")
+
+
+def test_template_gives_weekends_their_own_capacity():
+    # 2099-01-01 is a Thursday
+    plan = expand_template(["Italian", "Sea_Breeze"], "2099-01-01", 4, weekday=60, weekend=80)
+
+    assert len(plan) == 8
+    assert plan[("Italian", "2099-01-01")] == 60
+    assert plan[("Sea_Breeze", "2099-01-02")] == 80
+    assert plan[("Italian", "2099-01-03")] == 80
+    assert plan[("Italian", "2099-01-04")] == 60
+
+
+async def test_plan_is_validated_before_anything_is_written():
+    db = use_fake_db()
+    db.docs["capacities/Italian_2099-01-01"] = {
+        "restaurant": "Italian", "date": "2099-01-01", "capacity": 40, "reserved_guests": 30
+    }
+
+    with pytest.raises(CapacityPlanError) as error:
+        await save_capacity_plan(db, {("Italian", "2099-01-02"): 50, ("Italian", "2099-01-01"): 20})
+
+    assert "Already 30 guests reserved" in str(error.value)
+    assert "capacities/Italian_2099-01-02" not in db.docs
+    assert db.writes == 0
+
+
+async def test_plan_reads_once_and_writes_in_chunks():
+    db = use_fake_db()
+    db.docs["capacities/Italian_2099-01-01"] = {
+        "restaurant": "Italian", "date": "2099-01-01", "capacity": 60, "reserved_guests": 30
+    }
+    db.docs["capacities/Italian_2099-01-02"] = {
+        "restaurant": "Italian", "date": "2099-01-02", "capacity": 40, "reserved_guests": 0
+    }
+    plan = expand_template(["Italian", "Sea_Breeze"], "2099-01-01", 250, weekday=60, weekend=80)
+    plan[("Italian", "2099-01-01")] = 60
+
+    result = await save_capacity_plan(db, plan)
+
+    assert result == {"created": 498, "updated": 1, "unchanged": 1, "failed": []}
+    assert db.reads == 500
+    assert db.commits == 2
+    assert db.docs["capacities/Italian_2099-01-02"]["capacity"] == 80
+    assert db.docs["capacities/Sea_Breeze_2099-09-07"]["restaurant"] == "Sea_Breeze"
+
+
+async def test_plan_reports_days_that_failed_after_writing_started():
+    db = use_fake_db()
+    db.docs["capacities/Sea_Breeze_2099-01-01"] = {
+        "restaurant": "Sea_Breeze", "date": "2099-01-01", "capacity": 20, "reserved_guests": 0, "shard_count": 2
+    }
+    db.docs["capacities/Sea_Breeze_2099-01-01/shards/0"] = {"capacity": 10, "reserved_guests": 4}
+    db.docs["capacities/Sea_Breeze_2099-01-01/shards/1"] = {"capacity": 10, "reserved_guests": 4}
+
+    async def booking_lands(writes):
+        # Bookings take the sharded day past the planned capacity mid-plan
+        db.docs["capacities/Sea_Breeze_2099-01-01/shards/0"]["reserved_guests"] = 8
+
+    db.before_commit = booking_lands
+    result = await save_capacity_plan(db, {("Italian", "2099-01-01"): 40, ("Sea_Breeze", "2099-01-01"): 10})
+
+    assert result["created"] == 1
+    assert result["updated"] == 0
+    [failed] = result["failed"]
+    assert (failed["restaurant"], failed["date"]) == ("Sea_Breeze", "2099-01-01")
+    assert "Already 12 guests reserved" in failed["error"]
+    assert db.docs["capacities/Italian_2099-01-01"]["capacity"] == 40
+    assert db.docs["capacities/Sea_Breeze_2099-01-01"]["capacity"] == 20
+
+
+async def test_plan_does_not_overwrite_a_day_booked_since_it_was_read():
+    db = use_fake_db()
+    db.docs["capacities/Italian_2099-01-01"] = {
+        "restaurant": "Italian", "date": "2099-01-01", "capacity": 40, "reserved_guests": 10
+    }
+    booked = []
+
+    async def booking_lands(writes):
+        # A booking takes the day past the planned capacity between the read and the commit
+        if not booked:
+            booked.append(True)
+            await db.document("capacities/Italian_2099-01-01").update({"reserved_guests": 30})
+
+    db.before_commit = booking_lands
+    result = await save_capacity_plan(db, {("Italian", "2099-01-01"): 20, ("Italian", "2099-01-02"): 40})
+
+    assert result["created"] == 0
+    assert result["updated"] == 0
+    assert [(f["restaurant"], f["date"]) for f in result["failed"]] == [
+        ("Italian", "2099-01-01"), ("Italian", "2099-01-02")
+    ]
+    assert db.docs["capacities/Italian_2099-01-01"]["capacity"] == 40
+    assert "capacities/Italian_2099-01-02" not in db.docs
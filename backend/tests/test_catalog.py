@@ -0,0 +1,38 @@
+import json
+
+import pytest
+from fastapi import Request
+
+from app.services.catalog import config_catalog
+from tests.fake_firestore import use_fake_db
+
+pytestmark = pytest.mark.anyio
+
+
+def request(if_none_match: str = None) -> Request:
+    headers = [(b"if-none-match", if_none_match.encode())] if if_none_match else []
+    return Request({"type": "http", "method": "GET", "headers": headers})
+
+
+async def test_catalog_is_serialized_once_and_revalidated_with_etag():
+    db = use_fake_db()
+    db.docs["restaurant_configs/Italian"] = {"restaurantId": "Italian", "openingTime": "19:00"}
+    config_catalog.invalidate()
+
+    first = await config_catalog.respond(db, request())
+    assert json.loads(first.body)["Italian"]["intervalMinutes"] == 30
+    etag = first.headers["etag"]
+    assert "max-age" in first.headers["cache-control"]
+
+    reads = db.reads
+    not_modified = await config_catalog.respond(db, request(f'W/{etag}'))
+    assert not_modified.status_code == 304
+    assert not_modified.body == b""
+    assert db.reads == reads
+
+    db.docs["restaurant_configs/Italian"]["openingTime"] = "18:30"
+    config_catalog.invalidate()
+    changed = await config_catalog.respond(db, request(etag))
+    assert changed.status_code == 200
+    assert changed.headers["etag"] != etag
+    assert json.loads(changed.body)["Italian"]["openingTime"] == "18:30"
@@ -0,0 +1,22 @@
+import httpx
+
+from app.services.email_outbox import backoff_delay, is_permanent_failure
+
+
+def _status_error(status: int) -> httpx.HTTPStatusError:
+    request = httpx.Request("POST", "https://api.mailgun.net/v3/test/messages")
+    return httpx.HTTPStatusError("error", request=request, response=httpx.Response(status, request=request))
+
+
+def test_backoff_grows_and_is_capped():
+    first = backoff_delay(1).total_seconds()
+    fourth = backoff_delay(4).total_seconds()
+    assert first < fourth
+    assert backoff_delay(30).total_seconds() <= 3600
+
+
+def test_only_client_errors_are_permanent():
+    assert is_permanent_failure(_status_error(400))
+    assert not is_permanent_failure(_status_error(429))
+    assert not is_permanent_failure(_status_error(503))
+    assert not is_permanent_failure(httpx.ConnectTimeout("timeout"))
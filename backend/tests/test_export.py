@@ -0,0 +1,56 @@
+import csv
+import io
+import json
+
+import pytest
+from openpyxl import load_workbook
+
+from app.services.export import export_chunks
+from tests.fake_firestore import use_fake_db
+
+pytestmark = pytest.mark.anyio
+
+
+def seed(db, count: int):
+    for i in range(count):
+        db.docs[f"reservations/r{i:04d}"] = {
+            "name": f"Guest {i}", "room": str(100 + i), "date": f"2025-06-{1 + i % 10:02d}",
+            "time": "19:00", "guests": 2, "restaurant": "Italian", "status": "confirmed",
+            "upsell_items": {"Wine": 1}, "main_courses": ["Pasta", "Fish"]
+        }
+    db.docs["reservations/out-of-range"] = {**db.docs["reservations/r0000"], "date": "2025-07-01"}
+
+
+async def collect(db, export_format: str, page_size: int) -> bytes:
+    return b"".join([chunk async for chunk in export_chunks(
+        db, export_format, from_date="2025-06-01", to_date="2025-06-30", page_size=page_size
+    )])
+
+
+async def test_csv_export_pages_through_the_whole_range():
+    db = use_fake_db()
+    seed(db, 1050)
+
+    chunks = [chunk async for chunk in export_chunks(db, "csv", to_date="2025-06-30", page_size=100)]
+    rows = list(csv.DictReader(io.StringIO(b"".join(chunks).decode("utf-8-sig"))))
+
+    assert len(chunks) == 1 + 11
+    assert len(rows) == 1050
+    assert len({row["id"] for row in rows}) == 1050
+    assert [row["date"] for row in rows] == sorted(row["date"] for row in rows)
+    assert rows[0]["main_courses"] == "Pasta; Fish"
+    assert rows[0]["upsell_items"] == "Wine x1"
+
+
+async def test_ndjson_and_xlsx_exports():
+    db = use_fake_db()
+    seed(db, 30)
+
+    lines = (await collect(db, "ndjson", page_size=7)).decode().splitlines()
+    assert len(lines) == 30
+    assert json.loads(lines[0])["restaurant"] == "Italian"
+
+    sheet = load_workbook(io.BytesIO(await collect(db, "xlsx", page_size=7)), read_only=True).active
+    rows = list(sheet.iter_rows(values_only=True))
+    assert rows[0][:3] == ("id", "date", "time")
+    assert len(rows) == 31
@@ -0,0 +1,68 @@
+import asyncio
+
+import pytest
+from firebase_admin import firestore_async
+from google.cloud.firestore_v1 import Increment
+
+from benchmarks import api_load
+from tests.fake_firestore import use_fake_db
+
+pytestmark = pytest.mark.anyio
+
+
+async def book(db, guests: int):
+    capacity_ref = db.collection("capacities").document("Italian_2099-01-01")
+
+    @firestore_async.async_transactional
+    async def booking_transaction(transaction):
+        capacity = (await capacity_ref.get(transaction=transaction)).to_dict()
+        if capacity["reserved_guests"] + guests > capacity["capacity"]:
+            raise ValueError("Full")
+        transaction.update(capacity_ref, {"reserved_guests": capacity["reserved_guests"] + guests})
+
+    await booking_transaction(db.transaction())
+
+
+async def test_concurrent_transactions_retry_instead_of_losing_updates():
+    db = use_fake_db(latency=0.001)
+    db.docs["capacities/Italian_2099-01-01"] = {"capacity": 10, "reserved_guests": 0}
+
+    results = await asyncio.gather(*(book(db, 2) for _ in range(6)), return_exceptions=True)
+
+    # Read-modify-write without increments: only retries keep the total right
+    assert db.docs["capacities/Italian_2099-01-01"]["reserved_guests"] == 10
+    assert sum(isinstance(result, ValueError) for result in results) == 1
+    assert db.transaction_retries > 0
+
+
+async def test_failed_transaction_writes_nothing():
+    db = use_fake_db()
+    db.docs["capacities/Italian_2099-01-01"] = {"capacity": 1, "reserved_guests": 0}
+
+    with pytest.raises(ValueError):
+        await book(db, 2)
+
+    assert db.docs["capacities/Italian_2099-01-01"]["reserved_guests"] == 0
+    assert db.writes == 0
+
+
+async def test_snapshots_do_not_change_after_later_writes():
+    db = use_fake_db()
+    ref = db.collection("daily_stats").document("Italian_2099-01-01")
+    await ref.set({"covers": 1})
+    snapshot = await ref.get()
+
+    await ref.set({"covers": Increment(2)}, merge=True)
+
+    assert snapshot.get("covers") == 1
+    assert (await ref.get()).get("covers") == 3
+
+
+async def test_load_benchmark_drives_every_scenario_offline():
+    results = await api_load.run(requests=12, concurrency=4)
+
+    assert set(results) == set(api_load.SCENARIOS)
+    for result in results.values():
+        assert result["errors"] == 0, result["statuses"]
+        assert result["p50"] <= result["p95"] <= result["p99"]
+    assert results["list"]["reads_per_request"] > 0
@@ -0,0 +1,80 @@
+import io
+
+import pytest
+from openpyxl import Workbook
+
+from app.services.guest_import import GUEST_LIST_MANIFEST, import_guest_list
+from tests.fake_firestore import use_fake_db
+
+pytestmark = pytest.mark.anyio
+
+
+def pms_csv(rooms: range, delimiter: str = ";") -> io.BytesIO:
+    lines = [delimiter.join(["Room", "Last Name", "VIP"])]
+    for room in rooms:
+        lines.append(delimiter.join([str(room), f" Guest{room} ", "Gold" if room % 10 == 0 else ""]))
+    return io.BytesIO("\n".join(lines).encode("utf-8"))
+
+
+async def test_nightly_csv_import_commits_in_parallel_batches():
+    db = use_fake_db()
+
+    report = await import_guest_list(db, pms_csv(range(1000, 2500)), "export.csv")
+
+    assert (report["rows"], report["imported"], report["batches"]) == (1500, 1500, 4)
+    assert report["failed"] == []
+    assert report["rows_per_second"] > 0
+    guest = db.docs["guest_list/1010"]
+    assert guest == {
+        "room": "1010",
+        "last_name": "Guest1010",
+        "last_name_normalized": "guest1010",
+        "vip_level": "Gold",
+        "is_vip": True
+    }
+    assert db.docs["guest_list/1011"]["vip_level"] == "Standard"
+    assert db.docs["guest_list/1011"]["is_vip"] is False
+
+
+async def test_replace_removes_departed_rooms_via_manifest():
+    db = use_fake_db()
+    db.docs["guest_list/9"] = {"room": "9", "last_name": "Legacy"}
+
+    await import_guest_list(db, pms_csv(range(100, 110)), "export.csv", replace=True)
+    assert "guest_list/9" not in db.docs
+
+    reads = db.reads
+    report = await import_guest_list(db, pms_csv(range(105, 112)), "export.csv", replace=True)
+
+    assert report["deleted"] == 5
+    assert sorted(path for path in db.docs if path.startswith("guest_list/")) == [
+        f"guest_list/{room}" for room in range(105, 112)
+    ]
+    assert db.docs[GUEST_LIST_MANIFEST]["rooms"] == [str(room) for room in range(105, 112)]
+    # Only the manifest was read: no collection scan
+    assert db.reads - reads == 1
+
+
+async def test_xlsx_rows_are_normalized_and_deduplicated():
+    db = use_fake_db()
+    workbook = Workbook()
+    sheet = workbook.active
+    sheet.append(["Room ", "Last Name"])
+    sheet.append([101.0, "Rossi"])
+    sheet.append([101, "Bianchi"])
+    sheet.append([None, "Nobody"])
+    sheet.append([None, None])
+    sheet.append([102, "Verdi"])
+    content = io.BytesIO()
+    workbook.save(content)
+
+    report = await import_guest_list(db, content, "Guests.XLSX")
+
+    assert (report["rows"], report["imported"], report["skipped"], report["duplicates"]) == (4, 2, 1, 1)
+    assert db.docs["guest_list/101"]["last_name"] == "Rossi"
+    assert db.docs["guest_list/102"]["is_vip"] is False
+
+
+async def test_missing_columns_are_rejected():
+    with pytest.raises(ValueError):
+        await import_guest_list(use_fake_db(), io.BytesIO(b"Room,Name\n1,A\n"), "export.csv")
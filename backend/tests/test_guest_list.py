@@ -0,0 +1,66 @@
+from types import SimpleNamespace
+
+import pytest
+
+from app.services.guest_list import GuestListCache
+from tests.fake_firestore import use_fake_db
+
+pytestmark = pytest.mark.anyio
+
+
+def seed_guests(db, rooms):
+    for room in rooms:
+        db.docs[f"guest_list/{room}"] = {
+            "room": str(room),
+            "last_name": "Rossi",
+            "last_name_normalized": "rossi",
+            "vip_level": "Gold",
+            "is_vip": True
+        }
+
+
+def change(kind: str, room: str, data: dict = None):
+    document = SimpleNamespace(id=room, to_dict=lambda: data)
+    return SimpleNamespace(type=SimpleNamespace(name=kind), document=document)
+
+
+async def test_loaded_cache_answers_without_reads():
+    db = use_fake_db()
+    seed_guests(db, range(100, 110))
+    cache = GuestListCache(max_entries=100)
+    await cache.load(db)
+
+    reads = db.reads
+    assert (await cache.lookup(db, "105"))["is_vip"] is True
+    assert await cache.lookup(db, "999") is None
+    assert db.reads == reads
+    assert cache.stats() == {"entries": 10, "complete": True, "hits": 2, "misses": 0}
+
+
+async def test_snapshot_changes_are_applied():
+    db = use_fake_db()
+    seed_guests(db, [100, 101])
+    cache = GuestListCache(max_entries=100)
+    await cache.load(db)
+
+    cache._on_snapshot([], [
+        change("ADDED", "200", {"last_name_normalized": "bianchi", "is_vip": False}),
+        change("REMOVED", "100")
+    ], None)
+
+    assert (await cache.lookup(db, "200"))["last_name_normalized"] == "bianchi"
+    assert await cache.lookup(db, "100") is None
+
+
+async def test_oversized_list_falls_back_to_point_reads():
+    db = use_fake_db()
+    seed_guests(db, range(100, 110))
+    cache = GuestListCache(max_entries=4)
+    await cache.load(db)
+
+    assert cache.stats()["complete"] is False
+    assert (await cache.lookup(db, "109"))["vip_level"] == "Gold"
+    assert await cache.lookup(db, "999") is None
+    assert await cache.lookup(db, "999") is None
+    assert (cache.misses, cache.hits) == (2, 1)
+    assert cache.stats()["entries"] == 4
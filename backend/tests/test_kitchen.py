@@ -0,0 +1,69 @@
+import pytest
+
+from app.api.v1.endpoints.kitchen import get_kitchen_prep
+from app.services.catalog import restaurant_catalog
+from app.services.kitchen import backfill_kitchen_prep
+from app.services.rollups import Rollups, rollup_worker
+from tests.fake_firestore import use_fake_db
+
+pytestmark = pytest.mark.anyio
+
+DATE = "2025-06-01"
+
+
+def booking(time: str, guests: int, courses: list, upsells: dict) -> dict:
+    return {
+        "restaurant": "Italian", "date": DATE, "time": time, "guests": guests, "status": "confirmed",
+        "main_courses": courses, "upsell_items": upsells
+    }
+
+
+async def stage(db, rollups: Rollups):
+    batch = db.batch()
+    rollups.stage(batch, db)
+    await batch.commit()
+
+
+async def test_prep_sheet_follows_bookings_and_reads_one_document():
+    db = use_fake_db()
+    restaurant_catalog.invalidate()
+    bookings = [
+        booking("19:00", 2, ["lasagna", "risotto"], {"tiramisu": 2}),
+        booking("19:30", 3, ["lasagna", "lasagna", "pizza"], {}),
+        booking("19:00", 1, ["risotto"], {"tiramisu": 1, "wine": 1})
+    ]
+    for data in bookings:
+        rollups = Rollups()
+        rollups.add_reservation(data, 1)
+        await stage(db, rollups)
+    # Cancel the last one, and move the second to 20:00
+    rollups = Rollups()
+    rollups.add_reservation(bookings[2], -1)
+    await stage(db, rollups)
+    rollups = Rollups()
+    rollups.add_prep("Italian", DATE, covers={"19:30": -3, "20:00": 3})
+    await stage(db, rollups)
+    assert await rollup_worker.apply(db) == 5
+
+    await restaurant_catalog.get(db)
+    reads = db.reads
+    prep = await get_kitchen_prep(restaurant="Italian", date=DATE, user={})
+
+    assert db.reads - reads == 1
+    assert (prep["reservations"], prep["covers"]) == (2, 5)
+    assert prep["covers_by_time"] == {"19:00": 2, "20:00": 3}
+    assert prep["main_courses"][0] == {"id": "lasagna", "label": "lasagna", "count": 3}
+    assert {row["id"]: row["count"] for row in prep["main_courses"]} == {"lasagna": 3, "risotto": 1, "pizza": 1}
+    assert prep["upsells"] == [{"id": "tiramisu", "label": "tiramisu", "count": 2}]
+
+
+async def test_backfill_rebuilds_prep_sheets():
+    db = use_fake_db()
+    db.docs["reservations/a"] = booking("19:00", 2, ["lasagna", "lasagna"], {"wine": 2})
+    db.docs["reservations/b"] = booking("20:00", 4, ["pizza"], {})
+
+    assert await backfill_kitchen_prep(db) == 1
+    sheet = db.docs[f"kitchen_prep/Italian_{DATE}"]
+    assert (sheet["reservations"], sheet["covers"]) == (2, 6)
+    assert sheet["main_courses"] == {"lasagna": 2, "pizza": 1}
+    assert sheet["covers_by_time"] == {"19:00": 2, "20:00": 4}
@@ -0,0 +1,80 @@
+import httpx
+import pytest
+from fastapi import FastAPI
+from prometheus_client import REGISTRY
+
+from app.core.metrics import MetricsMiddleware
+from app.services.firestore import InstrumentedFirestore, get_db
+from tests.fake_firestore import use_fake_db
+
+pytestmark = pytest.mark.anyio
+
+
+def operations(route: str, operation: str) -> float:
+    return REGISTRY.get_sample_value(
+        "firestore_operations_total", {"route": route, "operation": operation}
+    ) or 0.0
+
+
+def metrics_app() -> FastAPI:
+    app = FastAPI()
+    app.add_middleware(MetricsMiddleware)
+
+    @app.get("/rooms/{room}")
+    async def room(room: str):
+        db = get_db()
+        guest = await db.collection("guest_list").document(room).get()
+        bookings = [doc async for doc in db.collection("reservations").where("room", "==", room).stream()]
+        batch = db.batch()
+        batch.set(db.collection("visits").document(room), {"seen": True})
+        await batch.commit()
+        return {"vip": guest.exists, "bookings": len(bookings)}
+
+    return app
+
+
+async def test_requests_are_timed_and_charged_their_firestore_operations():
+    db = use_fake_db()
+    db.docs["guest_list/101"] = {"last_name": "Rossi"}
+    db.docs["reservations/a"] = {"room": "101"}
+    db.docs["reservations/b"] = {"room": "101"}
+    route = "/rooms/{room}"
+    reads, writes = operations(route, "read"), operations(route, "write")
+
+    transport = httpx.ASGITransport(app=metrics_app())
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+        response = await client.get("/rooms/101")
+
+    assert response.json() == {"vip": True, "bookings": 2}
+    # One point read plus two query results, as Firestore bills them
+    assert operations(route, "read") - reads == 3
+    assert operations(route, "write") - writes == 1
+    assert REGISTRY.get_sample_value(
+        "http_request_duration_seconds_count", {"method": "GET", "route": route, "status": "200"}
+    ) >= 1
+    assert db.docs["visits/101"] == {"seen": True}
+
+
+async def test_empty_queries_and_aggregations_bill_one_read():
+    use_fake_db()
+    db = get_db()
+    reads = operations("background", "read")
+
+    assert await db.collection("reservations").where("room", "==", "404").get() == []
+    await db.collection("reservations").count(alias="total").get()
+
+    assert operations("background", "read") - reads == 2
+
+
+async def test_transaction_retries_are_counted():
+    class Transaction:
+        async def _begin(self, retry_id=None):
+            pass
+
+    transaction = InstrumentedFirestore(Transaction())
+    retries = operations("background", "transaction_retry")
+
+    await transaction._begin(retry_id=None)
+    await transaction._begin(retry_id=b"failed-attempt")
+
+    assert operations("background", "transaction_retry") - retries == 1
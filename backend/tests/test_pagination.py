@@ -0,0 +1,63 @@
+import pytest
+from fastapi import HTTPException
+
+from app.api.v1.endpoints.reservations import list_reservations
+from app.models.reservation import ReservationFilter
+from app.services.pagination import count_cache, decode_cursor, encode_cursor
+from tests.fake_firestore import use_fake_db
+from tests.test_search import reservation
+
+pytestmark = pytest.mark.anyio
+
+
+def test_cursor_round_trip():
+    cursor = encode_cursor("2025-06-01", "abc")
+    assert decode_cursor(cursor, 2) == ["2025-06-01", "abc"]
+    with pytest.raises(ValueError):
+        decode_cursor("not-a-cursor!", 2)
+
+
+async def test_pages_follow_encoded_cursors_without_extra_reads():
+    db = use_fake_db()
+    count_cache.clear()
+    # Many reservations share a date, so ordering relies on the id tiebreaker
+    for i in range(25):
+        db.docs[f"reservations/r{i:02d}"] = reservation(f"Guest{i} Doe", str(i), f"2025-06-{1 + i % 3:02d}")
+
+    seen, cursor, pages = [], None, 0
+    while True:
+        reads = db.reads
+        page = await list_reservations(
+            filters=ReservationFilter(limit=10, cursor=cursor, include_total=pages == 0), user={}
+        )
+        pages += 1
+        seen += [item.id for item in page.items]
+        assert db.reads - reads <= 11 + (1 if pages == 1 else 0)
+        if pages == 1:
+            assert page.pagination.total_items == 25
+        if not page.pagination.has_next:
+            assert page.pagination.next_cursor is None
+            break
+        cursor = page.pagination.next_cursor
+
+    assert pages == 3
+    assert len(seen) == len(set(seen)) == 25
+    assert [seen.index(f"r{i:02d}") < seen.index(f"r{i - 3:02d}") for i in range(3, 25)] == [True] * 22
+
+    with pytest.raises(HTTPException) as error:
+        await list_reservations(filters=ReservationFilter(cursor="bogus"), user={})
+    assert error.value.status_code == 400
+
+
+async def test_totals_are_cached_per_filter_combination():
+    db = use_fake_db()
+    count_cache.clear()
+    for i in range(5):
+        db.docs[f"reservations/r{i}"] = reservation(f"Guest{i} Doe", str(i), "2025-06-01")
+
+    first = await list_reservations(filters=ReservationFilter(include_total=True), user={})
+    db.docs["reservations/late"] = reservation("Late Doe", "99", "2025-06-01")
+    cached = await list_reservations(filters=ReservationFilter(include_total=True), user={})
+    other = await list_reservations(filters=ReservationFilter(include_total=True, date="2025-06-01"), user={})
+
+    assert (first.pagination.total_items, cached.pagination.total_items, other.pagination.total_items) == (5, 5, 6)
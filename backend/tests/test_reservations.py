@@ -45,7 +45,7 @@ async def setup_capacity():
     async for doc in reservations_query.stream():
         await doc.reference.delete()
 
-@patch("app.services.email.send_confirmation_email")
+@patch("app.api.v1.endpoints.reservations.stage_email")
 async def test_create_reservation_success(mock_send_email, client: AsyncClient, setup_capacity):
     """Test successful reservation creation."""
     test_date = setup_capacity["test_date"]
@@ -76,7 +76,7 @@ async def test_create_reservation_success(mock_send_email, client: AsyncClient,
     assert capacity_doc.exists
     assert capacity_doc.to_dict()["reserved_guests"] == 2
 
-@patch("app.services.email.send_confirmation_email")
+@patch("app.api.v1.endpoints.reservations.stage_email")
 async def test_create_reservation_overbooking(mock_send_email, client: AsyncClient, setup_capacity):
     """Test reservation overbooking prevention with concurrent requests."""
     test_date = setup_capacity["test_date"]
@@ -139,7 +139,7 @@ async def test_create_reservation_overbooking(mock_send_email, client: AsyncClie
 # Add more tests for other reservation endpoints (list, delete, etc.)
 # For example:
 
-@patch("app.services.email.send_confirmation_email")
+@patch("app.api.v1.endpoints.reservations.stage_email")
 async def test_list_reservations(mock_send_email, client: AsyncClient, setup_capacity):
     """Test listing reservations with filters and pagination."""
     test_date = setup_capacity["test_date"]
@@ -186,7 +186,7 @@ async def test_list_reservations(mock_send_email, client: AsyncClient, setup_cap
     assert len(data_page2["items"]) == 1 # Only one remaining
     assert data_page2["pagination"]["has_next"] == False
 
-@patch("app.services.email.send_confirmation_email")
+@patch("app.api.v1.endpoints.reservations.stage_email")
 async def test_cancel_reservation(mock_send_email, client: AsyncClient, setup_capacity):
     """Test cancelling a reservation."""
     test_date = setup_capacity["test_date"]
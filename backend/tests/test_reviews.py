@@ -1 +1,123 @@
 # Example test file for reviews
+import pytest
+
+from app.api.v1.endpoints.reviews import _create_legacy_review_token, submit_review
+from app.services.review_requests import dispatch_review_requests
+from app.services.stats import merge_review_stats, stage_review_stats
+from tests.fake_firestore import use_fake_db
+
+pytestmark = pytest.mark.anyio
+
+DINNER_DATE = "2025-06-01"
+
+
+def seed_reservations(db, count: int):
+    """Simulate a busy night: `count` confirmed reservations awaiting a review request."""
+    for i in range(count):
+        db.docs[f"reservations/res{i:05d}"] = {
+            "name": f"Guest {i}",
+            "email": f"guest{i}@example.com",
+            "restaurantId": "Italian",
+            "date": DINNER_DATE,
+            "status": "confirmed",
+            "review": {"requestSent": False}
+        }
+    # Noise that must not be picked up
+    template = db.docs["reservations/res00000"]
+    db.docs["reservations/other-day"] = {**template, "date": "2025-06-02", "review": {"requestSent": False}}
+    db.docs["reservations/zz-no-email"] = {**template, "email": None, "review": {"requestSent": False}}
+
+
+def outbox(db) -> list:
+    return [data for path, data in db.docs.items() if path.startswith("email_outbox/")]
+
+
+async def test_dispatch_pages_and_chunks_thousands_of_reservations():
+    db = use_fake_db()
+    seed_reservations(db, 3000)
+
+    report = await dispatch_review_requests(db, DINNER_DATE, chunk_size=150, max_in_flight=4)
+
+    assert report["sent"] == 3000
+    assert report["skipped"] == 1
+    assert report["failed"] == []
+    assert report["chunks"] == 20
+    assert report["per_second"] > 0
+    assert len(outbox(db)) == 3000
+    assert all(db.docs[f"reservations/res{i:05d}"]["review"]["requestSent"] for i in range(3000))
+    assert db.docs["reservations/other-day"]["review"]["requestSent"] is False
+
+    # Every link resolves with a single point read of its token doc
+    token = db.docs["reservations/res00042"]["review"]["token"]
+    assert db.docs[f"review_tokens/{token}"]["reservationId"] == "res00042"
+    assert db.docs[f"review_tokens/{token}"]["used"] is False
+
+
+async def test_dispatch_is_resumable_after_failed_chunks():
+    db = use_fake_db()
+    seed_reservations(db, 1000)
+    failing = {"left": 2}
+
+    async def flaky_commit(writes):
+        if failing["left"]:
+            failing["left"] -= 1
+            raise RuntimeError("deadline exceeded")
+
+    db.before_commit = flaky_commit
+    first = await dispatch_review_requests(db, DINNER_DATE, chunk_size=100)
+    assert first["sent"] == 800
+    assert len(first["failed"]) == 200
+
+    # Re-running only picks up the reservations whose chunk failed
+    second = await dispatch_review_requests(db, DINNER_DATE, chunk_size=100)
+    assert second["sent"] == 200
+    assert second["failed"] == []
+    assert len(outbox(db)) == 1000
+
+    third = await dispatch_review_requests(db, DINNER_DATE, chunk_size=100)
+    assert third["sent"] == 0
+
+
+async def test_review_stats_buckets_merge_into_summary():
+    db = use_fake_db()
+    for date, rating in [("2025-06-01", 10), ("2025-06-01", 7), ("2025-06-02", 7), ("2025-06-02", 4)]:
+        batch = db.batch()
+        stage_review_stats(batch, db, "Italian", date, rating)
+        await batch.commit()
+
+    bucket = db.docs["review_stats/Italian_2025-06-01"]
+    assert (bucket["count"], bucket["sum"], bucket["histogram"]) == (2, 17, {"10": 1, "7": 1})
+
+    summary = merge_review_stats(
+        data for path, data in db.docs.items() if path.startswith("review_stats/")
+    )
+    assert summary["count"] == 4
+    assert summary["avg"] == 7.0
+    assert summary["histogram"][7] == 2
+    assert summary["histogram"][1] == 0
+
+
+async def test_legacy_token_doc_is_created_once():
+    db = use_fake_db()
+    seed_reservations(db, 1)
+    db.docs["reservations/res00000"]["review"]["token"] = "legacy-token"
+
+    assert await _create_legacy_review_token(db, "legacy-token")
+    assert db.docs["review_tokens/legacy-token"]["used"] is False
+
+    # A submission marks it used; a late retry of the lookup must not reset it
+    db.docs["review_tokens/legacy-token"]["used"] = True
+    assert await _create_legacy_review_token(db, "legacy-token")
+    assert db.docs["review_tokens/legacy-token"]["used"] is True
+
+    assert not await _create_legacy_review_token(db, "unknown-token")
+
+
+async def test_review_is_taken_after_the_reservation_was_deleted():
+    db = use_fake_db()
+    db.docs["review_tokens/token"] = {"reservationId": "gone", "restaurantId": "Italian", "used": False}
+
+    assert await submit_review({"token": "token", "rating": 8}) == {"message": "Review submitted"}
+    assert db.docs["review_tokens/token"]["used"] is True
+    assert "reservations/gone" not in db.docs
+    assert [data["rating"] for path, data in db.docs.items() if path.startswith("restaurant_reviews/")] == [8]
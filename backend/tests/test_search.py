@@ -0,0 +1,42 @@
+import pytest
+
+from app.api.v1.endpoints.reservations import list_reservations
+from app.models.reservation import ReservationFilter
+from app.services.search import backfill_search_keys, search_keys, search_term
+from tests.fake_firestore import use_fake_db
+
+pytestmark = pytest.mark.anyio
+
+
+def reservation(name: str, room: str, date: str) -> dict:
+    return {
+        "name": name, "email": f"{name.split()[0].lower()}@example.com", "room": room,
+        "date": date, "time": "19:00", "guests": 2, "restaurant": "Italian",
+        "main_courses": [], "comments": "", "upsell_items": {}, "upsell_total_price": 0.0,
+        "status": "confirmed", "paid": False, "email_status": "sent", "cancel_token": "t",
+        "created_at": "2025-01-01T00:00:00Z"
+    }
+
+
+def test_keys_cover_name_words_room_and_email():
+    keys = search_keys({"name": "José  Smith", "room": "1204", "email": "Jose@Example.com"})
+
+    assert {"jose", "jo", "smi", "jose sm", "12", "1204", "jose@ex"} <= set(keys)
+    assert search_term("  SMITH ") == "smith"
+    assert search_term("   ") is None
+
+
+async def test_search_spans_the_whole_range_in_one_query():
+    db = use_fake_db()
+    for i in range(120):
+        db.docs[f"reservations/r{i:03d}"] = reservation(f"Guest{i} Doe", str(100 + i), f"2025-06-{1 + i % 28:02d}")
+    db.docs["reservations/smith"] = reservation("Anna Smith", "9001", "2025-01-05")
+    db.docs["reservations/smithers"] = reservation("Bob Smithers", "9002", "2025-12-30")
+
+    assert await backfill_search_keys(db) == 122
+
+    page = await list_reservations(filters=ReservationFilter(search="Smith", limit=50), user={})
+    assert sorted(item.id for item in page.items) == ["smith", "smithers"]
+
+    page = await list_reservations(filters=ReservationFilter(search="900", limit=50), user={})
+    assert len(page.items) == 2
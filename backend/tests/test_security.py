@@ -0,0 +1,55 @@
+import time
+
+import pytest
+
+from app.core import security
+from app.core.security import VerifiedTokenCache
+
+pytestmark = pytest.mark.anyio
+
+
+@pytest.fixture
+def verify_calls(monkeypatch):
+    calls = []
+
+    def fake_verify(id_token, check_revoked=False):
+        calls.append(id_token)
+        if id_token == "revoked":
+            raise ValueError("revoked")
+        return {"uid": id_token, "role": "kitchen", "exp": time.time() + 3600}
+
+    monkeypatch.setattr(security.admin_auth, "verify_id_token", fake_verify)
+    return calls
+
+
+async def test_repeat_tokens_skip_verification(verify_calls):
+    cache = VerifiedTokenCache(max_entries=10, revocation_check_seconds=300)
+
+    for _ in range(5):
+        assert (await cache.verify("token-a"))["uid"] == "token-a"
+
+    assert verify_calls == ["token-a"]
+    assert (cache.hits, cache.misses) == (4, 1)
+
+
+async def test_revocation_is_rechecked_and_failures_are_not_cached(verify_calls):
+    cache = VerifiedTokenCache(max_entries=10, revocation_check_seconds=0)
+    await cache.verify("token-a")
+    await cache.verify("token-a")
+    assert verify_calls == ["token-a", "token-a"]
+
+    for _ in range(2):
+        with pytest.raises(ValueError):
+            await cache.verify("revoked")
+    assert verify_calls.count("revoked") == 2
+
+
+async def test_entries_expire_with_the_token_and_are_bounded(verify_calls, monkeypatch):
+    cache = VerifiedTokenCache(max_entries=2, revocation_check_seconds=300)
+    for token in ("a", "b", "c"):
+        await cache.verify(token)
+    assert len(cache._entries) == 2
+
+    monkeypatch.setattr(security.time, "time", lambda: 2 ** 40)
+    await cache.verify("c")
+    assert verify_calls == ["a", "b", "c", "c"]
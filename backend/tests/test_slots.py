@@ -0,0 +1,125 @@
+import pytest
+from firebase_admin import firestore_async
+
+from app.services.availability import availability_index
+from app.services.catalog import config_catalog, restaurant_catalog
+from app.services.rollups import Rollups, rollup_worker
+from app.services.slots import (
+    SlotPacing,
+    backfill_slot_counts,
+    slot_limits,
+    slot_times,
+    stage_slot_changes
+)
+from tests.fake_firestore import use_fake_db
+
+pytestmark = pytest.mark.anyio
+
+DATE = "2099-01-01"
+
+
+def use_slot_db():
+    db = use_fake_db()
+    db.docs["restaurant_configs/Italian"] = {
+        "restaurantId": "Italian",
+        "openingTime": "19:00",
+        "closingTime": "21:00",
+        "intervalMinutes": 30,
+        "slotCapacity": 10
+    }
+    db.docs[f"capacities/Italian_{DATE}"] = {
+        "restaurant": "Italian", "date": DATE, "capacity": 30, "reserved_guests": 14
+    }
+    for cache in (config_catalog, restaurant_catalog, availability_index):
+        cache.invalidate()
+    return db
+
+
+def test_slot_times_run_past_midnight():
+    assert slot_times("18:00", "19:30", 30) == ["18:00", "18:30", "19:00"]
+    assert slot_times("23:00", "00:30", 30) == ["23:00", "23:30", "00:00"]
+
+
+async def test_grid_reports_remaining_seats_per_slot():
+    db = use_slot_db()
+    rollups = Rollups()
+    rollups.add_slots("Italian", DATE, {"19:00": 8, "20:00": 6})
+    batch = db.batch()
+    rollups.stage(batch, db)
+    await batch.commit()
+
+    # Nothing is counted until the rollup worker applies the event
+    [day] = await availability_index.slots(db, "Italian", DATE, DATE)
+    assert [slot["available"] for slot in day["slots"]] == [10, 10, 10, 10]
+
+    await rollup_worker.apply(db)
+    [day] = await availability_index.slots(db, "Italian", DATE, DATE)
+
+    assert day["available"] == 16
+    assert day["slots"] == [
+        {"time": "19:00", "reserved": 8, "available": 2},
+        {"time": "19:30", "reserved": 0, "available": 10},
+        {"time": "20:00", "reserved": 6, "available": 4},
+        {"time": "20:30", "reserved": 0, "available": 10}
+    ]
+
+    # A moved reservation updates the counters incrementally, and a capacity
+    # invalidation alone does not re-read the report
+    batch = db.batch()
+    stage_slot_changes(batch, db, "Italian", DATE, {"19:00": -8, "20:30": 8})
+    await batch.commit()
+    availability_index.invalidate("Italian", DATE)
+    [day] = await availability_index.slots(db, "Italian", DATE, DATE)
+    assert [slot["available"] for slot in day["slots"]] == [2, 10, 4, 10]
+
+    availability_index.invalidate_slots("Italian", DATE)
+    [day] = await availability_index.slots(db, "Italian", DATE, DATE)
+    assert [slot["available"] for slot in day["slots"]] == [10, 10, 4, 2]
+
+
+async def test_pacing_limit_is_enforced_per_slot():
+    db = use_slot_db()
+    db.docs[f"slot_counts/Italian_{DATE}"] = {"reserved": {"19:00": 8}}
+    limits = await slot_limits(db)
+    assert limits == {"Italian": 10}
+
+    async def book(restaurant: str, time: str, guests: int, released: int = 0):
+        @firestore_async.async_transactional
+        async def pace(transaction):
+            pacing = SlotPacing(db, limits)
+            await pacing.release(transaction, restaurant, DATE, time, released)
+            await pacing.reserve(transaction, restaurant, DATE, time, guests)
+            pacing.apply(transaction)
+
+        await pace(db.transaction())
+
+    # The first booking seeds the slot's counter from the report
+    with pytest.raises(ValueError, match="Only 2 seats available at 19:00"):
+        await book("Italian", "19:00", 3)
+    await book("Italian", "19:00", 2)
+    assert db.docs[f"slot_pacing/Italian_{DATE}_19:00"]["reserved"] == 10
+
+    # Seats released in the same transaction count as free
+    await book("Italian", "19:00", 3, released=4)
+    assert db.docs[f"slot_pacing/Italian_{DATE}_19:00"]["reserved"] == 9
+
+    # Other slots have their own counter; restaurants without a limit have none
+    await book("Italian", "19:30", 10)
+    await book("Sea_Breeze", "19:00", 40)
+    assert not [path for path in db.docs if path.startswith("slot_pacing/Sea_Breeze")]
+
+
+async def test_backfill_rebuilds_slot_counts():
+    db = use_slot_db()
+    for i, (time, guests) in enumerate([("19:00", 2), ("19:00", 3), ("20:30", 4)]):
+        db.docs[f"reservations/r{i}"] = {
+            "restaurant": "Italian", "date": DATE, "time": time, "guests": guests, "status": "confirmed"
+        }
+    db.docs["slot_counts/Italian_2099-01-02"] = {"restaurant": "Italian", "date": "2099-01-02", "reserved": {"19:00": 9}}
+    db.docs[f"slot_pacing/Italian_{DATE}_19:00"] = {"restaurant": "Italian", "date": DATE, "time": "19:00", "reserved": 7}
+
+    assert await backfill_slot_counts(db) == 1
+    assert db.docs[f"slot_counts/Italian_{DATE}"]["reserved"] == {"19:00": 5, "20:30": 4}
+    assert "slot_counts/Italian_2099-01-02" not in db.docs
+    # Pacing counters are seeded again from the rebuilt report
+    assert f"slot_pacing/Italian_{DATE}_19:00" not in db.docs
@@ -0,0 +1,38 @@
+import os
+
+from app.core.profiling import cold_import, parse_importtime
+
+# Settings needs these to import app.main; nothing here talks to Firebase
+STARTUP_ENV = {
+    "MAILGUN_API_KEY": "test-mailgun-api-key",
+    "MAILGUN_DOMAIN": "test-mailgun-domain.com",
+    "ADMIN_SECRET": "test-admin-secret",
+    "CRON_SECRET": "test-cron-secret"
+}
+
+# Around 1.1s on a developer laptop; override on slow CI runners
+IMPORT_BUDGET_SECONDS = float(os.environ.get("STARTUP_IMPORT_BUDGET_SECONDS", "3.0"))
+
+
+def test_parse_importtime():
+    timings = parse_importtime(
+        "import time: self [us] | cumulative | imported package\n"
+        "import time:       120 |        120 |     app.core.config\n"
+        "import time:      2500 |       2620 |   app.api.v1\n"
+        "import time:      4000 |       6620 | app.main\n"
+    )
+
+    assert [(t.module, t.depth) for t in timings] == [("app.core.config", 2), ("app.api.v1", 1), ("app.main", 0)]
+    assert timings[-1].cumulative_seconds == 0.00662
+
+
+def test_cold_import_defers_heavy_modules_and_stays_within_budget():
+    # Best of three fresh interpreters, so one noisy run does not fail the suite
+    results = [cold_import("app.main", STARTUP_ENV) for _ in range(3)]
+
+    assert results[0]["deferred_loaded"] == []
+    fastest = min(result["seconds"] for result in results)
+    assert fastest < IMPORT_BUDGET_SECONDS, (
+        f"Cold import of app.main took {fastest:.2f}s (budget {IMPORT_BUDGET_SECONDS}s); "
+        "run `python profile_startup.py` to see which imports grew"
+    )
@@ -0,0 +1,61 @@
+import pytest
+from fastapi import HTTPException
+
+from app.api.v1.endpoints.admin import get_analytics_dashboard
+from app.services.rollups import Rollups, rollup_worker
+from app.services.stats import backfill_daily_stats
+from tests.fake_firestore import use_fake_db
+
+pytestmark = pytest.mark.anyio
+
+
+def reservation(restaurant: str, date: str, guests: int, upsell: float = 0.0) -> dict:
+    return {
+        "restaurant": restaurant,
+        "date": date,
+        "guests": guests,
+        "upsell_total_price": upsell,
+        "status": "confirmed"
+    }
+
+
+async def test_backfill_rebuilds_rollups_and_drops_stale_days():
+    db = use_fake_db()
+    db.docs["reservations/a"] = reservation("Italian", "2025-06-01", 2, 12.5)
+    db.docs["reservations/b"] = reservation("Italian", "2025-06-01", 3)
+    db.docs["reservations/c"] = reservation("Chinese", "2025-06-02", 4, 20.0)
+    db.docs["daily_stats/Indian_2025-06-01"] = {"restaurant": "Indian", "date": "2025-06-01", "guests": 9}
+
+    assert await backfill_daily_stats(db) == 2
+
+    italian = db.docs["daily_stats/Italian_2025-06-01"]
+    assert (italian["reservations"], italian["guests"], italian["revenue"]) == (2, 5, 12.5)
+    assert db.docs["daily_stats/Chinese_2025-06-02"]["guests"] == 4
+    assert "daily_stats/Indian_2025-06-01" not in db.docs
+
+
+async def test_booking_and_cancellation_increment_the_rollup():
+    db = use_fake_db()
+    booked = reservation("Italian", "2025-06-01", 2, 10.0)
+
+    for sign in (1, 1, -1):
+        rollups = Rollups()
+        rollups.add_reservation(booked, sign)
+        batch = db.batch()
+        rollups.stage(batch, db)
+        await batch.commit()
+    assert "daily_stats/Italian_2025-06-01" not in db.docs
+
+    assert await rollup_worker.apply(db) == 3
+
+    rollup = db.docs["daily_stats/Italian_2025-06-01"]
+    assert (rollup["reservations"], rollup["guests"], rollup["revenue"]) == (1, 2, 10.0)
+
+
+async def test_dashboard_rejects_bad_and_unbounded_ranges():
+    use_fake_db()
+
+    for from_date, to_date in (("2025-13-01", "2025-06-01"), ("2025-06-02", "2025-06-01"), ("2020-01-01", "2025-06-01")):
+        with pytest.raises(HTTPException) as error:
+            await get_analytics_dashboard(from_date=from_date, to_date=to_date, restaurant=None, user={})
+        assert error.value.status_code == 400
@@ -0,0 +1,29 @@
+import time
+
+import pytest
+
+from app.core.config import settings
+from app.services.guest_list import guest_list_cache
+from app.services.warmup import Warmup
+from tests.fake_firestore import use_fake_db
+
+pytestmark = pytest.mark.anyio
+
+
+async def test_warmup_fills_caches_before_reporting_ready(monkeypatch):
+    monkeypatch.setattr(settings, "GUEST_LIST_LISTENER_ENABLED", False)
+    db = use_fake_db()
+    db.docs["guest_list/101"] = {"last_name_normalized": "rossi", "is_vip": True}
+    warmup = Warmup()
+    assert warmup.status()["ready"] is False
+
+    await warmup._run(time.perf_counter())
+
+    status = warmup.status()
+    assert status["ready"] is True
+    assert status["cold_start_seconds"] >= 0
+    assert set(status["steps"]) == {"firestore_client", "firestore_channel", "catalogs", "guest_list", "availability"}
+
+    reads = db.reads
+    assert (await guest_list_cache.lookup(db, "101"))["is_vip"] is True
+    assert db.reads == reads
@@ -1,4 +1,4 @@
-import React, { useState, useEffect } from 'react';
+import React, { useState, useEffect, useRef } from 'react';
 import { useParams, useNavigate } from 'react-router-dom';
 import { useTranslation } from 'react-i18next';
 import { toast, Toaster } from 'react-hot-toast';
@@ -36,6 +36,11 @@ const ReservationForm = () => {
   const imageUrl = `/menus/${restaurantId}.png`;
 
   const [isSending, setIsSending] = useState(false);
+  // Idempotency-Key of the last booking sent: reused when the same booking is
+  // retried (timeout, double tap) so the backend does not book it twice
+  const lastBooking = useRef({ body: null, key: null });
+  // Seats held for this date/time/party size while the form is filled in
+  const [holdId, setHoldId] = useState(null);
   const [loadingCapacities, setLoadingCapacities] = useState(true);
   const [windowWidth, setWindowWidth] = useState(window.innerWidth);
   const [spotsLeft, setSpotsLeft] = useState(null);
@@ -151,6 +156,52 @@ const ReservationForm = () => {
     }
   }, [formData.guests]);
 
+  // 🪑 Hold the seats once date, time and party size are picked, so they are
+  // still there after choosing main courses; a change releases the old hold
+  useEffect(() => {
+    const guests = parseInt(formData.guests);
+    if (!formData.date || !formData.time || isNaN(guests) || guests < 1) return;
+    // Holds are only given to verified guests: wait for room and last name
+    if (!formData.room || !formData.last_name) return;
+
+    let cancelled = false;
+    let placed = null;
+    const release = (id) => {
+      fetch(`${API_BASE}/api/v1/holds/${id}`, { method: 'DELETE', keepalive: true }).catch(() => {});
+    };
+
+    const timer = setTimeout(async () => {
+      try {
+        const res = await fetch(`${API_BASE}/api/v1/holds`, {
+          method: 'POST',
+          headers: { 'Content-Type': 'application/json' },
+          body: JSON.stringify({
+            restaurant: restaurantId, date: formData.date, time: formData.time, guests,
+            room: String(formData.room), last_name: formData.last_name,
+          }),
+        });
+        // Without a hold the booking simply competes for the seats on submit
+        if (!res.ok) return;
+        placed = (await res.json()).hold_id;
+        if (cancelled) {
+          release(placed);
+        } else {
+          setHoldId(placed);
+        }
+      } catch (error) {
+        console.error('Seat hold failed:', error);
+      }
+    }, 500);
+
+    return () => {
+      cancelled = true;
+      clearTimeout(timer);
+      setHoldId(null);
+      // A hold the booking already converted is ignored by the backend
+      if (placed) release(placed);
+    };
+  }, [restaurantId, formData.date, formData.time, formData.guests, formData.room, formData.last_name]);
+
   // 1. FETCH CONFIG ON LOAD
   useEffect(() => {
     const fetchConfig = async () => {
@@ -217,15 +268,24 @@ const ReservationForm = () => {
         }
       });
 
+      const body = JSON.stringify({
+        ...formData,
+        restaurant: restaurantId,
+        upsell_items: finalUpsellItems,
+        upsell_total_price: Number(upsell_total_price.toFixed(2)),
+        hold_id: holdId
+      });
+      if (lastBooking.current.body !== body) {
+        lastBooking.current = { body, key: crypto.randomUUID() };
+      }
+
       const response = await fetch(`${API_BASE}/api/v1/reservations`, {
         method: 'POST',
-        headers: { 'Content-Type': 'application/json' },
-        body: JSON.stringify({
-          ...formData,
-          restaurant: restaurantId,
-          upsell_items: finalUpsellItems,
-          upsell_total_price: Number(upsell_total_price.toFixed(2))
-        }),
+        headers: {
+          'Content-Type': 'application/json',
+          'Idempotency-Key': lastBooking.current.key
+        },
+        body,
       });
 
       if (!response.ok) {